@@ -1,14 +1,2 @@
-# Model Imports
-import app.common.utils as utils
-import app.models.sales as sales
-import app.models.user as user
-import app.models.discount as discount
-import app.models.product as product
-import app.models.category as category
-import app.models.review as review
-import app.models.order as order
-import app.models.support as support
-
-
-order.OrderResponse.model_rebuild()
-order.OrderProductUpdate.model_rebuild()
\ No newline at end of file
+# Kept empty on purpose: importing any app module (config, a command, a benchmark) must not pay for loading
+# every model. Import app.models to register all mappers.
@@ -0,0 +1,44 @@
+"""
+Build the sales ledger for paid and delivered orders that do not have one yet, N orders per transaction.
+Orders are walked by id with keyset queries, so memory use stays flat whatever the size of the table, and
+an interrupted run can simply be started again.
+
+    python -m app.commands.backfill_sales --chunk 1000
+"""
+import argparse
+
+from sqlalchemy import select, exists
+
+from app.infrastructure.database import SessionLocal
+import app.models  # noqa: F401 - registers every mapper
+from app.models.order import Order, OrderStatus
+from app.models.sales import Sales
+from app.services.sales_services import record_sales
+
+
+def backfill_sales(db, chunk: int = 1000) -> int:
+    recorded = 0
+    last_id = 0
+    while True:
+        order_ids = db.scalars(
+            select(Order.id)
+            .where(Order.id > last_id,
+                   Order.status.in_([OrderStatus.PAID.value, OrderStatus.DELIVERED.value]),
+                   ~exists().where(Sales.order_id == Order.id))
+            .order_by(Order.id)
+            .limit(chunk)
+        ).all()
+        if not order_ids:
+            return recorded
+        recorded += record_sales(db, order_ids)
+        db.commit()
+        db.expunge_all()
+        last_id = order_ids[-1]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunk", type=int, default=1000, help="orders per transaction")
+    args = parser.parse_args()
+    with SessionLocal() as session:
+        print(f"recorded {backfill_sales(session, args.chunk)} orders")
@@ -0,0 +1,25 @@
+"""
+Bring the database schema up to date. Run it once per deploy, before starting the new app version.
+
+    python -m app.commands.migrate
+    python -m app.commands.migrate --check   # exit status 1 if migrations are pending
+"""
+import argparse
+import sys
+
+from app.infrastructure.database import engine
+from app.migrations import migrate, pending
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--check", action="store_true", help="only list the pending migrations")
+    parser.add_argument("--target", help="stop after this version, e.g. 0001_baseline")
+    args = parser.parse_args()
+
+    if args.check:
+        waiting = pending(engine)
+        for version in waiting:
+            print(f"pending {version}")
+        sys.exit(1 if waiting else 0)
+    for version in migrate(engine, args.target):
+        print(f"applied {version}")
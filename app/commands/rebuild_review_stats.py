@@ -0,0 +1,76 @@
+"""
+Recompute the review aggregates from the reviews table, for the initial backfill or after a manual data fix.
+Ratings outside 1-5, which predate input validation, count towards the totals but not the histogram. They
+are listed on every run; --clamp-ratings moves them to the nearest valid rating first, which rewrites those
+reviews for good.
+
+    python -m app.commands.rebuild_review_stats [--clamp-ratings]
+"""
+import argparse
+
+from sqlalchemy import func, select, delete, insert, case, update, or_
+
+from app.infrastructure.database import SessionLocal
+import app.models  # noqa: F401 - registers every mapper
+from app.models.review import Review, ProductReviewStats, UserReviewStats
+
+
+def _totals(key):
+    """SELECT key, count, sum and the 1-5 histogram grouped by key, in the column order of the stats tables."""
+    return select(
+        key,
+        func.count(),
+        func.coalesce(func.sum(Review.rating), 0),
+        *(func.sum(case((Review.rating == rating, 1), else_=0)) for rating in range(1, 6)),
+    ).group_by(key)
+
+
+def out_of_range_ratings(db) -> list:
+    """(review id, rating, nearest valid rating) of every review rated outside 1-5."""
+    rows = db.execute(select(Review.id, Review.rating)
+                      .where(or_(Review.rating < 1, Review.rating > 5))
+                      .order_by(Review.id)).all()
+    return [(review_id, rating, min(max(rating, 1), 5)) for review_id, rating in rows]
+
+
+def clamp_ratings(db, review_ids: list) -> int:
+    """Move the out of range ratings of these reviews to the nearest valid one; returns the number changed."""
+    if not review_ids:
+        return 0
+    result = db.execute(
+        update(Review)
+        .where(Review.id.in_(review_ids), or_(Review.rating < 1, Review.rating > 5))
+        .values(rating=case((Review.rating < 1, 1), else_=5))
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+def rebuild_review_stats(db) -> dict:
+    """Replace both stats tables with totals computed in the database, in one transaction."""
+    counts = {}
+    for model, key, name in ((ProductReviewStats, Review.product_id, "product_id"),
+                             (UserReviewStats, Review.user_id, "user_id")):
+        columns = [name, "review_count", "rating_sum", *(f"rating_{rating}" for rating in range(1, 6))]
+        db.execute(delete(model))
+        result = db.execute(insert(model).from_select(columns, _totals(key)))
+        counts[model.__tablename__] = result.rowcount
+    db.commit()
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clamp-ratings", action="store_true",
+                        help="rewrite ratings outside 1-5 to the nearest valid one before rebuilding")
+    args = parser.parse_args()
+    with SessionLocal() as session:
+        changes = out_of_range_ratings(session)
+        for review_id, rating, clamped in changes:
+            print(f"review {review_id}: rating {rating} {'->' if args.clamp_ratings else 'would become'} {clamped}")
+        if args.clamp_ratings:
+            print(f"clamped {clamp_ratings(session, [review_id for review_id, _, _ in changes])} ratings")
+        elif changes:
+            print(f"{len(changes)} ratings out of range, left as they are (see --clamp-ratings)")
+        for table, rows in rebuild_review_stats(session).items():
+            print(f"{table}: {rows} rows")
@@ -0,0 +1,56 @@
+"""
+Regenerate the daily sales rollups for a date range (inclusive) from the ItemSales ledger, in one
+transaction, e.g. after backfilling the ledger or fixing ledger rows by hand. Category totals are
+attributed to the categories products belong to now, which may differ from when they were sold.
+
+    python -m app.commands.rebuild_sales_rollups --start 2024-01-01 --end 2024-12-31
+"""
+import argparse
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import delete, func, insert, select
+
+from app.infrastructure.database import SessionLocal
+import app.models  # noqa: F401 - registers every mapper
+from app.models.product import product_categories
+from app.models.sales import Sales, ItemSales, DailyProductSales, DailyCategorySales
+
+_columns = ["date", "quantity", "revenue", "discount", "lines"]
+
+
+def _totals(day, key, start: datetime, end: datetime):
+    return (
+        select(day, func.sum(ItemSales.quantity), func.sum(ItemSales.total_price), func.sum(ItemSales.discount),
+               func.count(), key)
+        .select_from(ItemSales)
+        .join(Sales, Sales.id == ItemSales.sales_id)
+        .where(Sales.date >= start, Sales.date < end)
+        .group_by(day, key)
+    )
+
+
+def rebuild_sales_rollups(db, start: date, end: date) -> dict:
+    first = datetime.combine(start, time.min)
+    after_last = datetime.combine(end + timedelta(days=1), time.min)
+    day = func.date(Sales.date)
+    counts = {}
+    for model, key, totals in (
+            (DailyProductSales, "product_id", _totals(day, ItemSales.product_id, first, after_last)),
+            (DailyCategorySales, "category_id",
+             _totals(day, product_categories.c.category_id, first, after_last)
+             .join(product_categories, product_categories.c.product_id == ItemSales.product_id))):
+        db.execute(delete(model).where(model.date >= start, model.date <= end))
+        result = db.execute(insert(model).from_select(_columns + [key], totals))
+        counts[model.__tablename__] = result.rowcount
+    db.commit()
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--start", type=date.fromisoformat, required=True)
+    parser.add_argument("--end", type=date.fromisoformat, default=date.today())
+    args = parser.parse_args()
+    with SessionLocal() as session:
+        for table, rows in rebuild_sales_rollups(session, args.start, args.end).items():
+            print(f"{table}: {rows} rows")
@@ -0,0 +1,17 @@
+"""
+Recompute every user's lifetime points, point balance and VIP status from their paid orders.
+
+    python -m app.commands.recompute_loyalty --chunk 500
+"""
+import argparse
+
+from app.infrastructure.database import SessionLocal
+import app.models  # noqa: F401 - registers every mapper
+from app.services.loyalty_services import recompute_loyalty
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunk", type=int, default=500, help="users per transaction")
+    args = parser.parse_args()
+    with SessionLocal() as session:
+        print(f"recomputed {recompute_loyalty(session, args.chunk)} users")
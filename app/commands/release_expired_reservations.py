@@ -0,0 +1,13 @@
+"""
+Cancel PENDING orders that were not paid in time and put their reserved stock back. update_and_run.sh runs it
+every minute; concurrent runs are safe.
+
+    python -m app.commands.release_expired_reservations
+"""
+from app.infrastructure.database import SessionLocal
+import app.models  # noqa: F401 - registers every mapper
+from app.services.inventory_services import release_expired
+
+if __name__ == "__main__":
+    with SessionLocal() as session:
+        print(f"released {release_expired(session)} orders")
@@ -0,0 +1,149 @@
+import base64
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from sqlalchemy import select, update, insert, tuple_, and_, bindparam
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.common.errors import InvalidRequestError
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after a time-to-live."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires = entry
+            if expires <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl: float = None):
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def discard_where(self, predicate):
+        """Drop every entry whose value matches the predicate."""
+        with self._lock:
+            for key in [key for key, (value, _) in self._data.items() if predicate(value)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+    def __len__(self):
+        return len(self._data)
+
+
+def encode_cursor(*values) -> str:
+    """Opaque pagination token holding the sort key of the last row a client has seen."""
+    return base64.urlsafe_b64encode(json.dumps(values, default=str).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *types) -> tuple:
+    """
+    The values of a cursor made by encode_cursor, which must match `types` one for one (a datetime travels as
+    its ISO string). A cursor that does not decode, or holds other values, is rejected with 400 rather than
+    reaching the query.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError(values)
+        return tuple(_cursor_value(value, kind) for value, kind in zip(values, types))
+    except ValueError:
+        raise InvalidRequestError("Invalid cursor")
+
+
+def _cursor_value(value, kind):
+    if kind is datetime:
+        if not isinstance(value, str):
+            raise ValueError(value)
+        return datetime.fromisoformat(value)
+    # Exact type match: JSON true is not an id
+    if type(value) is not kind:
+        raise ValueError(value)
+    return value
+
+
+def increment_counters(db: Session, model, keys: list, rows: list):
+    """
+    Add the counter columns of each row to the record of `model` with the same key columns, creating the
+    records that do not exist yet. Every row must carry the same columns. Costs one SELECT, one
+    executemany UPDATE and one INSERT no matter how many rows there are; runs in the caller's transaction.
+    """
+    if not rows:
+        return
+    table = model.__table__
+    key_columns = [table.c[key] for key in keys]
+    counters = [column for column in rows[0] if column not in keys]
+    statement = (
+        update(table)
+        .where(and_(*(column == bindparam(f"key_{column.key}") for column in key_columns)))
+        .values({column: table.c[column] + bindparam(f"add_{column}") for column in counters})
+    )
+
+    def key_of(row):
+        return tuple(row[key] for key in keys)
+
+    def params(row):
+        return {**{f"key_{key}": row[key] for key in keys}, **{f"add_{column}": row[column] for column in counters}}
+
+    existing = {tuple(found) for found in db.execute(
+        select(*key_columns).where(tuple_(*key_columns).in_([key_of(row) for row in rows])))}
+    missing = [row for row in rows if key_of(row) not in existing]
+    if missing:
+        try:
+            with db.begin_nested():
+                db.execute(insert(table), missing)
+        except IntegrityError:
+            # Someone else created some of them in the meantime, or a row is invalid: one row at a time
+            for row in missing:
+                _insert_or_add(db, table, statement, row, params(row))
+        rows = [row for row in rows if key_of(row) in existing]
+    if rows:
+        db.execute(statement, [params(row) for row in rows])
+
+
+def _insert_or_add(db: Session, table, statement, row: dict, params: dict):
+    try:
+        with db.begin_nested():
+            db.execute(insert(table), [row])
+    except IntegrityError as error:
+        # Only a duplicate key means the record exists now; anything else (a foreign key) is re-raised
+        if db.execute(statement, params).rowcount != 1:
+            raise error
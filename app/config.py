@@ -1,3 +1,5 @@
+import os
+
 LOW_PRODUCT_INVENTORY_THRESHOLD = 1000
 
 LOYALTY_POINTS_PER_20_DOLLARS = 10
@@ -5,4 +7,92 @@ LOYALTY_POINTS_CONVERSION_RATE = 100 # for 1$
 TOTAL_LOYALTY_POINTS_FOR_VIP_STATUS = 1000
 
 VIP_DISCOUNT_PERCENTAGE = 5
-VIP_LOYALTY_POINTS_PER_20_DOLLARS = 25
\ No newline at end of file
+VIP_LOYALTY_POINTS_PER_20_DOLLARS = 25
+
+# Database
+DB_HOST = os.getenv("DB_HOST", "172.245.56.116")
+DB_PORT = int(os.getenv("DB_PORT", 3600))
+DB_USER = os.getenv("DB_USER", "root")
+DB_PASSWORD = os.getenv("DB_PASSWORD", "root")
+DB_NAME = os.getenv("DB_NAME", "schema_name")
+DATABASE_URL = os.getenv("DATABASE_URL",
+                         f"mysql+mysqldb://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}")
+
+# Async driver URL for the AsyncSession path; derived from DATABASE_URL unless set explicitly
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL",
+                               DATABASE_URL.replace("mysql+mysqldb://", "mysql+aiomysql://", 1)
+                               .replace("sqlite://", "sqlite+aiosqlite://", 1))
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))  # seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))  # seconds, keep below the server's wait_timeout
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+DB_ISOLATION_LEVEL = os.getenv("DB_ISOLATION_LEVEL") or None  # e.g. READ COMMITTED
+
+# Resolved principals (id, username, admin, blacklisted) cached per worker for authenticated requests; an entry
+# is dropped once the user's tokens are revoked, which other workers see within TOKEN_REVOCATION_SYNC_SECONDS
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", 10000))
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", 60))
+
+# Token format issued at login: "principal" tokens only name the user, who is then looked up; "stateless"
+# tokens carry id, role and token version, are short-lived and come with a refresh token
+AUTH_MODE = os.getenv("AUTH_MODE", "principal")
+STATELESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("STATELESS_TOKEN_EXPIRE_MINUTES", 15))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 7))
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 10000))  # verified tokens kept until they expire
+TOKEN_REVOCATION_SYNC_SECONDS = float(os.getenv("TOKEN_REVOCATION_SYNC_SECONDS", 10))  # reload from other workers
+
+# Password hashing runs in a dedicated process pool
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))  # changing it rehashes passwords on their next login
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+PASSWORD_HASH_QUEUE_SIZE = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", 64))  # max queued + running operations
+
+# SQL instrumentation
+SQL_TAG_STATEMENTS = os.getenv("SQL_TAG_STATEMENTS", "true").lower() in ("1", "true", "yes")  # /* route */ comments
+SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", 5))  # repeats of one SELECT per request
+
+# Stock reserved by a PENDING order is released if the order is not paid within this many minutes
+ORDER_RESERVATION_MINUTES = int(os.getenv("ORDER_RESERVATION_MINUTES", 30))
+
+# Side effects of order status changes run after commit on a small in-process worker pool
+EVENT_WORKERS = int(os.getenv("EVENT_WORKERS", 4))
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", 1000))  # beyond this, every queued task logs a warning
+EVENT_MAX_RETRIES = int(os.getenv("EVENT_MAX_RETRIES", 3))
+EVENT_RETRY_DELAY_SECONDS = float(os.getenv("EVENT_RETRY_DELAY_SECONDS", 0.5))  # doubled after each attempt
+
+# Serialized catalog responses (products, categories) cached per worker; invalidated by tag on writes in
+# this worker, the TTL bounds how long other workers can serve an entry after a change
+CATALOG_CACHE_SIZE = int(os.getenv("CATALOG_CACHE_SIZE", 10000))
+CATALOG_CACHE_TTL_SECONDS = float(os.getenv("CATALOG_CACHE_TTL_SECONDS", 60))
+
+# Search indexes are kept per worker and follow this worker's commits; the rows other workers wrote are read
+# from the search_changes log this often, which bounds how long they stay out of this worker's results
+SEARCH_SYNC_SECONDS = float(os.getenv("SEARCH_SYNC_SECONDS", 2))
+# How long after a higher id a change can still commit and be picked up; longer re-reads more rows per sync
+SEARCH_CHANGE_OVERLAP_SECONDS = float(os.getenv("SEARCH_CHANGE_OVERLAP_SECONDS", 30))
+# Log rows older than this are deleted; an index not synced for that long is rebuilt from the tables instead
+SEARCH_CHANGE_RETENTION_SECONDS = float(os.getenv("SEARCH_CHANGE_RETENTION_SECONDS", 3600))
+
+# Effective product prices (price plus applicable discounts) cached per worker for order pricing; every quote
+# checks a shared version first, so a price change committed anywhere applies to the next order
+PRICE_CACHE_SIZE = int(os.getenv("PRICE_CACHE_SIZE", 10000))
+PRICE_CACHE_TTL_SECONDS = float(os.getenv("PRICE_CACHE_TTL_SECONDS", 30))
+
+# Production server (gunicorn.conf.py): the app is loaded once, then forked into WEB_WORKERS processes, each
+# with its own connection pools (budget WEB_WORKERS * (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections)
+WEB_BIND = os.getenv("WEB_BIND", "0.0.0.0:8100")
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", 0)) or os.cpu_count() or 1  # 0 means one per core
+WEB_BACKLOG = int(os.getenv("WEB_BACKLOG", 2048))  # connections queued by the kernel before refusing
+WEB_KEEPALIVE_SECONDS = int(os.getenv("WEB_KEEPALIVE_SECONDS", 5))
+WEB_TIMEOUT_SECONDS = int(os.getenv("WEB_TIMEOUT_SECONDS", 60))  # a worker silent for longer is restarted
+WEB_GRACEFUL_TIMEOUT_SECONDS = int(os.getenv("WEB_GRACEFUL_TIMEOUT_SECONDS", 30))  # drain time on restart
+WEB_MAX_REQUESTS = int(os.getenv("WEB_MAX_REQUESTS", 0))  # recycle a worker after this many requests, 0 = never
+WEB_PIDFILE = os.getenv("WEB_PIDFILE", "/tmp/gunicorn.pid")  # outside the checkout, which deploys clean
+
+# Support ticket message streams (server-sent events) fed by an in-process pub/sub. Every SYNC_SECONDS an idle
+# stream sends a heartbeat and reads the messages posted through other workers
+SUPPORT_STREAM_SYNC_SECONDS = float(os.getenv("SUPPORT_STREAM_SYNC_SECONDS", 5))
+SUPPORT_STREAM_QUEUE_SIZE = int(os.getenv("SUPPORT_STREAM_QUEUE_SIZE", 100))  # buffered events per client
+# How long after a higher id a message can still commit and be streamed; longer re-reads more rows per sync
+SUPPORT_STREAM_OVERLAP_SECONDS = float(os.getenv("SUPPORT_STREAM_OVERLAP_SECONDS", 30))
@@ -1,26 +1,17 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.infrastructure.database import SessionLocal
-from app.infrastructure.auth import verify_token
+from app.infrastructure.database import get_async_db, get_db  # noqa: F401 - re-exported for the routers
+from app.infrastructure.auth import decode_token
+from app.infrastructure.principals import Principal, load_principal, load_principal_async, principal_from_claims, \
+    token_version, token_version_async, token_versions
 from app.models.user import User
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
-def get_current_user(token: str = Depends(oauth2_scheme),
-                     db: Session = Depends(get_db)):
-    """Verify JWT token and check if user exists in the database."""
-    username = verify_token(token)
-    user = db.query(User).filter(User.username == username).first()
+def check_user(user):
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
     if user.blacklisted and not user.admin:
@@ -28,8 +19,46 @@ def get_current_user(token: str = Depends(oauth2_scheme),
     return user
 
 
-def get_current_admin(user: User = Depends(get_current_user)):
-    """Check if the current user is an admin."""
+def check_admin(user):
     if not user.admin > 0:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin privileges required")
     return user
+
+
+def get_current_principal(token: str = Depends(oauth2_scheme),
+                          db: Session = Depends(get_db)) -> Principal:
+    """
+    Verify JWT token and resolve the caller's identity: straight from the claims for stateless tokens, from
+    the principal cache (or the database) for the others.
+    """
+    claims = decode_token(token)
+    if "uid" in claims:
+        version = None if token_versions.ready else token_version(db, claims["uid"])
+        return principal_from_claims(claims, version)
+    return check_user(load_principal(db, claims["sub"]))
+
+
+def get_current_user(principal: Principal = Depends(get_current_principal),
+                     db: Session = Depends(get_db)) -> User:
+    """Load the full ORM User, for routes that need more than the caller's identity."""
+    return check_user(db.get(User, principal.id))
+
+
+def get_current_admin(principal: Principal = Depends(get_current_principal)) -> Principal:
+    """Check if the current user is an admin."""
+    return check_admin(principal)
+
+
+async def get_current_principal_async(token: str = Depends(oauth2_scheme),
+                                      db: AsyncSession = Depends(get_async_db)) -> Principal:
+    """Async variant of get_current_principal for routes running on the AsyncSession path."""
+    claims = decode_token(token)
+    if "uid" in claims:
+        version = None if token_versions.ready else await token_version_async(db, claims["uid"])
+        return principal_from_claims(claims, version)
+    return check_user(await load_principal_async(db, claims["sub"]))
+
+
+async def get_current_admin_async(principal: Principal = Depends(get_current_principal_async)) -> Principal:
+    """Async variant of get_current_admin."""
+    return check_admin(principal)
@@ -1,29 +1,66 @@
+import logging
+import time
+
 import jwt
 from jwt.exceptions import PyJWTError
 from datetime import datetime, timedelta
 from fastapi import HTTPException, status
 
+from app import config
+from app.common.utils import TTLCache
+
+logger = logging.getLogger(__name__)
+
 SECRET_KEY = "your_secret_key"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 360  # 6 hours
 
+# Verified claims by token, so a token's signature is only checked once per worker
+token_cache = TTLCache(config.TOKEN_CACHE_SIZE, config.STATELESS_TOKEN_EXPIRE_MINUTES * 60)
 
-def create_access_token(data: dict):
+
+def create_access_token(data: dict, expires: timedelta = None):
     """Generate a JWT access token with an expiration time."""
     to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    expire = datetime.utcnow() + (expires or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
-def verify_token(token: str):
+def create_token_pair(user_id: int, username: str, admin: bool, version: int) -> dict:
+    """
+    Stateless access token carrying everything authorization needs (id, role and token version), plus a
+    long-lived refresh token to get a new one once it expires or was revoked.
+    """
+    claims = {"sub": username, "uid": user_id, "adm": bool(admin), "ver": version}
+    access = timedelta(minutes=config.STATELESS_TOKEN_EXPIRE_MINUTES)
+    return {
+        "access_token": create_access_token({**claims, "typ": "access"}, access),
+        "refresh_token": create_access_token({**claims, "typ": "refresh"},
+                                             timedelta(days=config.REFRESH_TOKEN_EXPIRE_DAYS)),
+        "token_type": "bearer",
+        "expires_in": int(access.total_seconds()),
+    }
+
+
+def decode_token(token: str) -> dict:
+    """Verified claims of a token, from the token cache when it was already seen."""
+    claims = token_cache.get(token)
+    if claims is not None:
+        return claims
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        return username
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except PyJWTError as e:
-        print(f"Token verification error: {e}")  # Debug
-        raise HTTPException(status_code=401, detail="Invalid token")
+        logger.debug("Token verification failed: %s", e)
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    if claims.get("sub") is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    remaining = claims["exp"] - time.time()
+    if remaining > 0:
+        token_cache.set(token, claims, ttl=min(remaining, token_cache.ttl))
+    return claims
+
+
+def verify_token(token: str):
+    return decode_token(token)["sub"]
@@ -0,0 +1,182 @@
+import hashlib
+import threading
+import time
+from collections import namedtuple, defaultdict
+from email.utils import formatdate, parsedate_to_datetime
+
+from fastapi import Request, Response
+from pydantic import BaseModel
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import config
+from app.common.utils import TTLCache
+from app.models.category import CategoryResponse
+from app.models.discount import DiscountResponse
+from app.models.product import ProductResponse
+
+CachedResponse = namedtuple("CachedResponse", "body etag modified_at versions")
+
+# Response models whose instances tag an entry with their entity
+_tagged_models = ((ProductResponse, "product"), (CategoryResponse, "category"), (DiscountResponse, "discount"))
+
+
+def tags_of(model) -> set:
+    """
+    'product:1', 'discount:3', ... for every catalog entity that appears anywhere in a response. Products also
+    get a 'stock:<id>' tag, so stock movements do not invalidate what only depends on price and discounts.
+    """
+    tags = set()
+    stack = [model]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, BaseModel):
+            for cls, name in _tagged_models:
+                if isinstance(value, cls):
+                    tags.add(f"{name}:{value.id}")
+            if isinstance(value, ProductResponse):
+                tags.add(f"stock:{value.id}")
+            stack.extend(getattr(value, field) for field in type(value).model_fields)
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+    return tags
+
+
+class ResponseCache:
+    """
+    Serialized responses keyed by entity, each tagged with the entities it contains. Invalidating a tag bumps
+    its version, which makes every entry built against the old version a miss, so no tag-to-key index is
+    needed. Entries loaded while one of their own tags was invalidated are not stored, so a read racing with
+    a write can never cache the pre-write state, while writes to unrelated entities (such as the stock of
+    other products) do not keep reads from being cached.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._entries = TTLCache(maxsize, ttl)
+        self._lock = threading.Lock()
+        self._versions = defaultdict(int)
+        self._sequence = 0  # counts invalidations; _changed_at[tag] is the value at the tag's latest one
+        self._changed_at = {}
+        self._cleared_at = 0
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.invalidations = 0
+
+    def begin(self) -> int:
+        """Call before reading the database for an entry; pass the result to store()."""
+        return self._sequence
+
+    def unchanged_since(self, token: int, tags) -> bool:
+        """Whether none of `tags` was invalidated since begin() returned `token`."""
+        with self._lock:
+            return self._cleared_at <= token and all(self._changed_at.get(tag, 0) <= token for tag in tags)
+
+    def snapshot(self, tags) -> tuple:
+        """Current versions of `tags`, for callers keeping their own entries in step with this cache."""
+        with self._lock:
+            return tuple((tag, self._versions.get(tag, 0)) for tag in tags)
+
+    def is_current(self, versions) -> bool:
+        with self._lock:
+            return all(self._versions.get(tag, 0) == version for tag, version in versions)
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        current = entry is not None and self.is_current(entry.versions)
+        with self._lock:
+            if current:
+                self.hits += 1
+                return entry
+            self.misses += 1
+            return None
+
+    def store(self, key, model: BaseModel, token: int, tags=()) -> CachedResponse:
+        body = model.model_dump_json().encode()
+        etag = f'"{hashlib.sha1(body).hexdigest()[:20]}"'
+        tags = tags_of(model) | set(tags)
+        entry = CachedResponse(body, etag, int(time.time()), self.snapshot(tags))
+        if self.unchanged_since(token, tags):
+            self._entries.set(key, entry)
+        return entry
+
+    def invalidate(self, *tags):
+        with self._lock:
+            self._sequence += 1
+            for tag in tags:
+                self._versions[tag] += 1
+                self._changed_at[tag] = self._sequence
+            self.invalidations += len(tags)
+
+    def clear(self):
+        self._entries.clear()
+        with self._lock:
+            self._sequence += 1
+            self._cleared_at = self._sequence
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "maxsize": self._entries.maxsize, "ttl": self._entries.ttl,
+                    "hits": self.hits, "misses": self.misses, "not_modified": self.not_modified,
+                    "invalidations": self.invalidations}
+
+    def respond(self, request: Request, entry: CachedResponse) -> Response:
+        """200 with validators, or 304 when the client's copy (If-None-Match / If-Modified-Since) is current."""
+        headers = {"ETag": entry.etag,
+                   "Last-Modified": formatdate(entry.modified_at, usegmt=True),
+                   "Cache-Control": "private, no-cache"}
+        if _not_modified(request, entry):
+            with self._lock:
+                self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry.body, media_type="application/json", headers=headers)
+
+    def serve(self, request: Request, key: str, load, tags=()) -> Response:
+        """Respond from the cache, or call `load()` for the response model and cache it."""
+        entry = self.get(key)
+        if entry is None:
+            token = self.begin()
+            entry = self.store(key, load(), token, tags)
+        return self.respond(request, entry)
+
+    async def serve_async(self, request: Request, key: str, load, tags=()) -> Response:
+        entry = self.get(key)
+        if entry is None:
+            token = self.begin()
+            entry = self.store(key, await load(), token, tags)
+        return self.respond(request, entry)
+
+
+def _not_modified(request: Request, entry: CachedResponse) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return entry.etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")] \
+            or if_none_match.strip() == "*"
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return entry.modified_at <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+catalog_cache = ResponseCache(config.CATALOG_CACHE_SIZE, config.CATALOG_CACHE_TTL_SECONDS)
+
+
+def invalidate_on_commit(db: Session, *tags):
+    """Invalidate catalog cache tags once the current transaction commits (nothing happens on rollback)."""
+    db.info.setdefault("catalog_tags", set()).update(tags)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session):
+    tags = session.info.pop("catalog_tags", None)
+    if tags:
+        catalog_cache.invalidate(*tags)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_tags(session, previous_transaction):
+    if not previous_transaction.nested:
+        session.info.pop("catalog_tags", None)
@@ -0,0 +1,144 @@
+import logging
+import threading
+import time
+from collections import namedtuple, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app import config
+from app.infrastructure.database import SessionLocal
+from app.models.order import Order
+
+logger = logging.getLogger(__name__)
+
+# old and new are OrderStatus values; at is when the change was flushed
+StatusChange = namedtuple("StatusChange", "order_id user_id old new at")
+
+_handlers = defaultdict(list)
+
+
+def on_order_status(new):
+    """
+    Register `handler(db, change)` to run after a commit that moved an order to status `new`. Handlers get
+    their own session and are committed for them; they may run more than once (retries), so they must be
+    idempotent. Status changes made with bulk UPDATE statements bypass the ORM and are not seen.
+    """
+    def register(handler):
+        _handlers[new.value].append(handler)
+        return handler
+    return register
+
+
+class TaskQueue:
+    """
+    Runs post-commit tasks on a fixed pool of threads, retrying failures with exponential backoff. Submitting
+    never blocks, as it happens in the committing thread, which may be the event loop: tasks beyond
+    `queue_size` are still queued, but each one logs a warning so a stuck pool is noticed.
+    """
+
+    def __init__(self, workers: int, queue_size: int, max_retries: int, retry_delay: float):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self._executor = None
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._pending = 0
+        self.counts = {"submitted": 0, "backlogged": 0, "completed": 0, "retried": 0, "failed": 0}
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="events")
+        return self._executor
+
+    def submit(self, handler, change: StatusChange):
+        with self._lock:
+            self.counts["submitted"] += 1
+            backlogged = self._pending >= self.queue_size
+            if backlogged:
+                self.counts["backlogged"] += 1
+            self._pending += 1
+        if backlogged:
+            logger.warning("%s tasks waiting, %s for order %s queued behind them", self._pending - 1,
+                           handler.__name__, change.order_id)
+        self._get_executor().submit(self._run, handler, change)
+
+    def _run(self, handler, change: StatusChange):
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    with SessionLocal() as db:
+                        handler(db, change)
+                        db.commit()
+                    self._count("completed")
+                    return
+                except Exception:
+                    if attempt == self.max_retries:
+                        logger.exception("%s failed for order %s, giving up", handler.__name__, change.order_id)
+                        self._count("failed")
+                        return
+                    logger.warning("%s failed for order %s, retrying", handler.__name__, change.order_id,
+                                   exc_info=True)
+                    self._count("retried")
+                    time.sleep(self.retry_delay * 2 ** attempt)
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self._idle.notify_all()
+
+    def _count(self, name: str):
+        with self._lock:
+            self.counts[name] += 1
+
+    def wait_idle(self, timeout: float = None) -> bool:
+        """Block until every submitted task has finished (for commands, benchmarks and shutdown)."""
+        with self._lock:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"workers": self.workers, "queue_size": self.queue_size, "pending": self._pending,
+                    **self.counts}
+
+
+task_queue = TaskQueue(config.EVENT_WORKERS, config.EVENT_QUEUE_SIZE,
+                       config.EVENT_MAX_RETRIES, config.EVENT_RETRY_DELAY_SECONDS)
+
+
+# Transitions are read from the attribute history at flush time and only dispatched once the transaction
+# commits, so a rolled back change never triggers anything.
+
+@event.listens_for(Session, "after_flush")
+def _collect_status_changes(session, flush_context):
+    for obj in session.dirty:
+        if not isinstance(obj, Order):
+            continue
+        history = inspect(obj).attrs.status.history
+        if history.added and history.deleted and history.added[0] != history.deleted[0]:
+            session.info.setdefault("order_status_changes", []).append(
+                StatusChange(obj.id, obj.user_id, history.deleted[0], history.added[0], datetime.now()))
+
+
+def record_status_change(db: Session, order: Order, old, new):
+    """Dispatch a transition made with an UPDATE statement, which the flush listener cannot see."""
+    db.info.setdefault("order_status_changes", []).append(
+        StatusChange(order.id, order.user_id, old.value, new.value, datetime.now()))
+
+
+@event.listens_for(Session, "after_commit")
+def _dispatch_status_changes(session):
+    for change in session.info.pop("order_status_changes", ()):
+        for handler in _handlers.get(change.new, ()):
+            task_queue.submit(handler, change)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_status_changes(session, previous_transaction):
+    if not previous_transaction.nested:
+        session.info.pop("order_status_changes", None)
@@ -0,0 +1,157 @@
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+
+from app import config
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar("sql_request_stats", default=None)
+_unsafe_comment = re.compile(r"[^\w /{}.:-]")
+
+
+class RequestStats:
+    """Statements issued while serving one request."""
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    @property
+    def route(self) -> str:
+        # FastAPI stores the matched APIRoute in the scope; unmatched requests are grouped together
+        route = self.scope.get("route")
+        return f"{self.scope['method']} {route.path}" if route is not None else "unmatched"
+
+    def record(self, statement: str, duration: float):
+        self.count += 1
+        self.duration += duration
+        self.statements[statement] += 1
+
+    def repeated_selects(self) -> dict:
+        """Identical SELECTs run many times with different parameters - the usual N+1 signature."""
+        return {statement: count for statement, count in self.statements.items()
+                if count >= config.SQL_N_PLUS_ONE_THRESHOLD and statement.lstrip().upper().startswith("SELECT")}
+
+
+class RouteMetrics:
+    def __init__(self):
+        self.requests = 0
+        self.statements = 0
+        self.max_statements = 0
+        self.duration = 0.0
+        self.n_plus_one_requests = 0
+        self.repeated = Counter()
+
+    def as_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "statements": self.statements,
+            "avg_statements": round(self.statements / self.requests, 2) if self.requests else 0.0,
+            "max_statements": self.max_statements,
+            "sql_time_ms": round(self.duration * 1000, 3),
+            "avg_sql_time_ms": round(self.duration * 1000 / self.requests, 3) if self.requests else 0.0,
+            "n_plus_one_requests": self.n_plus_one_requests,
+            "repeated_statements": [{"statement": statement[:300], "requests": count}
+                                    for statement, count in self.repeated.most_common(5)],
+        }
+
+
+class SQLMetrics:
+    """Per-route aggregates of the per-request statement counts."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def record(self, stats: RequestStats):
+        repeated = stats.repeated_selects()
+        if repeated:
+            logger.warning("Possible N+1 on %s: %s", stats.route,
+                           "; ".join(f"{count}x {statement[:120]}" for statement, count in repeated.items()))
+        with self._lock:
+            metrics = self._routes.setdefault(stats.route, RouteMetrics())
+            metrics.requests += 1
+            metrics.statements += stats.count
+            metrics.max_statements = max(metrics.max_statements, stats.count)
+            metrics.duration += stats.duration
+            if repeated:
+                metrics.n_plus_one_requests += 1
+                metrics.repeated.update(repeated.keys())
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {route: metrics.as_dict() for route, metrics in sorted(self._routes.items())}
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+
+sql_metrics = SQLMetrics()
+
+
+def current_request_stats():
+    return _current.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("sql_start", []).append(time.perf_counter())
+    stats = _current.get()
+    if stats is not None and config.SQL_TAG_STATEMENTS:
+        statement = f"/* {_unsafe_comment.sub('_', stats.route)} */ {statement}"
+    return statement, parameters
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info["sql_start"].pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.record(context.statement if context is not None else statement, duration)
+
+
+def instrument_engine(engine):
+    """Time every statement on the engine and attribute it to the request being served."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute, retval=True)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class SQLInstrumentationMiddleware:
+    """
+    Opens a RequestStats for each HTTP request, reports it in X-SQL-* response headers and feeds the
+    per-route metrics. Written as plain ASGI so streaming responses pass through untouched.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats(scope)
+        token = _current.set(stats)
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers["X-SQL-Count"] = str(stats.count)
+                headers["X-SQL-Time-Ms"] = f"{stats.duration * 1000:.3f}"
+                repeated = stats.repeated_selects()
+                if repeated:
+                    headers["X-SQL-N-Plus-One"] = str(len(repeated))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            _current.reset(token)
+            sql_metrics.record(stats)
@@ -0,0 +1,136 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, Future
+from functools import lru_cache
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+from app import config
+
+
+@lru_cache
+def _context(rounds: int) -> CryptContext:
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+
+
+# These two run inside the worker processes and report their own CPU time back
+
+def _hash(password: str, rounds: int):
+    start = time.perf_counter()
+    hashed = _context(rounds).hash(password)
+    return hashed, time.perf_counter() - start
+
+
+def _verify(password: str, hashed: str, rounds: int):
+    start = time.perf_counter()
+    verified, new_hash = _context(rounds).verify_and_update(password, hashed)
+    return (verified, new_hash), time.perf_counter() - start
+
+
+class _LatencyStats:
+    def __init__(self):
+        self.count = 0
+        self.compute_total = 0.0
+        self.compute_max = 0.0
+        self.wait_total = 0.0
+
+    def record(self, compute: float, total: float):
+        self.count += 1
+        self.compute_total += compute
+        self.compute_max = max(self.compute_max, compute)
+        self.wait_total += max(total - compute, 0.0)
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "avg_ms": round(self.compute_total * 1000 / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.compute_max * 1000, 3),
+            "avg_queue_wait_ms": round(self.wait_total * 1000 / self.count, 3) if self.count else 0.0,
+        }
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt in a size-limited process pool so hashing never occupies request threads or the event loop.
+    At most `queue_size` operations may be queued or running; beyond that callers get a 503 instead of
+    piling up behind a login burst.
+    """
+
+    def __init__(self, workers: int, queue_size: int, rounds: int):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.rounds = rounds
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._rejected = 0
+        self._stats = {"hash": _LatencyStats(), "verify": _LatencyStats()}
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Created on first use so the pool is never forked along with a preloading server process
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                         mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def _submit(self, kind: str, fn, *args) -> Future:
+        with self._lock:
+            if self._pending >= self.queue_size:
+                self._rejected += 1
+                raise HTTPException(status_code=503, detail="Too many login attempts in progress, please retry")
+            self._pending += 1
+        start = time.perf_counter()
+        result = Future()
+
+        def done(future: Future):
+            with self._lock:
+                self._pending -= 1
+            try:
+                value, compute = future.result()
+            except BaseException as exc:
+                result.set_exception(exc)
+                return
+            with self._lock:
+                self._stats[kind].record(compute, time.perf_counter() - start)
+            result.set_result(value)
+
+        try:
+            self._get_executor().submit(fn, *args).add_done_callback(done)
+        except BaseException:
+            with self._lock:
+                self._pending -= 1
+            raise
+        return result
+
+    def hash(self, password: str) -> str:
+        return self._submit("hash", _hash, password, self.rounds).result()
+
+    def verify(self, password: str, hashed: str):
+        """Returns (verified, new_hash); new_hash is set when the stored hash uses an outdated cost factor."""
+        return self._submit("verify", _verify, password, hashed, self.rounds).result()
+
+    async def hash_async(self, password: str) -> str:
+        return await asyncio.wrap_future(self._submit("hash", _hash, password, self.rounds))
+
+    async def verify_async(self, password: str, hashed: str):
+        return await asyncio.wrap_future(self._submit("verify", _verify, password, hashed, self.rounds))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "rounds": self.rounds,
+                "queue_size": self.queue_size,
+                "queue_depth": self._pending,
+                "rejected": self._rejected,
+                "hash": self._stats["hash"].as_dict(),
+                "verify": self._stats["verify"].as_dict(),
+            }
+
+
+password_hasher = PasswordHasher(config.PASSWORD_HASH_WORKERS, config.PASSWORD_HASH_QUEUE_SIZE, config.BCRYPT_ROUNDS)
@@ -0,0 +1,203 @@
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import event, select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app import config
+from app.common.utils import TTLCache, increment_counters
+from app.models.user import User, UserTokenVersion
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Principal:
+    """The identity behind a request; enough for authorization checks without loading the ORM User."""
+    id: int
+    username: str
+    admin: bool
+    blacklisted: bool
+
+
+principal_cache = TTLCache(config.PRINCIPAL_CACHE_SIZE, config.PRINCIPAL_CACHE_TTL_SECONDS)
+
+# A cached principal and the user's token version when it was loaded. Every change to the cached fields bumps
+# that version, so an entry is stale as soon as token_versions has seen a newer one.
+CachedPrincipal = namedtuple("CachedPrincipal", "principal version")
+
+
+def _principal_query():
+    return (select(User.id, User.username, User.admin, User.blacklisted,
+                   func.coalesce(UserTokenVersion.version, 0).label("version"))
+            .outerjoin(UserTokenVersion, UserTokenVersion.user_id == User.id))
+
+
+def _to_principal(row) -> Optional[Principal]:
+    if row is None:
+        return None
+    principal = Principal(id=row.id, username=row.username, admin=bool(row.admin), blacklisted=bool(row.blacklisted))
+    principal_cache.set(principal.username, CachedPrincipal(principal, row.version))
+    return principal
+
+
+def _cached_principal(username: str) -> Optional[Principal]:
+    # Until token_versions has loaded in this worker, changes committed by the others cannot be seen
+    entry = principal_cache.get(username)
+    if entry is None or not token_versions.ready or token_versions.is_revoked(entry.principal.id, entry.version):
+        return None
+    return entry.principal
+
+
+def load_principal(db: Session, username: str) -> Optional[Principal]:
+    principal = _cached_principal(username)
+    if principal is None:
+        principal = _to_principal(db.execute(_principal_query().where(User.username == username)).first())
+    return principal
+
+
+async def load_principal_async(db: AsyncSession, username: str) -> Optional[Principal]:
+    principal = _cached_principal(username)
+    if principal is None:
+        result = await db.execute(_principal_query().where(User.username == username))
+        principal = _to_principal(result.first())
+    return principal
+
+
+def invalidate_principal(user_id: int):
+    """
+    Forget a cached principal after the user row changed; the next request reloads it. Other workers drop
+    theirs once they see the user's new token version, so changes to the cached fields must revoke tokens.
+    """
+    principal_cache.discard_where(lambda entry: entry.principal.id == user_id)
+
+
+class TokenVersions:
+    """
+    Current token version of every user whose tokens were ever revoked; stateless tokens carrying an older
+    version are rejected. Updated in place when this worker commits a revocation and reloaded from the
+    database every TOKEN_REVOCATION_SYNC_SECONDS by a background thread to pick up the other workers' ones.
+    Until that thread's first load succeeds in this process, `ready` is False and callers must read the
+    user's version from the database instead.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._versions = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._loaded_pid = None
+        self.loaded_at = None
+
+    @property
+    def ready(self) -> bool:
+        self.start()
+        return self._loaded_pid == os.getpid()
+
+    def is_revoked(self, user_id: int, version: int) -> bool:
+        return version < self._versions.get(user_id, 0)
+
+    def update(self, versions: dict):
+        with self._lock:
+            merged = dict(self._versions)
+            for user_id, version in versions.items():
+                merged[user_id] = max(version, merged.get(user_id, 0))
+            self._versions = merged
+
+    def reload(self):
+        from app.infrastructure.database import SessionLocal
+        with SessionLocal() as db:
+            rows = db.execute(select(UserTokenVersion.user_id, UserTokenVersion.version)).all()
+        self.update(dict(rows))
+        self.loaded_at = time.time()
+
+    def start(self):
+        """Start the sync thread of this process if it is not running; the first load happens in the thread."""
+        # Threads do not survive a fork, so each worker process starts its own on first use
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._thread = threading.Thread(target=self._sync, name="token-versions", daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def _sync(self):
+        pid = os.getpid()
+        while True:
+            try:
+                self.reload()
+                self._loaded_pid = pid
+            except Exception:
+                logger.warning("Token version sync failed, retrying in %ss", self.interval, exc_info=True)
+            time.sleep(self.interval)
+
+    def stats(self) -> dict:
+        return {"revoked_users": len(self._versions), "loaded_at": self.loaded_at,
+                "ready": self._loaded_pid == os.getpid()}
+
+
+token_versions = TokenVersions(config.TOKEN_REVOCATION_SYNC_SECONDS)
+
+
+def principal_from_claims(claims: dict, version: int = None) -> Principal:
+    """
+    Build the principal of a stateless access token without touching the database. `version` is the user's
+    current token version, read by the caller while token_versions is not ready.
+    """
+    if claims.get("typ") != "access":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    if version is None:
+        revoked = token_versions.is_revoked(claims["uid"], claims["ver"])
+    else:
+        revoked = claims["ver"] < version
+    if revoked:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token revoked")
+    # Blacklisting revokes the user's tokens, so a token that is still valid belongs to an allowed user
+    return Principal(id=claims["uid"], username=claims["sub"], admin=claims["adm"], blacklisted=False)
+
+
+def _version_query(user_id: int):
+    return select(UserTokenVersion.version).where(UserTokenVersion.user_id == user_id)
+
+
+def token_version(db: Session, user_id: int) -> int:
+    return db.scalar(_version_query(user_id)) or 0
+
+
+async def token_version_async(db: AsyncSession, user_id: int) -> int:
+    return await db.scalar(_version_query(user_id)) or 0
+
+
+async def load_user_principal_async(db: AsyncSession, user_id: int) -> Optional[Principal]:
+    """Fresh principal by id, bypassing the cache (token refreshes must see blacklisting at once)."""
+    result = await db.execute(_principal_query().where(User.id == user_id))
+    return _to_principal(result.first())
+
+
+def revoke_tokens(db: Session, user_id: int):
+    """Invalidate every token issued to the user so far, once the caller's transaction commits."""
+    increment_counters(db, UserTokenVersion, ["user_id"], [{"user_id": user_id, "version": 1}])
+    db.info.setdefault("revoked_tokens", {})[user_id] = token_version(db, user_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_revocations(session):
+    revoked = session.info.pop("revoked_tokens", None)
+    if revoked:
+        token_versions.update(revoked)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_revocations(session, previous_transaction):
+    if not previous_transaction.nested:
+        session.info.pop("revoked_tokens", None)
@@ -0,0 +1,120 @@
+import asyncio
+import threading
+from collections import defaultdict
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import config
+
+
+class Subscription:
+    """One listener's bounded queue of events, filled from any thread and read on its event loop."""
+
+    def __init__(self, broker, topic: str, queue_size: int):
+        self.broker = broker
+        self.topic = topic
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(queue_size)
+        self.dropped = 0
+
+    def _deliver(self, item):
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            # The listener is falling behind; it is expected to catch up from the database
+            self.dropped += 1
+
+    async def get(self, timeout: float):
+        """Next event, or None if nothing was published within `timeout` seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Broker:
+    """
+    In-process publish/subscribe fan-out. Delivery is best effort and limited to this worker: subscribers
+    must be able to recover missed events from the database, and other workers' events only reach them that way.
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._topics = defaultdict(set)
+        self.published = 0
+
+    def subscribe(self, topic: str) -> Subscription:
+        subscription = Subscription(self, topic, self.queue_size)
+        with self._lock:
+            self._topics[topic].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscribers = self._topics.get(subscription.topic)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._topics[subscription.topic]
+
+    def publish(self, topic: str, item):
+        with self._lock:
+            subscribers = list(self._topics.get(topic, ()))
+            self.published += 1
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._deliver, item)
+            except RuntimeError:
+                # Its event loop is closed; the subscription goes away with it
+                self.unsubscribe(subscription)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "topics": len(self._topics),
+                "subscribers": sum(len(subscribers) for subscribers in self._topics.values()),
+                "published": self.published,
+            }
+
+
+broker = Broker(config.SUPPORT_STREAM_QUEUE_SIZE)
+
+
+def sse_event(data: str, event_id=None, event_type: str = None) -> str:
+    """One server-sent event frame."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event_type:
+        lines.append(f"event: {event_type}")
+    lines.extend(f"data: {line}" for line in data.splitlines() or [""])
+    return "\n".join(lines) + "\n\n"
+
+
+# Events are only published once the transaction that produced them commits
+
+def publish_on_commit(db: Session, topic: str, item):
+    db.info.setdefault("publish_pending", []).append((topic, item))
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending(session):
+    for topic, item in session.info.pop("publish_pending", ()):
+        broker.publish(topic, item)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_pending(session, previous_transaction):
+    if not previous_transaction.nested:
+        session.info.pop("publish_pending", None)
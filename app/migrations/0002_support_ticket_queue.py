@@ -0,0 +1,19 @@
+"""Denormalized support ticket priority, backfilled from the subjects, and the dispatch queue index."""
+from sqlalchemy import select, text, update
+
+from app.migrations import has_column, has_index
+from app.models.support import SupportSubject, SupportTicket
+
+
+def upgrade(connection):
+    if not has_column(connection, "support_tickets", "priority"):
+        connection.execute(text("ALTER TABLE support_tickets ADD COLUMN priority INTEGER NOT NULL DEFAULT 1"))
+    connection.execute(
+        update(SupportTicket)
+        .values(priority=select(SupportSubject.priority)
+                .where(SupportSubject.id == SupportTicket.subject_id)
+                .scalar_subquery())
+    )
+    index = next(index for index in SupportTicket.__table__.indexes if index.name == "ix_support_tickets_queue")
+    if not has_index(connection, "support_tickets", index.name):
+        index.create(bind=connection)
@@ -0,0 +1,9 @@
+"""Index support messages by (ticket_id, id) for conversation reads and stream catch-up."""
+from app.migrations import has_index
+from app.models.support import SupportMessages
+
+
+def upgrade(connection):
+    for index in SupportMessages.__table__.indexes:
+        if not has_index(connection, SupportMessages.__tablename__, index.name):
+            index.create(bind=connection)
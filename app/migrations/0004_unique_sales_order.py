@@ -0,0 +1,33 @@
+"""
+One sales ledger entry per order. Orders paid twice concurrently before this could be recorded twice: the
+later duplicate headers and their lines are removed and the rollups of the days they touched are rebuilt.
+"""
+from sqlalchemy import delete, func, inspect, select
+from sqlalchemy.orm import Session
+
+from app.commands.rebuild_sales_rollups import rebuild_sales_rollups
+from app.migrations import has_index
+from app.models.sales import Sales, ItemSales
+
+NAME = "uq_sales_order_id"
+
+
+def upgrade(connection):
+    inspector = inspect(connection)
+    if any(constraint["name"] == NAME for constraint in inspector.get_unique_constraints(Sales.__tablename__)):
+        return
+    if has_index(connection, Sales.__tablename__, NAME):
+        return
+
+    first = select(func.min(Sales.id)).group_by(Sales.order_id)
+    duplicates = connection.execute(select(Sales.id, Sales.date).where(Sales.id.not_in(first))).all()
+    if duplicates:
+        duplicate_ids = [sales_id for sales_id, _ in duplicates]
+        connection.execute(delete(ItemSales).where(ItemSales.sales_id.in_(duplicate_ids)))
+        connection.execute(delete(Sales).where(Sales.id.in_(duplicate_ids)))
+        days = [day.date() for _, day in duplicates]
+        with Session(bind=connection) as db:
+            rebuild_sales_rollups(db, min(days), max(days))
+
+    # A unique index rather than ALTER TABLE ... ADD CONSTRAINT, which SQLite does not support
+    connection.exec_driver_sql(f"CREATE UNIQUE INDEX {NAME} ON {Sales.__tablename__} (order_id)")
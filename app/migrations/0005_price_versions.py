@@ -0,0 +1,8 @@
+"""Shared price version, read with every order quote to validate the per-worker price caches."""
+from app.migrations import has_table
+from app.models.product import PriceVersion
+
+
+def upgrade(connection):
+    if not has_table(connection, PriceVersion.__tablename__):
+        PriceVersion.__table__.create(bind=connection)
@@ -0,0 +1,12 @@
+"""
+Order lines keep the unit list price they were quoted, for the sales ledger. Existing lines stay NULL: the
+price they were quoted is not known, and recording them falls back to the product's current price.
+"""
+from sqlalchemy import text
+
+from app.migrations import has_column
+
+
+def upgrade(connection):
+    if not has_column(connection, "order_products", "unit_price"):
+        connection.execute(text("ALTER TABLE order_products ADD COLUMN unit_price FLOAT"))
@@ -0,0 +1,8 @@
+"""Log of searchable rows written, read by every worker to keep its search index current."""
+from app.migrations import has_table
+from app.models.search import SearchChange
+
+
+def upgrade(connection):
+    if not has_table(connection, SearchChange.__tablename__):
+        SearchChange.__table__.create(bind=connection)
@@ -0,0 +1,68 @@
+"""
+Schema migrations. Each module in this package named NNNN_description.py defines `upgrade(connection)` and
+runs once, in version order; applied versions are recorded in the schema_migrations table. Migrations run
+from a deploy step (python -m app.commands.migrate), never when the app is imported.
+
+Migrations must be safe to run against a schema that already has their change (the baseline creates the
+current models on an empty database), so use the has_* helpers before altering anything.
+"""
+import importlib
+import pkgutil
+import re
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, inspect, select
+
+_version = re.compile(r"^(\d{4})_\w+$")
+
+schema_migrations = Table(
+    "schema_migrations", MetaData(),
+    Column("version", String(100), primary_key=True),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def available() -> list:
+    """(version, module name) of every migration in this package, oldest first."""
+    return sorted((name, f"{__name__}.{name}") for _, name, _ in pkgutil.iter_modules(__path__)
+                  if _version.match(name))
+
+
+def applied(connection) -> set:
+    if not inspect(connection).has_table(schema_migrations.name):
+        return set()
+    return set(connection.scalars(select(schema_migrations.c.version)))
+
+
+def pending(engine) -> list:
+    with engine.connect() as connection:
+        done = applied(connection)
+    return [version for version, _ in available() if version not in done]
+
+
+def migrate(engine, target: str = None) -> list:
+    """Apply every pending migration up to `target` (inclusive), each in its own transaction."""
+    schema_migrations.create(engine, checkfirst=True)
+    ran = []
+    for version, module in available():
+        if target is not None and version > target:
+            break
+        with engine.begin() as connection:
+            if version in applied(connection):
+                continue
+            importlib.import_module(module).upgrade(connection)
+            connection.execute(schema_migrations.insert().values(version=version, applied_at=datetime.now()))
+        ran.append(version)
+    return ran
+
+
+def has_table(connection, table: str) -> bool:
+    return inspect(connection).has_table(table)
+
+
+def has_column(connection, table: str, column: str) -> bool:
+    return any(found["name"] == column for found in inspect(connection).get_columns(table))
+
+
+def has_index(connection, table: str, index: str) -> bool:
+    return any(found["name"] == index for found in inspect(connection).get_indexes(table))
@@ -1,5 +1,4 @@
-
-import app.common.utils as utils
+# Model Imports
 import app.models.sales as sales
 import app.models.user as user
 import app.models.discount as discount
@@ -8,6 +7,7 @@ import app.models.category as category
 import app.models.review as review
 import app.models.order as order
 import app.models.support as support
+import app.models.search as search
 
-order.OrderResponse.model_rebuild()
-order.OrderProductUpdate.model_rebuild()
\ No newline at end of file
+# The order schemas' forward references all resolve within app.models.order, so Pydantic builds them on
+# first use instead of here
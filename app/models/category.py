@@ -54,7 +54,8 @@ class CategoryUpdateName(BaseModel):
     name: str
 
 
-from app.models.product import ProductCategoriesResponse
+from app.models.product import ProductCategoriesResponse, ProductPageResponse
 
 CategoryProductsResponse.model_rebuild()
 ProductCategoriesResponse.model_rebuild()
+ProductPageResponse.model_rebuild()
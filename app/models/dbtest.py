@@ -1,8 +0,0 @@
-from app.infrastructure.database import Base, engine
-
-print("=====================")
-Base.metadata.create_all(bind=engine)
-
-
-
-
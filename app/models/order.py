@@ -3,9 +3,9 @@ from enum import Enum
 from typing import Optional, List
 
 from app.infrastructure.database import Base
-from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from app.models.discount import DiscountResponse
 
 
@@ -23,6 +23,7 @@ class OrderProduct(Base):
     product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
     quantity = Column(Integer, default=1, nullable=False)
     total_price = Column(Float, default=0, nullable=False)
+    unit_price = Column(Float, nullable=True)  # list price when the line was last priced; NULL on older lines
 
     order = relationship("Order", back_populates="order_products")
     product = relationship("Product", back_populates="order_products")
@@ -40,12 +41,29 @@ class Order(Base):
     user = relationship("User", back_populates="orders")
     discount = relationship("Discount", back_populates="orders")
     order_products = relationship("OrderProduct", back_populates="order", cascade="all,delete,delete-orphan")
-    sales = relationship("Sales", back_populates="order", cascade="all,delete,delete-orphan")
+    sales = relationship("Sales", back_populates="order")
+    reservation = relationship("OrderReservation", back_populates="order", uselist=False,
+                               cascade="all,delete,delete-orphan")
+
+    # Back the newest-first keyset pages of order history, per user and across users
+    __table_args__ = (
+        Index("ix_orders_user_created_id", "user_id", "created_at", "id"),
+        Index("ix_orders_created_id", "created_at", "id"),
+    )
+
+
+class OrderReservation(Base):
+    """Stock held for a PENDING order. The row exists exactly as long as the stock is still deducted for it."""
+    __tablename__ = "order_reservations"
+    order_id = Column(Integer, ForeignKey("orders.id"), primary_key=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+    order = relationship("Order", back_populates="reservation")
 
 
 class OrderProductCreate(BaseModel):
     product_id: int
-    quantity: int = 1
+    quantity: int = Field(default=1, gt=0)
 
 
 class OrderCreate(BaseModel):
@@ -53,7 +71,7 @@ class OrderCreate(BaseModel):
 
 
 class OrderProductUpdate(BaseModel):
-    quantity: int = 1
+    quantity: int = Field(default=1, gt=0)
 
 
 class OrderUpdate(BaseModel):
@@ -73,6 +91,11 @@ class OrderProductResponse(BaseModel):
         from_attributes = True
 
 
+class OrderPageResponse(BaseModel):
+    items: List["OrderResponse"]
+    next_cursor: Optional[str] = None
+
+
 class OrderResponse(BaseModel):
     id: int
     user_id: int
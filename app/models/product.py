@@ -26,11 +26,21 @@ class Product(Base):
 
     categories = relationship("Category", secondary=product_categories, back_populates="products")
     discount = relationship("Discount", back_populates="products")
-    all_reviews = relationship("Review", back_populates="product")
+    all_reviews = relationship("Review", back_populates="product", cascade="all,delete,delete-orphan")
     order_products = relationship("OrderProduct", back_populates="product")
     item_sales = relationship("ItemSales", back_populates="product")
 
 
+class PriceVersion(Base):
+    """
+    A single row bumped by every commit that can change what a product costs (price, discounts, category
+    membership), so each worker can tell with one primary key read whether its cached prices are current.
+    """
+    __tablename__ = "price_versions"
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
 class ProductCreate(BaseModel):
     name: str
     description: str
@@ -66,3 +76,11 @@ class ProductCategoriesResponse(ProductResponse):
     class Config:
         from_attributes = True
         defer_build = True
+
+
+class ProductPageResponse(BaseModel):
+    items: List["ProductCategoriesResponse"]
+    next_cursor: Optional[str] = None
+
+    class Config:
+        defer_build = True
@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from sqlalchemy import Column, Integer, Text, DateTime, ForeignKey, String
 from sqlalchemy.orm import relationship
 
@@ -23,14 +23,43 @@ class Review(Base):
     product = relationship("Product", back_populates="all_reviews")
 
 
+class ReviewStatsMixin:
+    """Running review totals, kept in step with the reviews table by review_services."""
+    review_count = Column(Integer, nullable=False, default=0)
+    rating_sum = Column(Integer, nullable=False, default=0)
+    rating_1 = Column(Integer, nullable=False, default=0)
+    rating_2 = Column(Integer, nullable=False, default=0)
+    rating_3 = Column(Integer, nullable=False, default=0)
+    rating_4 = Column(Integer, nullable=False, default=0)
+    rating_5 = Column(Integer, nullable=False, default=0)
+
+    @property
+    def average_rating(self) -> float:
+        return self.rating_sum / self.review_count if self.review_count else 0
+
+    @property
+    def rating_histogram(self) -> dict:
+        return {rating: getattr(self, f"rating_{rating}") for rating in range(1, 6)}
+
+
+class ProductReviewStats(ReviewStatsMixin, Base):
+    __tablename__ = "product_review_stats"
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+
+
+class UserReviewStats(ReviewStatsMixin, Base):
+    __tablename__ = "user_review_stats"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+
+
 class ReviewCreate(BaseModel):
     product_id: int
-    rating: int
+    rating: int = Field(ge=1, le=5)
     comment: str
 
 
 class ReviewUpdate(BaseModel):
-    rating: Optional[int] = None
+    rating: Optional[int] = Field(default=None, ge=1, le=5)
     comment: Optional[str] = None
 
 
@@ -38,7 +67,7 @@ class ReviewResponse(BaseModel):
     id: int
     user_id: int
     product_id: int
-    rating: int
+    rating: int  # 1-5 is enforced on input only, so rows written before that still serialize
     comment: str
     created_at: datetime
 
@@ -50,6 +79,7 @@ class UserReviewsResponse(UserResponsePublic):
     reviews: list[ReviewResponse]
     total_reviews: int
     average_rating: float
+    rating_histogram: dict[int, int]
 
     class Config:
         from_attributes = True
@@ -59,6 +89,7 @@ class ProductReviewsResponse(ProductResponse):
     reviews: list[ReviewResponse]
     total_reviews: int
     average_rating: float
+    rating_histogram: dict[int, int]
 
     class Config:
         from_attributes = True
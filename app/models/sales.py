@@ -1,8 +1,8 @@
-from datetime import datetime
-from typing import List
+from datetime import datetime, date
+from typing import List, Optional
 
 from pydantic import BaseModel
-from sqlalchemy import Column, Integer, ForeignKey, Float, DateTime
+from sqlalchemy import Column, Integer, ForeignKey, Float, DateTime, Date, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 
 from app.infrastructure.database import Base
@@ -14,7 +14,7 @@ class Sales(Base):
     __tablename__ = "sales"
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False)
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False, index=True)
     status = Column(Integer, default=OrderStatus.PAID.value, nullable=False)
     order_discount = Column(Integer, default=0)
     total_price = Column(Float, nullable=False)
@@ -24,6 +24,9 @@ class Sales(Base):
     order = relationship("Order", back_populates="sales")
     item_sales = relationship("ItemSales", back_populates="sales")
 
+    # One ledger entry per order, however many times recording it is attempted
+    __table_args__ = (UniqueConstraint("order_id", name="uq_sales_order_id"),)
+
 
 class ItemSales(Base):
     __tablename__ = "item_sales"
@@ -39,6 +42,30 @@ class ItemSales(Base):
     product = relationship("Product", back_populates="item_sales")
 
 
+class DailySalesMixin:
+    """Totals of the ItemSales lines sold on one day, maintained by sales_services.record_sales."""
+    date = Column(Date, primary_key=True)
+    quantity = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0)
+    discount = Column(Float, nullable=False, default=0)
+    lines = Column(Integer, nullable=False, default=0)
+
+
+class DailyProductSales(DailySalesMixin, Base):
+    __tablename__ = "daily_product_sales"
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+
+    __table_args__ = (Index("ix_daily_product_sales_product_date", "product_id", "date"),)
+
+
+class DailyCategorySales(DailySalesMixin, Base):
+    """A product in several categories counts towards each of them."""
+    __tablename__ = "daily_category_sales"
+    category_id = Column(Integer, ForeignKey("categories.id"), primary_key=True)
+
+    __table_args__ = (Index("ix_daily_category_sales_category_date", "category_id", "date"),)
+
+
 class SalesResponse(BaseModel):
     id: int
     user_id: int
@@ -65,6 +92,27 @@ class ItemSalesResponse(BaseModel):
         from_attributes = True
 
 
+class SalesTotalsResponse(BaseModel):
+    quantity: int
+    revenue: float
+    discount: float
+    lines: int
+
+
+class DailySalesResponse(SalesTotalsResponse):
+    date: date
+
+
+class ProductSalesResponse(SalesTotalsResponse):
+    product_id: int
+    name: Optional[str] = None
+
+
+class CategorySalesResponse(SalesTotalsResponse):
+    category_id: int
+    name: Optional[str] = None
+
+
 class SalesDetailedResponse(SalesResponse):
     user: "UserResponse"
     order: "OrderResponse"
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, DateTime, Index
+
+from app.infrastructure.database import Base
+
+
+class SearchChange(Base):
+    """
+    A searchable row written through an ORM session, logged in the writing transaction so every worker can
+    bring its search index up to date with what the others committed. Old rows are deleted as new ones come in.
+    """
+    __tablename__ = "search_changes"
+    id = Column(Integer, primary_key=True)
+    entity = Column(String(20), nullable=False)
+    doc_id = Column(Integer, nullable=False)
+    changed_at = Column(DateTime, nullable=False, index=True)
+
+
+# Delta reads: the changes of one entity after a given id
+Index("ix_search_changes_entity_id", SearchChange.entity, SearchChange.id)
@@ -2,7 +2,7 @@ from datetime import datetime
 from typing import Optional
 
 from pydantic import BaseModel
-from sqlalchemy import Column, Integer, ForeignKey, String, Text, DateTime, Boolean
+from sqlalchemy import Column, Integer, ForeignKey, String, Text, DateTime, Boolean, Index
 from sqlalchemy.orm import relationship
 
 from app.infrastructure.database import Base
@@ -26,12 +26,20 @@ class SupportTicket(Base):
     status = Column(String(255), default="open", nullable=False, index=True, comment="open, closed, pending")
     resolved_at = Column(DateTime, default=None, nullable=True)  # Adjusted for clarity
     assignee = Column(Integer, ForeignKey("users.id"), nullable=True)  # Nullable for unassigned tickets
+    # Copy of the subject's priority, so the dispatch queue is served by one index
+    priority = Column(Integer, default=1, server_default="1", nullable=False)
 
     user = relationship("User", back_populates="tickets", foreign_keys=[user_id])
     support_agent = relationship("User", back_populates="assigned_tickets", foreign_keys=[assignee])
     subject = relationship("SupportSubject", back_populates="tickets")
     messages = relationship("SupportMessages", back_populates="ticket")
 
+
+# Dispatch queue: unassigned tickets of a status, highest priority first, then oldest first
+Index("ix_support_tickets_queue", SupportTicket.status, SupportTicket.assignee, SupportTicket.priority.desc(),
+      SupportTicket.created_at, SupportTicket.id)
+
+
 class SupportMessages(Base):
     __tablename__ = "support_messages"
     id = Column(Integer, primary_key=True, index=True)
@@ -44,6 +52,9 @@ class SupportMessages(Base):
     ticket = relationship("SupportTicket", back_populates="messages")
     user = relationship("User", back_populates="ticket_messages")
 
+    # A ticket's conversation, and the delta after a given message, as one range scan
+    __table_args__ = (Index("ix_support_messages_ticket_id_id", "ticket_id", "id"),)
+
 
 class SupportSubjectCreate(BaseModel):
     name: str
@@ -81,6 +92,7 @@ class SupportTicketResponse(BaseModel):
     status: str
     resolved_at: Optional[datetime] = None
     assignee: Optional[int] = None
+    priority: int = 1
 
 
 class SupportSubjectResponse(BaseModel):
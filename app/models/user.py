@@ -30,15 +30,31 @@ class User(Base):
 
     reviews = relationship("Review", back_populates="user", cascade="all,delete,delete-orphan")
     orders = relationship("Order", back_populates="user", cascade="all,delete,delete-orphan")
-    sales = relationship("Sales", back_populates="user", cascade="all,delete,delete-orphan")
+    sales = relationship("Sales", back_populates="user")
     tickets = relationship("SupportTicket",back_populates="user",foreign_keys=[SupportTicket.user_id])
     assigned_tickets = relationship("SupportTicket",back_populates="support_agent",foreign_keys=[SupportTicket.assignee])
     ticket_messages = relationship("SupportMessages",back_populates="user",cascade="all,delete,delete-orphan")
 
 
+class UserTokenVersion(Base):
+    """
+    Bumped whenever a user's tokens must stop working (blacklisting, role change, deletion). Only users whose
+    tokens were ever revoked have a row, so every worker can keep the whole table in memory.
+    """
+    __tablename__ = "user_token_versions"
+    user_id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 
 # Pydantic model for user creation (input)
@@ -0,0 +1,59 @@
+import http
+
+from fastapi import APIRouter, Depends
+
+from app.dependencies import get_current_admin
+from app.infrastructure.cache import catalog_cache
+from app.infrastructure.database import engine, async_engine, pool_status
+from app.infrastructure.events import task_queue
+from app.infrastructure.instrumentation import sql_metrics
+from app.infrastructure.passwords import password_hasher
+from app.infrastructure.auth import token_cache
+from app.infrastructure.pubsub import broker
+from app.infrastructure.principals import Principal, principal_cache, token_versions
+from app.services.pricing_services import price_cache_stats
+
+router = APIRouter()
+
+
+@router.get("/pool", response_model=dict)
+def get_pool_status(admin: Principal = Depends(get_current_admin)):
+    """Connection pool usage and wait-time counters. (requires admin authentication)"""
+    return {"sync": pool_status(engine), "async": pool_status(async_engine)}
+
+
+@router.get("/passwords", response_model=dict)
+def get_password_hasher_status(admin: Principal = Depends(get_current_admin)):
+    """Password hashing pool queue depth and latency. (requires admin authentication)"""
+    return password_hasher.stats()
+
+
+@router.get("/cache", response_model=dict)
+def get_cache_status(admin: Principal = Depends(get_current_admin)):
+    """Hit, miss and revalidation counters of the in-process caches. (requires admin authentication)"""
+    return {"catalog": catalog_cache.stats(), "prices": price_cache_stats(), "principals": principal_cache.stats(),
+            "tokens": token_cache.stats(), "token_versions": token_versions.stats()}
+
+
+@router.delete("/cache", status_code=http.HTTPStatus.NO_CONTENT.value)
+def clear_catalog_cache(admin: Principal = Depends(get_current_admin)):
+    """Drop every cached catalog response in this worker. (requires admin authentication)"""
+    catalog_cache.clear()
+
+
+@router.get("/events", response_model=dict)
+def get_event_queue_status(admin: Principal = Depends(get_current_admin)):
+    """Post-commit task queue depth, retries and failures, and live streams. (requires admin authentication)"""
+    return {**task_queue.stats(), "streams": broker.stats()}
+
+
+@router.get("/sql", response_model=dict)
+def get_sql_metrics(admin: Principal = Depends(get_current_admin)):
+    """Statement counts, SQL time and likely N+1 patterns per route. (requires admin authentication)"""
+    return sql_metrics.as_dict()
+
+
+@router.delete("/sql", status_code=http.HTTPStatus.NO_CONTENT.value)
+def reset_sql_metrics(admin: Principal = Depends(get_current_admin)):
+    """Reset the per-route SQL metrics. (requires admin authentication)"""
+    sql_metrics.reset()
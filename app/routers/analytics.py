@@ -0,0 +1,47 @@
+from datetime import date, timedelta
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app.dependencies import get_db, get_current_admin
+from app.infrastructure.principals import Principal
+from app.models.sales import DailySalesResponse, ProductSalesResponse, CategorySalesResponse
+from app.services import analytics_services
+
+router = APIRouter()
+
+
+def _default_start():
+    return date.today() - timedelta(days=30)
+
+
+@router.get("/revenue", response_model=List[DailySalesResponse])
+def get_daily_revenue(start: date = Query(default_factory=_default_start),
+                      end: date = Query(default_factory=date.today),
+                      product_id: Optional[int] = Query(None),
+                      category_id: Optional[int] = Query(None),
+                      db: Session = Depends(get_db),
+                      admin: Principal = Depends(get_current_admin)):
+    """Revenue per day, optionally for one product or one category. (requires admin authentication)"""
+    return analytics_services.daily_revenue(db, start, end, product_id, category_id)
+
+
+@router.get("/products/top", response_model=List[ProductSalesResponse])
+def get_top_products(start: date = Query(default_factory=_default_start),
+                     end: date = Query(default_factory=date.today),
+                     limit: int = Query(10, ge=1, le=100),
+                     by: str = Query("revenue", pattern="^(revenue|quantity)$"),
+                     db: Session = Depends(get_db),
+                     admin: Principal = Depends(get_current_admin)):
+    """Best-selling products by revenue or quantity. (requires admin authentication)"""
+    return analytics_services.top_products(db, start, end, limit, by)
+
+
+@router.get("/categories", response_model=List[CategorySalesResponse])
+def get_category_revenue(start: date = Query(default_factory=_default_start),
+                         end: date = Query(default_factory=date.today),
+                         db: Session = Depends(get_db),
+                         admin: Principal = Depends(get_current_admin)):
+    """Revenue per category. (requires admin authentication)"""
+    return analytics_services.category_revenue(db, start, end)
@@ -1,30 +1,51 @@
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-
-from app.dependencies import get_db
-from app.infrastructure.auth import create_access_token
-from app.models.user import UserResponse, UserCreate, Token
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import config
+from app.dependencies import check_user
+from app.infrastructure.database import get_async_db
+from app.infrastructure.auth import create_access_token, create_token_pair, decode_token
+from app.infrastructure.principals import load_user_principal_async, token_version_async
+from app.models.user import UserResponse, UserCreate, Token, RefreshRequest
 from app.services import user_services
 
 router = APIRouter()
 
 
 @router.post("/", response_model=UserResponse)
-def create_new_user(user: UserCreate, db: Session = Depends(get_db)):
+async def create_new_user(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """Create a new user."""
-    db_user = user_services.create_user(db, user)
+    db_user = await user_services.create_user_async(db, user)
     return db_user
 
 
 @router.post("/token", response_model=Token)
-def login_for_access_token(db: Session = Depends(get_db),
-                           form_data: OAuth2PasswordRequestForm = Depends()):
+async def login_for_access_token(db: AsyncSession = Depends(get_async_db),
+                                 form_data: OAuth2PasswordRequestForm = Depends()):
     """Login endpoint to generate a JWT token."""
-    user = user_services.authenticate_user(db, form_data.username, form_data.password)
+    user = await user_services.authenticate_user_async(db, form_data.username, form_data.password)
 
     if not user:
         raise HTTPException(status_code=400, detail="Incorrect username or password")
 
+    if config.AUTH_MODE == "stateless":
+        # Stateless tokens are never checked against the user row again, so blacklisting is enforced here
+        check_user(user)
+        return create_token_pair(user.id, user.username, user.admin, await token_version_async(db, user.id))
     access_token = create_access_token(data={"sub": user.username})
     return {"access_token": access_token, "token_type": "bearer"}
+
+
+@router.post("/refresh", response_model=Token)
+async def refresh_access_token(request: RefreshRequest, db: AsyncSession = Depends(get_async_db)):
+    """Trade a refresh token for a new token pair, unless the user's tokens were revoked since."""
+    claims = decode_token(request.refresh_token)
+    if claims.get("typ") != "refresh":
+        raise HTTPException(status_code=401, detail="Invalid token")
+    version = await token_version_async(db, claims["uid"])
+    if claims["ver"] < version:
+        raise HTTPException(status_code=401, detail="Token revoked")
+    principal = await load_user_principal_async(db, claims["uid"])
+    check_user(principal)
+    return create_token_pair(principal.id, principal.username, principal.admin, version)
@@ -1,29 +1,36 @@
 from typing import List
-from fastapi import APIRouter, Depends
+
+from pydantic import RootModel
+from fastapi import APIRouter, Depends, Request
 from sqlalchemy.orm import Session
-from app.dependencies import get_db, get_current_user, get_current_admin
+from app.dependencies import get_db, get_current_principal, get_current_admin
 import app.services.category_services as category_service
 from app.models.category import CategoryCreate, CategoryResponse, CategoryUpdateName, CategoryResponse, \
     CategoryProductsResponse
 from app.models.discount import DiscountResponse
-from app.models.user import User
+from app.infrastructure.cache import catalog_cache
+from app.infrastructure.principals import Principal
 from app.services import discount_services
 
 router = APIRouter()
+CategoryList = RootModel[List[CategoryResponse]]
 
 
 @router.get("/", response_model=List[CategoryResponse])
-def read_categories(db: Session = Depends(get_db),
-                    admin: User = Depends(get_current_admin)):
-    """Get a list of all categories. (requires authentication)"""
-    categories = category_service.get_all_categories(db)
-    return categories
+def read_categories(request: Request,
+                    db: Session = Depends(get_db),
+                    admin: Principal = Depends(get_current_admin)):
+    """Get a list of all categories. Supports ETag / If-None-Match revalidation. (requires authentication)"""
+    return catalog_cache.serve(
+        request, "categories",
+        lambda: CategoryList.model_validate(category_service.get_all_categories(db)),
+        tags=("categories",))
 
 
 @router.post("/", response_model=CategoryResponse)
 def create_category(category: CategoryCreate,
                     db: Session = Depends(get_db),
-                    admin: User = Depends(get_current_admin)):
+                    admin: Principal = Depends(get_current_admin)):
     """Create a new category. (requires admin authentication)"""
     db_category = category_service.create_category(db, category)
     return db_category
@@ -34,7 +41,7 @@ def add_product_to_category(
         category_id: int,
         product_id: int,
         db: Session = Depends(get_db),
-        admin: User = Depends(get_current_admin)
+        admin: Principal = Depends(get_current_admin)
 ):
     return category_service.add_product_to_category(db, category_id, product_id)
 
@@ -44,7 +51,7 @@ def remove_product_from_category(
         category_id: int,
         product_id: int,
         db: Session = Depends(get_db),
-        admin: User = Depends(get_current_admin)
+        admin: Principal = Depends(get_current_admin)
 ):
     return category_service.remove_product_from_category(db, category_id, product_id)
 
@@ -52,7 +59,7 @@ def remove_product_from_category(
 @router.get("/search", response_model=List[CategoryResponse])
 def search_category_by_name(query: str,
                             db: Session = Depends(get_db),
-                            user: User = Depends(get_current_user)):
+                            user: Principal = Depends(get_current_principal)):
     """Retrieve a list of category with names that match the query. (requires authentication)"""
     categories = category_service.find_category_by_name(db, query)
     return categories
@@ -61,7 +68,7 @@ def search_category_by_name(query: str,
 @router.put("/name", response_model=CategoryResponse)
 def update_category_name(category: CategoryUpdateName,
                          db: Session = Depends(get_db),
-                         admin: User = Depends(get_current_admin)):
+                         admin: Principal = Depends(get_current_admin)):
     """Update the name of a category. (requires admin authentication)"""
     updated_category = category_service.update_category_name(db, category.id, category.name)
     return updated_category
@@ -69,17 +76,19 @@ def update_category_name(category: CategoryUpdateName,
 
 @router.get("/{category_id}", response_model=CategoryProductsResponse)
 def read_category(category_id: int,
+                  request: Request,
                   db: Session = Depends(get_db),
-                  user: User = Depends(get_current_user)):
-    """Retrieve a category by ID. (requires authentication)"""
-    category = category_service.get_category_by_id(db, category_id)
-    return category
+                  user: Principal = Depends(get_current_principal)):
+    """Retrieve a category by ID. Supports ETag / If-None-Match revalidation. (requires authentication)"""
+    return catalog_cache.serve(
+        request, f"categories:{category_id}",
+        lambda: CategoryProductsResponse.model_validate(category_service.get_category_by_id(db, category_id)))
 
 
 @router.delete("/{category_id}", response_model=CategoryProductsResponse)
 def delete_category(category_id: int,
                     db: Session = Depends(get_db),
-                    admin: User = Depends(get_current_admin)):
+                    admin: Principal = Depends(get_current_admin)):
     """Delete a category. (requires admin authentication)"""
     del_category = category_service.delete_category(db, category_id)
     return del_category
@@ -88,6 +97,6 @@ def delete_category(category_id: int,
 @router.get("/{category_id}/discount", response_model=DiscountResponse)
 def get_category_discount(category_id: int,
                           db: Session = Depends(get_db),
-                          user: User = Depends(get_current_user)):
+                          user: Principal = Depends(get_current_principal)):
     """Get discount applied to a category"""
     return discount_services.get_category_discount(db, category_id)
@@ -2,11 +2,11 @@ from typing import List
 
 from fastapi import APIRouter, Depends, status
 from sqlalchemy.orm import Session
-from app.dependencies import get_db, get_current_admin, get_current_user
+from app.dependencies import get_db, get_current_admin, get_current_principal
 from app.models.category import CategoryResponse, CategoryProductsResponse
 from app.models.discount import DiscountResponse, DiscountCreate, DiscountUpdate
 from app.models.product import ProductResponse
-from app.models.user import User
+from app.infrastructure.principals import Principal
 from app.services import discount_services
 
 router = APIRouter()
@@ -14,7 +14,7 @@ router = APIRouter()
 
 @router.get("/", response_model=List[DiscountResponse])
 def get_all_discounts(db: Session = Depends(get_db),
-                      user: User = Depends(get_current_user)):
+                      user: Principal = Depends(get_current_principal)):
     """Get all discounts"""
     return discount_services.get_all_discounts(db)
 
@@ -22,7 +22,7 @@ def get_all_discounts(db: Session = Depends(get_db),
 @router.get("/{discount_id}", response_model=DiscountResponse)
 def get_discount(discount_id: int,
                  db: Session = Depends(get_db),
-                 user: User = Depends(get_current_user)):
+                 user: Principal = Depends(get_current_principal)):
     """Get a discount by ID"""
     return discount_services.get_discount_by_id(db, discount_id)
 
@@ -30,7 +30,7 @@ def get_discount(discount_id: int,
 @router.post("/", response_model=DiscountResponse)
 def create_discount(discount: DiscountCreate,
                     db: Session = Depends(get_db),
-                    user: User = Depends(get_current_user)):
+                    user: Principal = Depends(get_current_principal)):
     """Create a new discount"""
     return discount_services.create_discount(db, discount)
 
@@ -39,7 +39,7 @@ def create_discount(discount: DiscountCreate,
 def update_discount(discount_id: int,
                     discount: DiscountUpdate,
                     db: Session = Depends(get_db),
-                    user: User = Depends(get_current_user)):
+                    user: Principal = Depends(get_current_principal)):
     """Update a discount"""
     return discount_services.update_discount(db, discount_id, discount)
 
@@ -47,7 +47,7 @@ def update_discount(discount_id: int,
 @router.delete("/{discount_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_discount(discount_id: int,
                     db: Session = Depends(get_db),
-                    user: User = Depends(get_current_user)):
+                    user: Principal = Depends(get_current_principal)):
     """Delete a discount"""
     return discount_services.delete_discount(db, discount_id)
 
@@ -56,7 +56,7 @@ def delete_discount(discount_id: int,
 def apply_discount_to_product(discount_id: int,
                               product_id: int,
                               db: Session = Depends(get_db),
-                              user: User = Depends(get_current_user)):
+                              user: Principal = Depends(get_current_principal)):
     """Apply discount to a product"""
     return discount_services.apply_discount_to_product(db, discount_id, product_id)
 
@@ -65,7 +65,7 @@ def apply_discount_to_product(discount_id: int,
 def remove_discount_from_product(discount_id: int,
                                  product_id: int,
                                  db: Session = Depends(get_db),
-                                 user: User = Depends(get_current_user)):
+                                 user: Principal = Depends(get_current_principal)):
     """Remove discount from a product"""
     return discount_services.remove_discount_from_product(db, discount_id, product_id)
 
@@ -74,7 +74,7 @@ def remove_discount_from_product(discount_id: int,
 def apply_discount_to_category(discount_id: int,
                                category_id: int,
                                db: Session = Depends(get_db),
-                               user: User = Depends(get_current_user)):
+                               user: Principal = Depends(get_current_principal)):
     """Apply discount to a category"""
     return discount_services.apply_discount_to_category(db, discount_id, category_id)
 
@@ -83,7 +83,7 @@ def apply_discount_to_category(discount_id: int,
 def remove_discount_from_category(discount_id: int,
                                   category_id: int,
                                   db: Session = Depends(get_db),
-                                  user: User = Depends(get_current_user)):
+                                  user: Principal = Depends(get_current_principal)):
     """Remove discount from a category"""
     return discount_services.remove_discount_from_category(db, discount_id, category_id)
 
@@ -91,7 +91,7 @@ def remove_discount_from_category(discount_id: int,
 @router.get("/{discount_id}/products", response_model=List[ProductResponse])
 def get_discount_products(discount_id: int,
                           db: Session = Depends(get_db),
-                          user: User = Depends(get_current_user)):
+                          user: Principal = Depends(get_current_principal)):
     """Get products with this discount"""
     return discount_services.get_discounted_products(db, discount_id)
 
@@ -99,7 +99,7 @@ def get_discount_products(discount_id: int,
 @router.get("/{discount_id}/categories", response_model=List[CategoryResponse])
 def get_discount_categories(discount_id: int,
                             db: Session = Depends(get_db),
-                            user: User = Depends(get_current_user)):
+                            user: Principal = Depends(get_current_principal)):
     """Get categories with this discount"""
     return discount_services.get_discounted_categories(db, discount_id)
 
@@ -107,6 +107,6 @@ def get_discount_categories(discount_id: int,
 @router.get("/{discount_id}/categories-with-products", response_model=List[CategoryProductsResponse])
 def get_discount_categories_with_products(discount_id: int,
                                           db: Session = Depends(get_db),
-                                          user: User = Depends(get_current_user)):
+                                          user: Principal = Depends(get_current_principal)):
     """Get categories and the products in them with this discount"""
     return discount_services.get_discounted_categories(db, discount_id)
\ No newline at end of file
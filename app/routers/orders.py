@@ -1,75 +1,103 @@
 import http
 
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from app.dependencies import get_db, get_current_user, get_current_admin
-from app.models.order import OrderResponse, OrderCreate, OrderUpdate, OrderProductResponse, OrderProductCreate
-from app.models.user import User
+from app.dependencies import get_db, get_current_principal, get_current_admin, get_current_principal_async, \
+    get_current_admin_async
+from app.infrastructure.database import get_async_db
+from app.models.order import OrderResponse, OrderCreate, OrderUpdate, OrderProductResponse, OrderProductCreate, \
+    OrderPageResponse
+from app.infrastructure.principals import Principal
 from app.services import order_services
 
 router = APIRouter()
 
 
 @router.post("/", response_model=OrderResponse)
-def create_order(order: OrderCreate,
-                 db: Session = Depends(get_db),
-                 user: User = Depends(get_current_user)):
+async def create_order(order: OrderCreate,
+                       db: AsyncSession = Depends(get_async_db),
+                       user: Principal = Depends(get_current_principal_async)):
     """Create a new order"""
-    return order_services.create_order(db, user.id, order)
+    return await order_services.create_order_async(db, user.id, order)
 
 
 @router.get("/{order_id}", response_model=OrderResponse)
-def get_order(order_id: int,
-              db: Session = Depends(get_db),
-              user: User = Depends(get_current_user)):
+async def get_order(order_id: int,
+                    db: AsyncSession = Depends(get_async_db),
+                    user: Principal = Depends(get_current_principal_async)):
     """Get an order by ID"""
-    order = order_services.get_order_by_id(db, order_id)
-    if order.user_id != user.id and not user.admin:
-        raise HTTPException(status_code=403, detail="Not authorized")
-
-    return order
+    return await order_services.get_order_async(db, order_id, user)
 
 
 @router.put("/{order_id}", response_model=OrderResponse)
-def update_order(order_id: int,
-                 order: OrderUpdate,
-                 db: Session = Depends(get_db),
-                 user: User = Depends(get_current_user)):
+async def update_order(order_id: int,
+                       order: OrderUpdate,
+                       db: AsyncSession = Depends(get_async_db),
+                       user: Principal = Depends(get_current_principal_async)):
     """Update an order"""
-    return order_services.update_order(db, order_id, order, user)
+    return await order_services.update_order_async(db, order_id, order, user)
 
 
 @router.post("/{order_id}/advance", response_model=OrderResponse)
 def advance_order(order_id: int,
                   db: Session = Depends(get_db),
-                  admin: User = Depends(get_current_admin)):
+                  admin: Principal = Depends(get_current_admin)):
     """Advance an order"""
     return order_services.advance_order(db, order_id, admin)
 
 
-@router.delete("/{order_id}", status_code=http.HTTPStatus.NO_CONTENT.value)
-def delete_order(order_id: int,
+@router.post("/{order_id}/cancel", response_model=OrderResponse)
+def cancel_order(order_id: int,
                  db: Session = Depends(get_db),
-                 user: User = Depends(get_current_user)):
-    """Delete an order"""
-    return order_services.delete_order(db, order_id, user)
+                 user: Principal = Depends(get_current_principal)):
+    """Cancel an unpaid order and release its reserved stock"""
+    return order_services.cancel_order(db, order_id, user)
 
 
-@router.get("/users/{user_id}/orders", response_model=List[OrderResponse])
-def get_user_orders(user_id: int,
-                    db: Session = Depends(get_db),
-                    user: User = Depends(get_current_user)):
-    """Get all orders for a user"""
+@router.delete("/{order_id}", status_code=http.HTTPStatus.NO_CONTENT.value)
+async def delete_order(order_id: int,
+                       db: AsyncSession = Depends(get_async_db),
+                       user: Principal = Depends(get_current_principal_async)):
+    """Delete an order"""
+    return await order_services.delete_order_async(db, order_id, user)
+
+
+@router.get("/", response_model=OrderPageResponse)
+async def get_orders(cursor: Optional[str] = Query(None),
+                     limit: int = Query(50, ge=1, le=100),
+                     user_id: Optional[int] = Query(None),
+                     status: Optional[int] = Query(None),
+                     created_from: Optional[datetime] = Query(None),
+                     created_to: Optional[datetime] = Query(None),
+                     db: AsyncSession = Depends(get_async_db),
+                     admin: Principal = Depends(get_current_admin_async)):
+    """Get a page of orders of all users, newest first, with optional filters (requires admin authentication)"""
+    return await order_services.get_orders_page_async(db, limit, cursor, user_id, status, created_from, created_to)
+
+
+@router.get("/users/{user_id}/orders", response_model=OrderPageResponse)
+async def get_user_orders(user_id: int,
+                          cursor: Optional[str] = Query(None),
+                          limit: int = Query(50, ge=1, le=100),
+                          status: Optional[int] = Query(None),
+                          created_from: Optional[datetime] = Query(None),
+                          created_to: Optional[datetime] = Query(None),
+                          db: AsyncSession = Depends(get_async_db),
+                          user: Principal = Depends(get_current_principal_async)):
+    """Get a page of a user's orders, newest first, optionally filtered by status and creation date"""
     if user.id != user_id and not user.admin:
         raise HTTPException(status_code=403, detail="Not authorized")
-    return user.orders
+    return await order_services.get_orders_page_async(db, limit, cursor, user_id, status, created_from, created_to)
 
 
 @router.get("/{order_id}/products", response_model=List[OrderProductResponse])
 def get_order_products(order_id: int,
                        db: Session = Depends(get_db),
-                       user: User = Depends(get_current_user)):
+                       user: Principal = Depends(get_current_principal)):
     """Get all products in an order"""
     return order_services.get_order_products(db, order_id, user)
 
@@ -78,7 +106,7 @@ def get_order_products(order_id: int,
 def add_order_product(order_id: int,
                       order_product: OrderProductCreate,
                       db: Session = Depends(get_db),
-                      user: User = Depends(get_current_user)):
+                      user: Principal = Depends(get_current_principal)):
     """Add a new product to an order"""
     return order_services.add_order_product(db, order_id, order_product, user)
 
@@ -86,9 +114,9 @@ def add_order_product(order_id: int,
 @router.put("/{order_id}/products/{order_product_id}", response_model=OrderProductResponse)
 def update_order_product(order_id: int,
                          order_product_id: int,
-                         quantity: int,
+                         quantity: int = Query(..., gt=0),
                          db: Session = Depends(get_db),
-                         user: User = Depends(get_current_user)):
+                         user: Principal = Depends(get_current_principal)):
     """Update an order product"""
     return order_services.update_order_product(db, order_id, order_product_id, quantity, user)
 
@@ -97,6 +125,6 @@ def update_order_product(order_id: int,
 def remove_order_product(order_id: int,
                          order_product_id: int,
                          db: Session = Depends(get_db),
-                         user: User = Depends(get_current_user)):
+                         user: Principal = Depends(get_current_principal)):
     """Remove a product from an order"""
     return order_services.remove_order_product(db, order_id, order_product_id, user)
@@ -1,30 +1,41 @@
-from typing import List
-from fastapi import APIRouter, Depends, Query
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.dependencies import get_db, get_current_user, get_current_admin
+from app.dependencies import get_db, get_current_principal, get_current_admin, get_current_principal_async
+from app.infrastructure.cache import catalog_cache, invalidate_on_commit
+from app.infrastructure.database import get_async_db
 import app.services.product_services as product_service
 from app.models.discount import DiscountResponse
-from app.models.product import ProductCreate, ProductCategoriesResponse, ProductUpdate, ProductResponse
+from app.models.product import ProductCreate, ProductCategoriesResponse, ProductUpdate, ProductResponse, \
+    ProductPageResponse
 from app.models.review import ProductReviewsResponse
-from app.models.user import User
+from app.infrastructure.principals import Principal
 from app.services import review_services
 import app.services.discount_services as disconut_services
 
 router = APIRouter()
 
 
-@router.get("/", response_model=List[ProductCategoriesResponse])
-def read_products(db: Session = Depends(get_db),
-                  admin: User = Depends(get_current_user)):
-    """Get a list of all products. (requires authentication)"""
-    products = product_service.get_all_products(db)
-    return products
+@router.get("/", response_model=ProductPageResponse)
+async def read_products(cursor: Optional[str] = Query(None),
+                        limit: int = Query(50, ge=1, le=100),
+                        category_id: Optional[int] = Query(None),
+                        discounted: Optional[bool] = Query(None),
+                        in_stock: Optional[bool] = Query(None),
+                        db: AsyncSession = Depends(get_async_db),
+                        user: Principal = Depends(get_current_principal_async)):
+    """
+    Get a page of products ordered by ID, optionally filtered by category, discount and stock.
+    Pass the returned next_cursor to get the following page. (requires authentication)
+    """
+    return await product_service.get_products_page_async(db, limit, cursor, category_id, discounted, in_stock)
 
 
 @router.post("/", response_model=ProductCategoriesResponse)
 def create_product(product: ProductCreate,
                    db: Session = Depends(get_db),
-                   admin: User = Depends(get_current_admin)):
+                   admin: Principal = Depends(get_current_admin)):
     """Create a new product. (requires admin authentication)"""
     db_product = product_service.create_product(db, product)
     return db_product
@@ -33,7 +44,7 @@ def create_product(product: ProductCreate,
 @router.get("/search", response_model=List[ProductCategoriesResponse])
 def search_product_by_name(query: str = Query(min_length=3, max_length=50, alias="q"),
                            db: Session = Depends(get_db),
-                           user: User = Depends(get_current_user)):
+                           user: Principal = Depends(get_current_principal)):
     """Retrieve a list of product with names that match the query. (requires authentication)"""
     products = product_service.find_product_by_name(db, query)
     return products
@@ -43,24 +54,27 @@ def search_product_by_name(query: str = Query(min_length=3, max_length=50, alias
 def update_product(product_id: int,
                    product: ProductUpdate,
                    db: Session = Depends(get_db),
-                   admin: User = Depends(get_current_admin)):
+                   admin: Principal = Depends(get_current_admin)):
     """Update the name of a product. (requires admin authentication)"""
     return product_service.update_product(db, product_id, product)
 
 
 @router.get("/{product_id}", response_model=ProductCategoriesResponse)
-def read_product_by_id(product_id: int,
-                       db: Session = Depends(get_db),
-                       user: User = Depends(get_current_user)):
-    """Retrieve a product by ID. (requires authentication)"""
-    product = product_service.get_product_by_id(db, product_id)
-    return product
+async def read_product_by_id(product_id: int,
+                             request: Request,
+                             db: AsyncSession = Depends(get_async_db),
+                             user: Principal = Depends(get_current_principal_async)):
+    """Retrieve a product by ID. Supports ETag / If-None-Match revalidation. (requires authentication)"""
+    async def load():
+        product = await product_service.get_product_by_id_async(db, product_id)
+        return ProductCategoriesResponse.model_validate(product)
+    return await catalog_cache.serve_async(request, f"products:{product_id}", load)
 
 
 @router.delete("/{product_id}", response_model=ProductCategoriesResponse)
 def delete_product(product_id: int,
                    db: Session = Depends(get_db),
-                   admin: User = Depends(get_current_admin)):
+                   admin: Principal = Depends(get_current_admin)):
     """Delete a product. (requires admin authentication)"""
     del_product = product_service.delete_product(db, product_id)
     return del_product
@@ -70,7 +84,7 @@ def delete_product(product_id: int,
 def get_product_reviews(product_id: int,
                         page: int = Query(1),
                         limit: int = Query(10),
-                        user=Depends(get_current_user),
+                        user=Depends(get_current_principal),
                         db=Depends(get_db)):
     """
     Retrieve product data with a list of reviews by product ID with pagination. (requires authentication)
@@ -84,7 +98,7 @@ def get_product_reviews(product_id: int,
 @router.get("/{product_id}/discount", response_model=DiscountResponse)
 def get_product_discount(product_id: int,
                          db: Session = Depends(get_db),
-                         user: User = Depends(get_current_user)):
+                         user: Principal = Depends(get_current_principal)):
     """Get discount applied to a product"""
     disconut_services.get_product_discount(db, product_id)
 
@@ -92,7 +106,7 @@ def get_product_discount(product_id: int,
 @router.get("/{product_id}/inventory", response_model=dict)
 def get_product_inventory(product_id: int,
                           db: Session = Depends(get_db),
-                          admin: User = Depends(get_current_admin)):
+                          admin: Principal = Depends(get_current_admin)):
     """Get stock of a product. (requires admin authentication)"""
     product = product_service.get_product_by_id(db, product_id)
     return {"id": product.id, "stock": product.stock}
@@ -102,10 +116,12 @@ def get_product_inventory(product_id: int,
 def update_low_product_inventory_threshold(product_id: int,
                                            stock: int = Query(..., alias="s"),
                                            db: Session = Depends(get_db),
-                                           admin: User = Depends(get_current_admin)):
+                                           admin: Principal = Depends(get_current_admin)):
     """Get stock of a product. (requires admin authentication)"""
     product = product_service.get_product_by_id(db, product_id)
-    product.low_stock_threshold = stock; db.commit(); db.refresh(product)
+    product.low_stock_threshold = stock
+    invalidate_on_commit(db, f"product:{product_id}")
+    db.commit(); db.refresh(product)
     return product
 
 
@@ -113,13 +129,13 @@ def update_low_product_inventory_threshold(product_id: int,
 def add_product_inventory(product_id: int,
                           stock: int = Query(..., alias="s"),
                           db: Session = Depends(get_db),
-                          admin: User = Depends(get_current_admin)):
+                          admin: Principal = Depends(get_current_admin)):
     """Add stock of a product. (requires admin authentication)"""
     return product_service.add_product_stock(db, product_id, stock)
 
 
 @router.get("/{product_id}/low-stock-check", response_model=List[ProductResponse])
 def check_for_low_inventory(db: Session = Depends(get_db),
-                            admin: User = Depends(get_current_admin)):
+                            admin: Principal = Depends(get_current_admin)):
     """Check for products that are below the minimum stock level. (requires admin authentication)"""
     return product_service.low_inventory_check(db)
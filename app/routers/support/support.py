@@ -1,10 +1,13 @@
 import http
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.models.user import User
-from app.dependencies import get_db, get_current_user, get_current_admin
+from app.infrastructure.principals import Principal
+from app.dependencies import get_db, get_async_db, get_current_principal, get_current_admin, \
+    get_current_principal_async
 from app.models.support import SupportTicketResponse, SupportTicketCreate, SupportTicketUpdate, SupportMessagesResponse, \
     SupportMessagesCreate, SupportSubjectResponse, SupportSubjectCreate, SupportSubjectUpdate
 import app.services.ticket_services as ticket_services
@@ -16,14 +19,14 @@ router = APIRouter()
 @router.post("/subjects", response_model=SupportSubjectResponse)
 def create_support_subject(subject: SupportSubjectCreate,
                            db: Session = Depends(get_db),
-                           admin: User = Depends(get_current_admin)):
+                           admin: Principal = Depends(get_current_admin)):
     """Create a new support subject"""
     return support_services.create_support_subject(db, subject)
 
 
 @router.get("/subjects", response_model=List[SupportSubjectResponse])
 def get_support_subjects(db: Session = Depends(get_db),
-                         user: User = Depends(get_current_user)):
+                         user: Principal = Depends(get_current_principal)):
     """Retrieve all support subjects"""
     return support_services.get_all_support_subjects(db)
 
@@ -31,7 +34,7 @@ def get_support_subjects(db: Session = Depends(get_db),
 @router.get("/subjects/{subject_id}", response_model=SupportSubjectResponse)
 def get_support_subject(subject_id: int,
                         db: Session = Depends(get_db),
-                        user: User = Depends(get_current_user)):
+                        user: Principal = Depends(get_current_principal)):
     """Retrieve a support subject by ID"""
     return support_services.get_support_subject_by_id(db, subject_id)
 
@@ -40,7 +43,7 @@ def get_support_subject(subject_id: int,
 def update_support_subject(subject_id: int,
                            subject: SupportSubjectUpdate,
                            db: Session = Depends(get_db),
-                           admin: User = Depends(get_current_admin)):
+                           admin: Principal = Depends(get_current_admin)):
     """Update a support subject"""
     return support_services.update_support_subject(db, subject_id, subject)
 
@@ -48,7 +51,7 @@ def update_support_subject(subject_id: int,
 @router.delete("/subjects/{subject_id}", status_code=http.HTTPStatus.NO_CONTENT.value)
 def delete_support_subject(subject_id: int,
                            db: Session = Depends(get_db),
-                           admin: User = Depends(get_current_admin)):
+                           admin: Principal = Depends(get_current_admin)):
     """Delete a support subject"""
     return support_services.delete_support_subject(db, subject_id)
 
@@ -56,7 +59,7 @@ def delete_support_subject(subject_id: int,
 @router.post("/", response_model=SupportTicketResponse)
 def create_support_ticket(ticket: SupportTicketCreate,
                           db: Session = Depends(get_db),
-                          user: User = Depends(get_current_user)):
+                          user: Principal = Depends(get_current_principal)):
     """Create a new support ticket"""
     return ticket_services.create_ticket(db, ticket, user)
 
@@ -65,21 +68,28 @@ def create_support_ticket(ticket: SupportTicketCreate,
 def assign_ticket(ticket_id: int,
                   assignee_id: int,
                   db: Session = Depends(get_db),
-                  admin: User = Depends(get_current_admin)):
+                  admin: Principal = Depends(get_current_admin)):
     """Assign a ticket to an agent"""
     return ticket_services.assign_ticket(db, ticket_id, assignee_id)
 
 
+@router.post("/next", response_model=SupportTicketResponse)
+def take_next_ticket(db: Session = Depends(get_db),
+                     admin: Principal = Depends(get_current_admin)):
+    """Assign the highest priority, oldest open ticket to the calling agent"""
+    return ticket_services.next_ticket(db, admin.id)
+
+
 @router.get("/", response_model=List[SupportTicketResponse])
 def get_all_support_tickets(db: Session = Depends(get_db),
-                            admin: User = Depends(get_current_admin)):
+                            admin: Principal = Depends(get_current_admin)):
     """Retrieve all support tickets"""
     return ticket_services.get_all_tickets(db)
 
 
 @router.get("/my-tickets", response_model=List[SupportTicketResponse])
 def get_my_tickets(db: Session = Depends(get_db),
-                   user: User = Depends(get_current_user)):
+                   user: Principal = Depends(get_current_principal)):
     """Retrieve the current user's support tickets"""
     return ticket_services.get_my_ticket(db, user)
 
@@ -87,7 +97,7 @@ def get_my_tickets(db: Session = Depends(get_db),
 @router.get("/assignee/{assignee_id}", response_model=List[SupportTicketResponse])
 def get_tickets_by_assignee(assignee_id: int,
                             db: Session = Depends(get_db),
-                            admin: User = Depends(get_current_admin)):
+                            admin: Principal = Depends(get_current_admin)):
     """Retrieve support tickets by assignee"""
     return ticket_services.get_tickets_by_assignee(db, assignee_id)
 
@@ -95,7 +105,7 @@ def get_tickets_by_assignee(assignee_id: int,
 @router.get("/status/{status}", response_model=List[SupportTicketResponse])
 def get_tickets_by_status(status: str,
                           db: Session = Depends(get_db),
-                          admin: User = Depends(get_current_admin)):
+                          admin: Principal = Depends(get_current_admin)):
     """Retrieve support tickets by status"""
     return ticket_services.get_tickets_by_status(db, status)
 
@@ -104,7 +114,7 @@ def get_tickets_by_status(status: str,
 @router.get("/{ticket_id}", response_model=SupportTicketResponse)
 def get_support_ticket(ticket_id: int,
                        db: Session = Depends(get_db),
-                       user: User = Depends(get_current_user)):
+                       user: Principal = Depends(get_current_principal)):
     """Retrieve a support ticket by ID"""
     return ticket_services.get_ticket_by_id(db, ticket_id)
 
@@ -113,7 +123,7 @@ def get_support_ticket(ticket_id: int,
 def partial_update_support_ticket(ticket_id: int,
                                   ticket_update: SupportTicketUpdate,
                                   db: Session = Depends(get_db),
-                                  admin: User = Depends(get_current_admin)):
+                                  admin: Principal = Depends(get_current_admin)):
     """Update a support ticket"""
     return ticket_services.update_ticket(db, ticket_id, ticket_update)
 
@@ -121,7 +131,7 @@ def partial_update_support_ticket(ticket_id: int,
 @router.delete("/{ticket_id}", status_code=http.HTTPStatus.NO_CONTENT.value,)
 def delete_support_ticket(ticket_id: int,
                           db: Session = Depends(get_db),
-                          admin: User = Depends(get_current_admin)):
+                          admin: Principal = Depends(get_current_admin)):
     """Delete a support ticket"""
     return ticket_services.delete_ticket(db, ticket_id)
 
@@ -132,14 +142,29 @@ def delete_support_ticket(ticket_id: int,
 def create_support_message(ticket_id: int,
                            message: SupportMessagesCreate,
                            db: Session = Depends(get_db),
-                           user: User = Depends(get_current_user)):
+                           user: Principal = Depends(get_current_principal)):
     """Create a new message in a support ticket"""
     return ticket_services.create_support_message(db, ticket_id, message, user)
 
 
 @router.get("/{ticket_id}/messages/", response_model=List[SupportMessagesResponse])
 def get_support_messages(ticket_id: int,
+                         after_id: int = Query(0, ge=0),
                          db: Session = Depends(get_db),
-                         user: User = Depends(get_current_user)):
-    """Retrieve all messages for a support ticket"""
-    return ticket_services.get_support_messages(db, ticket_id, user)
+                         user: Principal = Depends(get_current_principal)):
+    """Retrieve the messages of a support ticket, only those after message `after_id` when given"""
+    return ticket_services.get_support_messages(db, ticket_id, user, after_id)
+
+
+@router.get("/{ticket_id}/messages/stream")
+async def stream_support_messages(ticket_id: int,
+                                  after_id: int = Query(0, ge=0),
+                                  last_event_id: Optional[str] = Header(None),
+                                  db: AsyncSession = Depends(get_async_db),
+                                  user: Principal = Depends(get_current_principal_async)):
+    """Stream the messages of a support ticket as server-sent events, resuming after Last-Event-ID"""
+    await ticket_services.check_ticket_access_async(db, ticket_id, user)
+    after_id = ticket_services.resume_point(after_id, last_event_id)
+    return StreamingResponse(ticket_services.message_events(ticket_id, after_id),
+                             media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
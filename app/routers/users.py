@@ -1,10 +1,11 @@
 from typing import List
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
-from app.dependencies import get_db, get_current_user, get_current_admin
+from app.dependencies import get_db, get_current_principal, get_current_admin
 import app.services.user_services as user_services
 from app.models.review import UserReviewsResponse
-from app.models.user import UserResponse, User, UserResponsePublic, UserUpdate
+from app.models.user import UserResponse, UserResponsePublic, UserUpdate
+from app.infrastructure.principals import Principal
 from app.services import review_services
 
 router = APIRouter()
@@ -12,7 +13,7 @@ router = APIRouter()
 
 @router.get("/", response_model=List[UserResponse])
 def get_all_users(db: Session = Depends(get_db),
-                  admin: User = Depends(get_current_admin)):
+                  admin: Principal = Depends(get_current_admin)):
     """Get a list of all users (requires admin authentication)."""
     users = user_services.get_all_users(db)
     return users
@@ -21,7 +22,7 @@ def get_all_users(db: Session = Depends(get_db),
 @router.get("/{user_id}", response_model=UserResponsePublic)
 def read_user(user_id: int,
               db: Session = Depends(get_db),
-              user: User = Depends(get_current_user)):
+              user: Principal = Depends(get_current_principal)):
     """Retrieve a user by ID (requires authentication)."""
     return user_services.get_user_by_id(db, user_id)
 
@@ -30,7 +31,7 @@ def read_user(user_id: int,
 def get_user_reviews(user_id: int,
                      page: int = Query(1),
                      limit: int = Query(10),
-                     user=Depends(get_current_user),
+                     user=Depends(get_current_principal),
                      db=Depends(get_db)):
     """
     Retrieve user data and a list of reviews by user ID with pagination (requires authentication).
@@ -44,6 +45,32 @@ def get_user_reviews(user_id: int,
 def update_user_details(user_id: int,
                         user_update: UserUpdate,
                         db: Session = Depends(get_db),
-                        user: User = Depends(get_current_user)):
+                        user: Principal = Depends(get_current_principal)):
     """Update a user's details (requires authentication)."""
     return user_services.update_user_details(db, user_id, user_update)
+
+
+@router.put("/{user_id}/blacklist", response_model=UserResponse)
+def blacklist_user(user_id: int,
+                   blacklisted: bool = Query(True),
+                   db: Session = Depends(get_db),
+                   admin: Principal = Depends(get_current_admin)):
+    """Blacklist or reinstate a user (requires admin authentication)."""
+    return user_services.blacklist_user(db, user_id, blacklisted)
+
+
+@router.put("/{user_id}/admin", response_model=UserResponse)
+def set_user_admin(user_id: int,
+                   admin_rights: bool = Query(True, alias="admin"),
+                   db: Session = Depends(get_db),
+                   admin: Principal = Depends(get_current_admin)):
+    """Grant or withdraw admin rights (requires admin authentication)."""
+    return user_services.set_user_admin(db, user_id, admin_rights)
+
+
+@router.delete("/{user_id}", response_model=UserResponse)
+def delete_user(user_id: int,
+                db: Session = Depends(get_db),
+                admin: Principal = Depends(get_current_admin)):
+    """Delete a user (requires admin authentication)."""
+    return user_services.delete_user(db, user_id)
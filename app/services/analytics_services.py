@@ -0,0 +1,69 @@
+from datetime import date
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+import app.common.errors as e
+from app.models.category import Category
+from app.models.product import Product
+from app.models.sales import DailyProductSales, DailyCategorySales
+
+# Every query below reads the daily rollups only, never the ledger, so its cost depends on the number of
+# days in the range and not on the number of sales.
+
+
+def _check_range(start: date, end: date):
+    if start > end:
+        raise e.InvalidRequestError("start must not be after end")
+
+
+def _totals(model):
+    return (func.sum(model.quantity).label("quantity"),
+            func.sum(model.revenue).label("revenue"),
+            func.sum(model.discount).label("discount"),
+            func.sum(model.lines).label("lines"))
+
+
+def daily_revenue(db: Session, start: date, end: date, product_id: int = None, category_id: int = None):
+    """Totals per day, for everything or for one product or one category."""
+    _check_range(start, end)
+    if product_id is not None and category_id is not None:
+        raise e.InvalidRequestError("Filter by product_id or by category_id, not both")
+    if category_id is not None:
+        model, key, value = DailyCategorySales, DailyCategorySales.category_id, category_id
+    else:
+        model, key, value = DailyProductSales, DailyProductSales.product_id, product_id
+    query = select(model.date, *_totals(model)).where(model.date >= start, model.date <= end)
+    if value is not None:
+        query = query.where(key == value)
+    return [row._asdict() for row in db.execute(query.group_by(model.date).order_by(model.date))]
+
+
+def top_products(db: Session, start: date, end: date, limit: int, by: str = "revenue"):
+    """The best-selling products of the range, by revenue or by quantity."""
+    _check_range(start, end)
+    totals = _totals(DailyProductSales)
+    order = totals[0] if by == "quantity" else totals[1]
+    query = (
+        select(DailyProductSales.product_id, Product.name, *totals)
+        .join(Product, Product.id == DailyProductSales.product_id)
+        .where(DailyProductSales.date >= start, DailyProductSales.date <= end)
+        .group_by(DailyProductSales.product_id, Product.name)
+        .order_by(order.desc(), DailyProductSales.product_id)
+        .limit(limit)
+    )
+    return [row._asdict() for row in db.execute(query)]
+
+
+def category_revenue(db: Session, start: date, end: date):
+    """Totals per category over the range, highest revenue first."""
+    _check_range(start, end)
+    totals = _totals(DailyCategorySales)
+    query = (
+        select(DailyCategorySales.category_id, Category.name, *totals)
+        .join(Category, Category.id == DailyCategorySales.category_id)
+        .where(DailyCategorySales.date >= start, DailyCategorySales.date <= end)
+        .group_by(DailyCategorySales.category_id, Category.name)
+        .order_by(totals[1].desc(), DailyCategorySales.category_id)
+    )
+    return [row._asdict() for row in db.execute(query)]
@@ -1,8 +1,10 @@
 from fastapi import HTTPException
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
+from app.infrastructure.cache import invalidate_on_commit
 from app.models.category import Category, CategoryCreate
 from app.models.product import Product
+from app.services import search_services
 
 
 def validate_category_product(db: Session, category_id: int, product_id: int):
@@ -32,9 +34,10 @@ def get_category_by_id(db: Session, category_id: int):
 
 
 def find_category_by_name(db: Session, name: str):
-    categories = db.query(Category).filter(Category.name.like(f"%{name}%")).all()
-    if categories is None:
-        raise HTTPException(status_code=402, detail="No categories mathing the query found")
+    # Served from the search index instead of a LIKE '%name%' table scan
+    ids = search_services.ranked_ids(db, "categories", name)
+    found = {category.id: category for category in db.query(Category).filter(Category.id.in_(ids)).all()} if ids else {}
+    categories = [found[category_id] for category_id in ids if category_id in found]
     return categories
 
 
@@ -42,6 +45,7 @@ def create_category(db: Session, category: CategoryCreate):
     db_category = Category(name=category.name,
                            description=category.description)
     db.add(db_category)
+    invalidate_on_commit(db, "categories")
     db.commit()
     db.refresh(db_category)
     return db_category
@@ -50,6 +54,7 @@ def create_category(db: Session, category: CategoryCreate):
 def delete_category(db: Session, category_id: int):
     db_category = get_category_by_id(db, category_id)
     if db_category:
+        invalidate_on_commit(db, f"category:{category_id}")
         db.delete(db_category)
         db.commit()
         return db_category
@@ -60,6 +65,7 @@ def update_category_name(db: Session, category_id: int, name: str):
     category = get_category_by_id(db, category_id)
     try:
         category.name = name
+        invalidate_on_commit(db, f"category:{category_id}")
         db.commit()
         db.refresh(category)
         return category
@@ -76,6 +82,7 @@ def add_product_to_category(db, category_id, product_id):
         raise HTTPException(status_code=400, detail="Product already in category")
 
     category.products.append(product)
+    invalidate_on_commit(db, f"category:{category_id}", f"product:{product_id}")
     db.commit()
     db.refresh(category)
     return category
@@ -89,6 +96,7 @@ def remove_product_from_category(db, category_id, product_id):
         raise HTTPException(status_code=400, detail="Product not in category")
 
     category.products.remove(product)
+    invalidate_on_commit(db, f"category:{category_id}", f"product:{product_id}")
     db.commit()
     db.refresh(category)
     return category
@@ -1,6 +1,7 @@
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
 
+from app.infrastructure.cache import invalidate_on_commit
 from app.models.discount import Discount, DiscountCreate, DiscountUpdate
 from app.services import product_services, category_services
 
@@ -48,6 +49,7 @@ def update_discount(db: Session, discount_id: int, discount_data: DiscountUpdate
     if discount_data.min_order_value is not None:
         discount.min_order_value = discount_data.min_order_value
 
+    invalidate_on_commit(db, f"discount:{discount_id}")
     db.commit()
     db.refresh(discount)
     return discount
@@ -55,6 +57,7 @@ def update_discount(db: Session, discount_id: int, discount_data: DiscountUpdate
 
 def delete_discount(db: Session, discount_id: int):
     discount = get_discount_by_id(db, discount_id)
+    invalidate_on_commit(db, f"discount:{discount_id}")
     db.delete(discount)
     db.commit()
 
@@ -66,6 +69,7 @@ def apply_discount_to_product(db: Session, discount_id: int, product_id: int):
     discount = get_discount_by_id(db, discount_id)
 
     discount.products.append(product)
+    invalidate_on_commit(db, f"product:{product_id}")
     db.commit()
     db.refresh(product)
 
@@ -81,6 +85,7 @@ def remove_discount_from_product(db: Session, discount_id: int, product_id: int)
     discount = get_discount_by_id(db, discount_id)
     discount.products.remove(product)
 
+    invalidate_on_commit(db, f"product:{product_id}")
     db.commit()
     db.refresh(product)
     return product
@@ -90,6 +95,7 @@ def apply_discount_to_category(db: Session, discount_id: int, category_id: int):
     discount = get_discount_by_id(db, discount_id)
 
     discount.categories.append(category)
+    invalidate_on_commit(db, f"category:{category_id}")
     db.commit()
     db.refresh(category)
 
@@ -102,6 +108,7 @@ def remove_discount_from_category(db: Session, discount_id: int, category_id: in
         raise HTTPException(status_code=400, detail="Category is not with this discount id")
 
     category.discount_id = None
+    invalidate_on_commit(db, f"category:{category_id}")
     db.commit()
     db.refresh(category)
 
@@ -0,0 +1,115 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+from sqlalchemy import case, delete, func, select, update
+from sqlalchemy.orm import Session
+
+from app import config
+from app.infrastructure.cache import invalidate_on_commit
+from app.models.order import Order, OrderProduct, OrderReservation, OrderStatus
+from app.models.product import Product
+
+
+def line_quantities(lines) -> dict:
+    """Total quantity per product id for (product_id, quantity) pairs, merging repeated products."""
+    quantities = defaultdict(int)
+    for product_id, quantity in lines:
+        quantities[product_id] += quantity
+    return dict(quantities)
+
+
+def order_quantities(db: Session, order_id: int) -> dict:
+    rows = db.execute(
+        select(OrderProduct.product_id, func.sum(OrderProduct.quantity))
+        .where(OrderProduct.order_id == order_id)
+        .group_by(OrderProduct.product_id)
+    ).all()
+    return {product_id: quantity for product_id, quantity in rows}
+
+
+def adjust_stock(db: Session, deltas: dict):
+    """
+    Take `deltas[product_id]` units out of stock (or put them back when negative) for every product in a
+    single conditional UPDATE. Either every product had enough stock or nothing changes and 409 is raised.
+
+    The row locks are held until the caller commits, so this should be the last statement before the
+    commit. Rows are matched through the primary key in id order, which keeps concurrent multi-product
+    checkouts from deadlocking each other.
+    """
+    deltas = {product_id: delta for product_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    invalidate_on_commit(db, *(f"stock:{product_id}" for product_id in deltas))
+    delta = case(deltas, value=Product.id)
+    result = db.execute(
+        update(Product)
+        .where(Product.id.in_(deltas), Product.stock >= delta)
+        .values(stock=Product.stock - delta)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != len(deltas):
+        db.rollback()
+        stock = dict(db.execute(select(Product.id, Product.stock).where(Product.id.in_(deltas))).all())
+        missing = sorted(product_id for product_id in deltas if product_id not in stock)
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Product {missing[0]} not found")
+        short = sorted(product_id for product_id, wanted in deltas.items() if stock[product_id] < wanted)
+        raise HTTPException(status_code=409, detail=f"Insufficient stock for products {short}")
+
+
+def reserve_order(db: Session, order: Order, quantities: dict):
+    """Deduct the stock for a new PENDING order and record when the hold expires."""
+    expires_at = datetime.now() + timedelta(minutes=config.ORDER_RESERVATION_MINUTES)
+    db.add(OrderReservation(order_id=order.id, expires_at=expires_at))
+    db.flush()
+    adjust_stock(db, quantities)
+
+
+def release_order(db: Session, order_id: int) -> bool:
+    """
+    Give the reserved stock of an order back. Safe to call any number of times, from any process: only the
+    call whose DELETE removes the reservation row restores the stock.
+    """
+    result = db.execute(delete(OrderReservation).where(OrderReservation.order_id == order_id)
+                        .execution_options(synchronize_session=False))
+    if not result.rowcount:
+        return False
+    adjust_stock(db, {product_id: -quantity for product_id, quantity in order_quantities(db, order_id).items()})
+    return True
+
+
+def settle_order(db: Session, order_id: int):
+    """
+    The order was paid: the reserved stock is now sold. If the reservation already expired and was released,
+    the stock is taken again, which fails with 409 if it was sold to someone else in the meantime.
+    """
+    result = db.execute(delete(OrderReservation).where(OrderReservation.order_id == order_id)
+                        .execution_options(synchronize_session=False))
+    if not result.rowcount:
+        adjust_stock(db, order_quantities(db, order_id))
+
+
+def release_expired(db: Session, now: datetime = None, batch_size: int = 500) -> int:
+    """Cancel PENDING orders whose reservation expired and give their stock back, one order per transaction."""
+    now = now or datetime.now()
+    released = 0
+    last_id = 0
+    while True:
+        order_ids = db.scalars(
+            select(OrderReservation.order_id)
+            .where(OrderReservation.expires_at < now, OrderReservation.order_id > last_id)
+            .order_by(OrderReservation.order_id)
+            .limit(batch_size)
+        ).all()
+        if not order_ids:
+            return released
+        for order_id in order_ids:
+            if release_order(db, order_id):
+                db.execute(update(Order)
+                           .where(Order.id == order_id, Order.status == OrderStatus.PENDING.value)
+                           .values(status=OrderStatus.CANCELLED.value)
+                           .execution_options(synchronize_session=False))
+                released += 1
+            db.commit()
+        last_id = order_ids[-1]
@@ -0,0 +1,91 @@
+from sqlalchemy import select, update, func, or_, bindparam
+from sqlalchemy.orm import Session
+
+from app.config import LOYALTY_POINTS_PER_20_DOLLARS, VIP_LOYALTY_POINTS_PER_20_DOLLARS, \
+    TOTAL_LOYALTY_POINTS_FOR_VIP_STATUS
+from app.models.order import Order, OrderStatus
+from app.models.user import User
+
+
+def is_vip(db: Session, user_id: int) -> bool:
+    """One primary-key lookup; VIP status is a stored flag, never derived from the order history."""
+    return bool(db.scalar(select(User.vip).where(User.id == user_id)))
+
+
+def points_for(amount: float, vip: bool) -> int:
+    per_20 = VIP_LOYALTY_POINTS_PER_20_DOLLARS if vip else LOYALTY_POINTS_PER_20_DOLLARS
+    return int((amount or 0) // 20) * per_20
+
+
+def award_points(db: Session, user_id: int, amount: float, vip: bool) -> int:
+    """
+    Credit the points for a paid order with one UPDATE, in the caller's transaction, and promote the user
+    to VIP when their lifetime points cross the threshold. `vip` is the user's status when the order is paid,
+    which decides the earning rate.
+    """
+    points = points_for(amount, vip)
+    if not points:
+        return 0
+    lifetime = func.coalesce(User.lifetime_points, 0)
+    # vip is assigned first so it reads the old lifetime_points on every database (MySQL evaluates SET
+    # clauses left to right against already updated columns, SQLite against the old row)
+    db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .ordered_values(
+            (User.vip, or_(User.vip.is_(True), lifetime + points >= TOTAL_LOYALTY_POINTS_FOR_VIP_STATUS)),
+            (User.loyalty_points, func.coalesce(User.loyalty_points, 0) + points),
+            (User.lifetime_points, lifetime + points),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return points
+
+
+def recompute_loyalty(db: Session, chunk: int = 500) -> int:
+    """
+    Rebuild lifetime points and VIP status from paid and delivered orders, replaying each user's orders in
+    order so the VIP earning rate starts where it would have. Points already spent (lifetime minus current
+    balance) stay spent. Users are processed `chunk` at a time, one transaction per chunk.
+    """
+    paid = [OrderStatus.PAID.value, OrderStatus.DELIVERED.value]
+    updated = 0
+    last_id = 0
+    while True:
+        users = db.execute(
+            select(User.id, User.loyalty_points, User.lifetime_points)
+            .where(User.id > last_id)
+            .order_by(User.id)
+            .limit(chunk)
+        ).all()
+        if not users:
+            return updated
+        orders = db.execute(
+            select(Order.user_id, Order.total_price)
+            .where(Order.user_id.in_([user.id for user in users]), Order.status.in_(paid))
+            .order_by(Order.user_id, Order.created_at, Order.id)
+        ).all()
+        lifetime = {user.id: 0 for user in users}
+        for user_id, total_price in orders:
+            vip = lifetime[user_id] >= TOTAL_LOYALTY_POINTS_FOR_VIP_STATUS
+            lifetime[user_id] += points_for(total_price, vip)
+
+        rows = []
+        for user in users:
+            spent = max((user.lifetime_points or 0) - (user.loyalty_points or 0), 0)
+            rows.append({
+                "user_id": user.id,
+                "lifetime": lifetime[user.id],
+                "balance": max(lifetime[user.id] - spent, 0),
+                "vip": lifetime[user.id] >= TOTAL_LOYALTY_POINTS_FOR_VIP_STATUS,
+            })
+        db.execute(
+            update(User.__table__)
+            .where(User.__table__.c.id == bindparam("user_id"))
+            .values(lifetime_points=bindparam("lifetime"), loyalty_points=bindparam("balance"),
+                    vip=bindparam("vip")),
+            rows,
+        )
+        db.commit()
+        updated += len(rows)
+        last_id = users[-1].id
@@ -1,9 +1,20 @@
-from fastapi import HTTPException
-from sqlalchemy.orm import Session
+from datetime import datetime
 
-from app.models.order import OrderCreate, Order, OrderProduct, OrderUpdate, OrderStatus, OrderProductCreate
-from app.models.product import Product
+from fastapi import HTTPException
+from sqlalchemy import insert, select, update, delete, bindparam, or_, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+
+from app.common.utils import encode_cursor, decode_cursor
+from app.infrastructure.events import on_order_status, record_status_change
+from app.models.order import OrderCreate, Order, OrderProduct, OrderUpdate, OrderStatus, OrderProductCreate, \
+    OrderResponse
 from app.models.user import User
+from app.services.inventory_services import adjust_stock, line_quantities, reserve_order, release_order, \
+    settle_order
+from app.services.loyalty_services import is_vip, award_points
+from app.services.pricing_services import price_lines
+from app.services.sales_services import record_sales
 
 
 def get_order_by_id(db: Session, order_id: int) -> Order:
@@ -20,6 +31,11 @@ def check_order_user(db: Session, order_id: int, user: User) -> Order:
     return order
 
 
+def check_order_pending(order: Order):
+    if order.status > OrderStatus.PENDING.value:
+        raise HTTPException(status_code=400, detail="Order is already paid and cannot be modified")
+
+
 def check_order_product(db: Session, order_id: int, order_product_id: int, user: User) -> OrderProduct:
     order = check_order_user(db, order_id, user)
     order_product = db.query(OrderProduct).filter(
@@ -31,121 +47,108 @@ def check_order_product(db: Session, order_id: int, order_product_id: int, user:
     return order_product
 
 
-def check_product(db: Session, product_id: int) -> Product:
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
-    return product
-
-
-def update_order_price(db: Session, order: Order, product, quantity: int, add: bool = False):
-    if isinstance(product, int):
-        product = check_product(db, product)
-    cost = product.price * quantity
-    if product.discount:
-        cost -= (product.discount.percentage / 100) * cost
-
-    if not add:
-        order_product = db.query(OrderProduct).filter(
-            OrderProduct.order_id == order.id,
-            OrderProduct.product_id == product.id
-        ).first()
-        if not order_product:
-            raise HTTPException(status_code=404, detail="Order product not found")
-    else:
-        order_product = OrderProduct(
-            order_id=order.id,
-            product_id=product.id,
-            quantity=quantity,
-            total_price=cost
-        )
-
-    if not add:
-        order.total_price -= order_product.total_price
-    order_product.quantity = quantity
-    order_product.total_price = cost
-    order.order_products.append(order_product)
-    order.total_price += cost
-
-    db.commit()
-    db.refresh(order)
-    return order
+def reprice_order(db: Session, order: Order) -> list:
+    """
+    Price every line of the order in one pass (discount thresholds depend on the whole order) and store the
+    line and order totals. Pending ORM changes to the lines are flushed first.
+    """
+    db.flush()
+    lines = db.query(OrderProduct).filter(OrderProduct.order_id == order.id).order_by(OrderProduct.id).all()
+    quote = price_lines(db, [(line.product_id, line.quantity) for line in lines], is_vip(db, order.user_id))
+    for line, priced in zip(lines, quote.lines):
+        line.unit_price = priced.unit_price
+        line.total_price = priced.total_price
+    order.total_price = quote.total_price
+    return lines
 
 
 def create_order(db: Session, user_id: int, order: OrderCreate):
-    total_cost = 0
-    order_products = []
-
-    for op in order.order_products:
-        product = db.query(Product).filter(Product.id == op.product_id).first()
-        if not product:
-            raise HTTPException(status_code=404, detail=f"Product {op.product_id} not found")
-
-        cost = product.price * op.quantity
-        if product.discount:
-            cost -= (product.discount.percentage / 100) * cost
-
-        total_cost += cost
-        order_products.append(OrderProduct(
-            product_id=op.product_id,
-            quantity=op.quantity,
-            total_price=cost
-        ))
-
-    db_order = Order(user_id=user_id, total_price=total_cost)
+    lines = order.order_products or []
+    quote = price_lines(db, [(op.product_id, op.quantity) for op in lines], is_vip(db, user_id))
+    order_products = [{
+        "product_id": line.product_id,
+        "quantity": line.quantity,
+        "unit_price": line.unit_price,
+        "total_price": line.total_price
+    } for line in quote.lines]
+
+    db_order = Order(user_id=user_id, total_price=quote.total_price)
     db.add(db_order)
-    db.commit()
-    db.refresh(db_order)
+    db.flush()
 
-    for op in order_products:
-        op.order_id = db_order.id
-        db.add(op)
+    if order_products:
+        for op in order_products:
+            op["order_id"] = db_order.id
+        db.execute(insert(OrderProduct), order_products)
+    reserve_order(db, db_order, line_quantities((op.product_id, op.quantity) for op in lines))
     db.commit()
-    db.refresh(db_order)
 
     return db_order
 
 
 def update_order(db: Session, order_id: int, order_update: OrderUpdate, user: User):
+    """
+    Apply removals, then new quantities, as one diff against the order's current lines. The statement count
+    does not depend on the size of the cart: one read of the lines, one pricing query (none when cached), at
+    most one DELETE, one executemany UPDATE and one INSERT, then the order total and the stock adjustment.
+    """
     order = check_order_user(db, order_id, user)
-
-    if order.status > OrderStatus.PENDING.value:
-        raise HTTPException(status_code=400, detail="Order is already paid and cannot be modified")
-
-    for product_id in order_update.remove_products:
-        order_product = db.query(OrderProduct).filter(
-            OrderProduct.order_id == order_id,
-            OrderProduct.product_id == product_id
-        ).first()
-        if order_product:
-            order.total_price -= order_product.total_price
-            db.delete(order_product)
-
-    for op in order_update.new_products:
-        product = check_product(db, op.product_id)
-        cost = product.price * op.quantity
-        if product.discount:
-            cost -= (product.discount.percentage / 100) * cost
-
-        order_product = db.query(OrderProduct).filter(
-            OrderProduct.order_id == order.id,
-            OrderProduct.product_id == op.product_id
-        ).first()
-        if order_product:
-            order.total_price -= order_product.total_price
-            order_product.quantity = op.quantity
+    check_order_pending(order)
+
+    current = db.execute(
+        select(OrderProduct.id, OrderProduct.product_id, OrderProduct.quantity, OrderProduct.unit_price,
+               OrderProduct.total_price)
+        .where(OrderProduct.order_id == order_id)
+        .order_by(OrderProduct.id)
+    ).all()
+    # A product on several lines is merged into its first line, which keeps the quantity of all of them
+    lines = {}
+    duplicates = []
+    for line in current:
+        if line.product_id in lines:
+            duplicates.append(line)
         else:
-            order_product = OrderProduct(
-                order_id=order.id,
-                product_id=op.product_id,
-                quantity=op.quantity,
-                total_price=cost
-            )
-            db.add(order_product)
-
-        order_product.total_price = cost
-        order.total_price += cost
-
+            lines[line.product_id] = line
+
+    wanted = line_quantities((line.product_id, line.quantity) for line in current)
+    for product_id in order_update.remove_products or []:
+        wanted.pop(product_id, None)
+    for op in order_update.new_products or []:
+        wanted[op.product_id] = op.quantity
+
+    quote = price_lines(db, list(wanted.items()), is_vip(db, order.user_id))
+
+    deleted = [line.id for product_id, line in lines.items() if product_id not in wanted]
+    deleted += [line.id for line in duplicates]
+    updated = []
+    inserted = []
+    for priced in quote.lines:
+        line = lines.get(priced.product_id)
+        if line is None:
+            inserted.append({"order_id": order_id, "product_id": priced.product_id, "quantity": priced.quantity,
+                             "unit_price": priced.unit_price, "total_price": priced.total_price})
+        elif (line.quantity, line.unit_price, line.total_price) != (priced.quantity, priced.unit_price,
+                                                                    priced.total_price):
+            updated.append({"line_id": line.id, "quantity": priced.quantity, "unit_price": priced.unit_price,
+                            "total_price": priced.total_price})
+
+    if deleted:
+        db.execute(delete(OrderProduct).where(OrderProduct.id.in_(deleted))
+                   .execution_options(synchronize_session=False))
+    if updated:
+        table = OrderProduct.__table__
+        db.execute(update(table).where(table.c.id == bindparam("line_id"))
+                   .values(quantity=bindparam("quantity"), unit_price=bindparam("unit_price"),
+                           total_price=bindparam("total_price")), updated)
+    if inserted:
+        db.execute(insert(OrderProduct), inserted)
+    order.total_price = quote.total_price
+
+    stock_deltas = dict(wanted)
+    for line in current:
+        stock_deltas[line.product_id] = stock_deltas.get(line.product_id, 0) - line.quantity
+    db.flush()
+    adjust_stock(db, stock_deltas)
     db.commit()
     db.refresh(order)
     return order
@@ -153,11 +156,42 @@ def update_order(db: Session, order_id: int, order_update: OrderUpdate, user: Us
 
 def delete_order(db: Session, order_id: int, user: User):
     order = check_order_user(db, order_id, user)
+    # Lock the row so the order cannot be paid between this check and the delete
+    db.refresh(order, with_for_update=True)
+    if order.status not in (OrderStatus.PENDING.value, OrderStatus.CANCELLED.value):
+        raise HTTPException(status_code=400, detail="Paid orders are part of the sales ledger and cannot be deleted")
+    # A cancelled order keeps its reservation until its release task has run
+    release_order(db, order.id)
     db.delete(order)
     db.commit()
     return {"detail": "Order deleted"}
 
 
+def transition_order(db: Session, order: Order, old: OrderStatus, new: OrderStatus):
+    """
+    Move an order from `old` to `new` with a conditional UPDATE, so that of two concurrent requests making
+    the same transition only one succeeds; the other gets 409 and changes nothing.
+    """
+    result = db.execute(update(Order)
+                        .where(Order.id == order.id, Order.status == old.value)
+                        .values(status=new.value)
+                        .execution_options(synchronize_session=False))
+    if result.rowcount != 1:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Order status was changed by another request")
+    record_status_change(db, order, old, new)
+
+
+def cancel_order(db: Session, order_id: int, user: User):
+    """Cancel an unpaid order; its reserved stock is given back once the cancellation commits."""
+    order = check_order_user(db, order_id, user)
+    check_order_pending(order)
+    transition_order(db, order, OrderStatus.PENDING, OrderStatus.CANCELLED)
+    db.commit()
+    db.refresh(order)
+    return order
+
+
 def get_order_products(db: Session, order_id: int, user: User):
     order = check_order_user(db, order_id, user)
     return order.order_products
@@ -165,41 +199,35 @@ def get_order_products(db: Session, order_id: int, user: User):
 
 def add_order_product(db: Session, order_id: int, opc: OrderProductCreate, user: User):
     order = check_order_user(db, order_id, user)
-    product = check_product(db, opc.product_id)
-
-    cost = product.price * opc.quantity
-    if product.discount:
-        cost -= (product.discount.percentage / 100) * cost
+    check_order_pending(order)
 
     order_product = db.query(OrderProduct).filter(
         OrderProduct.order_id == order_id,
         OrderProduct.product_id == opc.product_id
     ).first()
     if not order_product:
-        order_product = OrderProduct(
-            order_id=order_id,
-            product_id=opc.product_id,
-            quantity=opc.quantity,
-            total_price=cost
-        )
+        order_product = OrderProduct(order_id=order_id, product_id=opc.product_id, quantity=opc.quantity)
         db.add(order_product)
     else:
         order_product.quantity += opc.quantity
-        order_product.total_price += cost
 
-    order.total_price += cost
+    reprice_order(db, order)
+    adjust_stock(db, {opc.product_id: opc.quantity})
     db.commit()
     db.refresh(order)
     return order_product
 
 
 def update_order_product(db: Session, order_id: int, order_product_id: int, quantity: int, user: User):
+    if quantity <= 0:
+        # Removing a line goes through remove_order_product; a negative quantity would credit stock
+        raise HTTPException(status_code=400, detail="Quantity must be positive")
     order_product = check_order_product(db, order_id, order_product_id, user)
-    order = update_order_price(db, order_product.order, order_product.product, quantity)
+    check_order_pending(order_product.order)
+    stock_delta = quantity - order_product.quantity
     order_product.quantity = quantity
-    order_product.total_price = order_product.product.price * quantity
-    if order_product.product.discount:
-        order_product.total_price -= (order_product.product.discount.percentage / 100) * order_product.total_price
+    reprice_order(db, order_product.order)
+    adjust_stock(db, {order_product.product_id: stock_delta})
     db.commit()
     db.refresh(order_product)
     return order_product
@@ -208,16 +236,92 @@ def update_order_product(db: Session, order_id: int, order_product_id: int, quan
 def remove_order_product(db: Session, order_id: int, order_product_id: int, user: User):
     order_product = check_order_product(db, order_id, order_product_id, user)
     order = order_product.order
-    order.total_price -= order_product.total_price
+    check_order_pending(order)
     db.delete(order_product)
+    reprice_order(db, order)
+    adjust_stock(db, {order_product.product_id: -order_product.quantity})
     db.commit()
     db.refresh(order)
     return order
 
 
 def advance_order(db: Session, order_id: int, admin: User):
+    """
+    Move an order one step forward: PENDING -> PAID -> DELIVERED. Once the order is known to be paid by this
+    request, the stock, the sales ledger and the loyalty points are all written in the same transaction, so
+    a crash can never leave a paid order without them.
+    """
     order = check_order_user(db, order_id, admin)
-    order.status = OrderStatus.PAID.value
+    if order.status == OrderStatus.PENDING.value:
+        transition_order(db, order, OrderStatus.PENDING, OrderStatus.PAID)
+        settle_order(db, order.id)
+        if record_sales(db, [order.id], datetime.now()):
+            award_points(db, order.user_id, order.total_price, is_vip(db, order.user_id))
+    elif order.status == OrderStatus.PAID.value:
+        transition_order(db, order, OrderStatus.PAID, OrderStatus.DELIVERED)
+    else:
+        raise HTTPException(status_code=400, detail="Order cannot be advanced any further")
     db.commit()
     db.refresh(order)
-    return order
\ No newline at end of file
+    return order
+
+# Side effects of status changes, run on the event task queue once the change has committed
+
+@on_order_status(OrderStatus.CANCELLED)
+def release_cancelled_order(db: Session, change):
+    release_order(db, change.order_id)
+
+
+
+# Async variants. These run the sync implementations above through AsyncSession.run_sync, so every
+# statement goes through the async driver on the event loop while the business rules live in one place.
+# The response is built inside run_sync as well, because relationships cannot be lazy-loaded outside it.
+
+async def _run_order(db: AsyncSession, fn, *args) -> OrderResponse:
+    return await db.run_sync(lambda session: OrderResponse.model_validate(fn(session, *args)))
+
+
+async def create_order_async(db: AsyncSession, user_id: int, order: OrderCreate) -> OrderResponse:
+    return await _run_order(db, create_order, user_id, order)
+
+
+async def get_order_async(db: AsyncSession, order_id: int, user: User) -> OrderResponse:
+    return await _run_order(db, check_order_user, order_id, user)
+
+
+async def update_order_async(db: AsyncSession, order_id: int, order_update: OrderUpdate, user: User) -> OrderResponse:
+    return await _run_order(db, update_order, order_id, order_update, user)
+
+
+async def delete_order_async(db: AsyncSession, order_id: int, user: User):
+    return await db.run_sync(delete_order, order_id, user)
+
+
+async def get_orders_page_async(db: AsyncSession, limit: int, cursor: str = None, user_id: int = None,
+                                status: int = None, created_from: datetime = None, created_to: datetime = None):
+    """
+    One page of orders, newest first, with their lines loaded in a second IN query. The cursor holds the
+    (created_at, id) of the last order of the previous page, so each page is a range scan of
+    ix_orders_user_created_id (or ix_orders_created_id across users) however far back the client pages.
+    """
+    query = (select(Order).options(selectinload(Order.order_products))
+             .order_by(Order.created_at.desc(), Order.id.desc()).limit(limit + 1))
+    if user_id is not None:
+        query = query.where(Order.user_id == user_id)
+    if status is not None:
+        query = query.where(Order.status == status)
+    if created_from is not None:
+        query = query.where(Order.created_at >= created_from)
+    if created_to is not None:
+        query = query.where(Order.created_at < created_to)
+    if cursor:
+        created_at, last_id = decode_cursor(cursor, datetime, int)
+        query = query.where(or_(Order.created_at < created_at,
+                                and_(Order.created_at == created_at, Order.id < last_id)))
+
+    orders = (await db.execute(query)).scalars().all()
+    next_cursor = None
+    if len(orders) > limit:
+        last = orders[limit - 1]
+        next_cursor = encode_cursor(last.created_at.isoformat(), last.id)
+    return {"items": orders[:limit], "next_cursor": next_cursor}
@@ -0,0 +1,118 @@
+from collections import namedtuple
+
+from fastapi import HTTPException
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, aliased
+
+from app import config
+from app.common.utils import TTLCache, increment_counters
+from app.config import VIP_DISCOUNT_PERCENTAGE
+from app.infrastructure.cache import catalog_cache
+from app.models.category import Category
+from app.models.discount import Discount
+from app.models.product import Product, PriceVersion, product_categories
+
+# A discount a product is eligible for, through itself or one of its categories
+Offer = namedtuple("Offer", "discount_id percentage min_order_value")
+# What a product costs before any order-level decision; versions ties it to the catalog cache tags of this
+# worker, stamp to the shared PriceVersion
+ProductPrice = namedtuple("ProductPrice", "price offers versions stamp")
+PricedLine = namedtuple("PricedLine", "product_id quantity unit_price discount_id percentage total_price")
+Quote = namedtuple("Quote", "lines subtotal total_price")
+
+_prices = TTLCache(config.PRICE_CACHE_SIZE, config.PRICE_CACHE_TTL_SECONDS)
+
+# Catalog cache tags whose invalidation can change a price (stock tags cannot)
+_price_tags = ("product:", "category:", "discount:")
+
+
+def _load_prices(db: Session, product_ids: set) -> dict:
+    """
+    Price and every eligible discount of each product, from the cache or else from one query joining the
+    product discount and all category discounts. Entries are only used while the shared price version is
+    the one they were loaded under, so a change committed by any worker reprices the next order; in this
+    worker they are also dropped as soon as the catalog tags of the product, its categories or those
+    discounts are invalidated.
+    """
+    stamp = db.scalar(select(PriceVersion.version).where(PriceVersion.id == 1)) or 0
+    prices = {}
+    for product_id in product_ids:
+        entry = _prices.get(product_id)
+        if entry is not None and entry.stamp == stamp and catalog_cache.is_current(entry.versions):
+            prices[product_id] = entry
+    missing = product_ids - prices.keys()
+    if not missing:
+        return prices
+
+    token = catalog_cache.begin()
+    product_discount = aliased(Discount)
+    category_discount = aliased(Discount)
+    rows = db.execute(
+        select(Product.id, Product.price,
+               product_discount.id, product_discount.percentage, product_discount.min_order_value,
+               Category.id,
+               category_discount.id, category_discount.percentage, category_discount.min_order_value)
+        .outerjoin(product_discount, product_discount.id == Product.discount_id)
+        .outerjoin(product_categories, product_categories.c.product_id == Product.id)
+        .outerjoin(Category, Category.id == product_categories.c.category_id)
+        .outerjoin(category_discount, category_discount.id == Category.discount_id)
+        .where(Product.id.in_(missing))
+    ).all()
+
+    loaded = {}
+    for product_id, price, *product_offer, category_id, category_discount_id, percentage, min_value in rows:
+        price, offers, tags = loaded.setdefault(product_id, (price, {}, {f"product:{product_id}"}))
+        for discount_id, discount_percentage, discount_min in (product_offer,
+                                                               (category_discount_id, percentage, min_value)):
+            if discount_id is not None:
+                offers[discount_id] = Offer(discount_id, discount_percentage, discount_min or 0)
+                tags.add(f"discount:{discount_id}")
+        if category_id is not None:
+            tags.add(f"category:{category_id}")
+
+    for product_id, (price, offers, tags) in loaded.items():
+        entry = ProductPrice(price or 0, tuple(offers.values()), catalog_cache.snapshot(tags), stamp)
+        if catalog_cache.unchanged_since(token, tags):
+            _prices.set(product_id, entry)
+        prices[product_id] = entry
+    return prices
+
+
+def price_lines(db: Session, lines: list, vip: bool = False) -> Quote:
+    """
+    Price a whole order given as (product_id, quantity) pairs, in the order given.
+
+    Each line gets the best discount among its product's own and its categories' discounts whose
+    min_order_value the order subtotal (before discounts) reaches; VIP customers get VIP_DISCOUNT_PERCENTAGE
+    off on top. Raises 404 for an unknown product.
+    """
+    prices = _load_prices(db, {product_id for product_id, _ in lines})
+    for product_id, _ in lines:
+        if product_id not in prices:
+            raise HTTPException(status_code=404, detail=f"Product {product_id} not found")
+
+    subtotal = sum(prices[product_id].price * quantity for product_id, quantity in lines)
+    vip_factor = 1 - VIP_DISCOUNT_PERCENTAGE / 100 if vip else 1
+    priced = []
+    for product_id, quantity in lines:
+        price = prices[product_id]
+        best = max((offer for offer in price.offers if subtotal >= offer.min_order_value),
+                   key=lambda offer: offer.percentage, default=None)
+        percentage = best.percentage if best else 0
+        total = round(price.price * quantity * (1 - percentage / 100) * vip_factor, 2)
+        priced.append(PricedLine(product_id, quantity, price.price, best.discount_id if best else None,
+                                 percentage, total))
+    return Quote(priced, round(subtotal, 2), round(sum(line.total_price for line in priced), 2))
+
+
+@event.listens_for(Session, "before_commit")
+def _bump_price_version(session):
+    # In the committing transaction itself, so no worker can see the change without the new version
+    if session.in_nested_transaction():
+        return
+    if any(tag.startswith(_price_tags) for tag in session.info.get("catalog_tags", ())):
+        increment_counters(session, PriceVersion, ["id"], [{"id": 1, "version": 1}])
+
+
+def price_cache_stats() -> dict:
+    return _prices.stats()
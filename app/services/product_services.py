@@ -1,12 +1,24 @@
 from fastapi import HTTPException
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import or_, and_, select, update
 
 import app.config
 from app import config
+from app.common.utils import encode_cursor, decode_cursor
 from app.config import LOW_PRODUCT_INVENTORY_THRESHOLD
+from app.infrastructure.cache import invalidate_on_commit
+from app.models.category import Category
 from app.models.product import Product, ProductCreate, ProductUpdate
+from app.services import search_services
+from app.services.review_services import remove_product_review_stats
+
+# Everything ProductCategoriesResponse touches, loaded up front (the async path cannot lazy-load)
+product_load_options = (
+    selectinload(Product.discount),
+    selectinload(Product.categories).selectinload(Category.discount),
+)
 
 
 def get_all_products(db: Session):
@@ -23,10 +35,42 @@ def get_product_by_id(db: Session, product_id: int):
     return product
 
 
+async def get_products_page_async(db: AsyncSession, limit: int, cursor: str = None, category_id: int = None,
+                                  discounted: bool = None, in_stock: bool = None):
+    """
+    One page of the catalog ordered by id. The cursor carries the last id of the previous page, so every
+    page is an index range scan no matter how deep the client walks.
+    """
+    query = select(Product).options(*product_load_options).order_by(Product.id).limit(limit + 1)
+    if cursor:
+        (last_id,) = decode_cursor(cursor, int)
+        query = query.where(Product.id > last_id)
+    if category_id is not None:
+        query = query.where(Product.categories.any(Category.id == category_id))
+    if discounted is not None:
+        has_discount = or_(Product.discount_id.is_not(None), Product.categories.any(Category.discount_id.is_not(None)))
+        query = query.where(has_discount if discounted else ~has_discount)
+    if in_stock is not None:
+        query = query.where(Product.stock > 0 if in_stock else Product.stock <= 0)
+
+    products = (await db.execute(query)).scalars().all()
+    next_cursor = encode_cursor(products[limit - 1].id) if len(products) > limit else None
+    return {"items": products[:limit], "next_cursor": next_cursor}
+
+
+async def get_product_by_id_async(db: AsyncSession, product_id: int):
+    result = await db.execute(select(Product).options(*product_load_options).where(Product.id == product_id))
+    product = result.scalar_one_or_none()
+    if product is None:
+        raise HTTPException(status_code=402, detail="Product not found")
+    return product
+
+
 def find_product_by_name(db: Session, name: str):
-    products = db.query(Product).filter(Product.name.like(f"%{name}%")).all()
-    if products is None:
-        raise HTTPException(status_code=402, detail="No products mathing the query found")
+    # Served from the search index instead of a LIKE '%name%' table scan
+    ids = search_services.ranked_ids(db, "products", name)
+    found = {product.id: product for product in db.query(Product).filter(Product.id.in_(ids)).all()} if ids else {}
+    products = [found[product_id] for product_id in ids if product_id in found]
     return products
 
 
@@ -48,6 +92,8 @@ def create_product(db: Session, product: ProductCreate):
 def delete_product(db: Session, product_id: int):
     db_product = get_product_by_id(db, product_id)
     if db_product:
+        invalidate_on_commit(db, f"product:{product_id}")
+        remove_product_review_stats(db, product_id)
         db.delete(db_product)
         db.commit()
         return db_product
@@ -64,17 +110,26 @@ def update_product(db: Session, product_id, update: ProductUpdate):
     if update.price is not None:
         product.price = update.price
 
+    invalidate_on_commit(db, f"product:{product_id}")
     db.commit()
     db.refresh(product)
     return product
 
 
 def add_product_stock(db: Session, product_id: int, stock: int):
-    product = get_product_by_id(db, product_id)
-    product.stock += stock
+    """Add (or with a negative amount, remove) stock in one UPDATE, so concurrent calls never lose each other."""
+    result = db.execute(
+        update(Product)
+        .where(Product.id == product_id, Product.stock + stock >= 0)
+        .values(stock=Product.stock + stock)
+        .execution_options(synchronize_session=False)
+    )
+    if not result.rowcount:
+        get_product_by_id(db, product_id)
+        raise HTTPException(status_code=409, detail="Stock cannot go below zero")
+    invalidate_on_commit(db, f"stock:{product_id}")
     db.commit()
-    db.refresh(product)
-    return product
+    return get_product_by_id(db, product_id)
 
 
 def low_inventory_check(db: Session):
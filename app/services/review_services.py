@@ -1,9 +1,67 @@
 from fastapi import HTTPException
+from sqlalchemy import func, select, delete
 from sqlalchemy.orm import Session
 
+from app.common.utils import increment_counters
 from app.models.product import Product
-from app.models.review import Review, ReviewCreate, ReviewUpdate
-from app.models.user import User
+from app.models.review import Review, ReviewCreate, ReviewUpdate, ProductReviewStats, UserReviewStats
+from app.models.user import User, UserResponsePublic
+
+
+def _stats_delta(count: int = 0, added: int = None, removed: int = None) -> dict:
+    """Counter changes for adding a review rated `added` and/or removing one rated `removed`."""
+    delta = {"review_count": count, "rating_sum": (added or 0) - (removed or 0)}
+    for rating in range(1, 6):
+        delta[f"rating_{rating}"] = (rating == added) - (rating == removed)
+    return delta
+
+
+def _update_stats(db: Session, product_id: int, user_id: int, delta: dict):
+    increment_counters(db, ProductReviewStats, ["product_id"], [{"product_id": product_id, **delta}])
+    increment_counters(db, UserReviewStats, ["user_id"], [{"user_id": user_id, **delta}])
+
+
+def remove_user_review_stats(db: Session, user_id: int):
+    """
+    Take a user's reviews out of the product totals before the user (and so their reviews) is deleted.
+    Runs in the caller's transaction.
+    """
+    rows = db.execute(
+        select(Review.product_id, Review.rating, func.count())
+        .where(Review.user_id == user_id)
+        .group_by(Review.product_id, Review.rating)
+    ).all()
+    per_product = {}
+    for product_id, rating, count in rows:
+        delta = per_product.setdefault(product_id, {"product_id": product_id, **_stats_delta()})
+        delta["review_count"] -= count
+        delta["rating_sum"] -= rating * count
+        if 1 <= rating <= 5:
+            # Legacy ratings outside the range were never in the histogram
+            delta[f"rating_{rating}"] -= count
+    increment_counters(db, ProductReviewStats, ["product_id"], list(per_product.values()))
+    db.execute(delete(UserReviewStats).where(UserReviewStats.user_id == user_id))
+
+
+def remove_product_review_stats(db: Session, product_id: int):
+    """
+    Take a product's reviews out of the user totals before the product (and so its reviews) is deleted, and
+    drop its own totals. Runs in the caller's transaction.
+    """
+    rows = db.execute(
+        select(Review.user_id, Review.rating, func.count())
+        .where(Review.product_id == product_id)
+        .group_by(Review.user_id, Review.rating)
+    ).all()
+    per_user = {}
+    for user_id, rating, count in rows:
+        delta = per_user.setdefault(user_id, {"user_id": user_id, **_stats_delta()})
+        delta["review_count"] -= count
+        delta["rating_sum"] -= rating * count
+        if 1 <= rating <= 5:
+            delta[f"rating_{rating}"] -= count
+    increment_counters(db, UserReviewStats, ["user_id"], list(per_user.values()))
+    db.execute(delete(ProductReviewStats).where(ProductReviewStats.product_id == product_id))
 
 
 def get_review_by_id(db: Session, review_id: int):
@@ -27,12 +85,15 @@ def get_reviews_by_user(db: Session, user: User, limit: int, page: int):
     if not reviews:
         raise HTTPException(status_code=402, detail="No reviews found")
 
-    user.reviews = reviews
-    user.total_reviews = db.query(Review).filter(Review.user_id == user.id).count()
-    user.average_rating = \
-        sum([review.rating for review in reviews]) / user.total_reviews if user.total_reviews > 0 else 0
-
-    return user
+    stats = db.get(UserReviewStats, user.id) or UserReviewStats(**_stats_delta())
+    # A plain dict, so the page of reviews never replaces the user's reviews relationship
+    return {
+        **UserResponsePublic.model_validate(user).model_dump(),
+        "reviews": reviews,
+        "total_reviews": stats.review_count,
+        "average_rating": stats.average_rating,
+        "rating_histogram": stats.rating_histogram,
+    }
 
 
 def get_reviews_by_product(db: Session, product: Product, limit: int, page: int):
@@ -49,10 +110,11 @@ def get_reviews_by_product(db: Session, product: Product, limit: int, page: int)
     if not reviews:
         raise HTTPException(status_code=402, detail="No reviews found")
 
+    stats = db.get(ProductReviewStats, product.id) or ProductReviewStats(**_stats_delta())
     product.reviews = reviews
-    product.total_reviews = db.query(Review).filter(Review.user_id == product.id).count()
-    product.average_rating = \
-        sum([review.rating for review in reviews]) / product.total_reviews if product.total_reviews > 0 else 0
+    product.total_reviews = stats.review_count
+    product.average_rating = stats.average_rating
+    product.rating_histogram = stats.rating_histogram
 
     return product
 
@@ -63,6 +125,7 @@ def create_review(db: Session, user_id: int, review: ReviewCreate):
                     rating=review.rating,
                     comment=review.comment)
     db.add(review)
+    _update_stats(db, review.product_id, user_id, _stats_delta(count=1, added=review.rating))
     db.commit()
     db.refresh(review)
     return review
@@ -71,15 +134,21 @@ def create_review(db: Session, user_id: int, review: ReviewCreate):
 def update_review(db: Session, review_id: int, review_update: ReviewUpdate):
     review = get_review_by_id(db, review_id)
 
-    if review_update.rating is not None:
+    if review_update.rating is not None and review_update.rating != review.rating:
+        _update_stats(db, review.product_id, review.user_id,
+                      _stats_delta(added=review_update.rating, removed=review.rating))
         review.rating = review_update.rating
     if review_update.comment is not None:
         review.comment = review_update.comment
 
     db.commit()
+    db.refresh(review)
+    return review
 
 
 def delete_review(db: Session, review_id: int):
     review = get_review_by_id(db, review_id)
+    _update_stats(db, review.product_id, review.user_id, _stats_delta(count=-1, removed=review.rating))
     db.delete(review)
     db.commit()
+    return review
@@ -0,0 +1,106 @@
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import select, insert, exists, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.common.utils import increment_counters
+from app.models.order import Order, OrderProduct
+from app.models.product import Product, product_categories
+from app.models.sales import Sales, ItemSales, DailyProductSales, DailyCategorySales
+
+
+def record_sales(db: Session, order_ids: list, date: datetime = None) -> int:
+    """
+    Write the Sales header and ItemSales lines for paid orders, in the caller's transaction.
+
+    Orders that already have a ledger entry are skipped, so it is safe to call twice for the same order, also
+    concurrently: a header another transaction inserted first is treated as already recorded.
+    Costs a fixed number of statements however many orders and lines there are: read the orders, insert
+    every header, read back the header ids, read every line, insert every line, then update the daily
+    rollups. `date` defaults to now; the backfill passes None and gets the order's creation time instead.
+    """
+    if not order_ids:
+        return 0
+    orders = db.execute(
+        select(Order.id, Order.user_id, Order.status, Order.order_discount, Order.total_price, Order.created_at)
+        .where(Order.id.in_(order_ids), ~exists().where(Sales.order_id == Order.id))
+    ).all()
+    if not orders:
+        return 0
+
+    headers = [{
+        "user_id": order.user_id,
+        "order_id": order.id,
+        "status": order.status,
+        "order_discount": order.order_discount or 0,
+        "total_price": order.total_price or 0,
+        "date": date or order.created_at,
+    } for order in orders]
+    try:
+        with db.begin_nested():
+            db.execute(insert(Sales), headers)
+    except IntegrityError:
+        # Some of these orders were recorded concurrently: insert the others one at a time
+        recorded = {header["order_id"] for header in headers if _insert_header(db, header)}
+        orders = [order for order in orders if order.id in recorded]
+        if not orders:
+            return 0
+    sales_ids = dict(db.execute(
+        select(Sales.order_id, Sales.id).where(Sales.order_id.in_([order.id for order in orders]))
+    ).all())
+
+    lines = db.execute(
+        select(OrderProduct.order_id, OrderProduct.product_id, OrderProduct.quantity, OrderProduct.total_price,
+               # The price the customer was quoted; lines priced before it was kept fall back to today's
+               func.coalesce(OrderProduct.unit_price, Product.price).label("price"))
+        .join(Product, Product.id == OrderProduct.product_id)
+        .where(OrderProduct.order_id.in_(list(sales_ids)))
+    ).all()
+    if lines:
+        item_sales = [{
+            "sales_id": sales_ids[line.order_id],
+            "product_id": line.product_id,
+            "quantity": line.quantity,
+            "unit_price": line.price,
+            "discount": round(line.price * line.quantity - line.total_price, 2),
+            "total_price": line.total_price,
+        } for line in lines]
+        db.execute(insert(ItemSales), item_sales)
+        days = {order.id: (date or order.created_at).date() for order in orders}
+        update_rollups(db, [(days[line.order_id], item) for line, item in zip(lines, item_sales)])
+    return len(orders)
+
+
+def _insert_header(db: Session, header: dict) -> bool:
+    try:
+        with db.begin_nested():
+            db.execute(insert(Sales), [header])
+        return True
+    except IntegrityError:
+        return False
+
+
+def update_rollups(db: Session, items: list):
+    """Add (day, ItemSales values) pairs to the daily product and category totals."""
+    categories = defaultdict(list)
+    for product_id, category_id in db.execute(
+            select(product_categories.c.product_id, product_categories.c.category_id)
+            .where(product_categories.c.product_id.in_({item["product_id"] for _, item in items}))):
+        categories[product_id].append(category_id)
+
+    per_product = {}
+    per_category = {}
+    for day, item in items:
+        targets = [(per_product, "product_id", item["product_id"])]
+        targets += [(per_category, "category_id", category_id) for category_id in categories[item["product_id"]]]
+        for totals, key, value in targets:
+            row = totals.setdefault((day, value), {"date": day, key: value,
+                                                   "quantity": 0, "revenue": 0, "discount": 0, "lines": 0})
+            row["quantity"] += item["quantity"]
+            row["revenue"] += item["total_price"]
+            row["discount"] += item["discount"]
+            row["lines"] += 1
+    increment_counters(db, DailyProductSales, ["date", "product_id"], list(per_product.values()))
+    increment_counters(db, DailyCategorySales, ["date", "category_id"], list(per_category.values()))
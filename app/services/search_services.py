@@ -1,17 +1,372 @@
-from sqlalchemy.orm import Session
+import asyncio
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timedelta
 
+from sqlalchemy import event, select, insert, delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 
-def main(db: Session, search_term: str, page: int, limit: int, type: str=None):
-    result = {}
+import app.common.errors as e
+from app import config
+from app.infrastructure.database import AsyncSessionLocal
+from app.models.category import Category, CategoryResponse
+from app.models.discount import Discount, DiscountResponse
+from app.models.product import Product, ProductResponse
+from app.models.review import Review, ReviewResponse
+from app.models.search import SearchChange
 
-def search_products(db: Session, search_term: str, page: int, limit: int):
-    return {}
+_word = re.compile(r"\w+")
 
-def search_categories(db: Session, search_term: str, page: int, limit: int):
-    return {}
 
-def search_discounts(db: Session, search_term: str, page: int, limit: int):
-    return {}
+def _tokens(text: str) -> set:
+    return set(_word.findall((text or "").lower()))
 
-def search_reviews(db: Session, search_term: str, page: int, limit: int):
-    return {}
\ No newline at end of file
+
+def _trigrams(tokens) -> set:
+    grams = set()
+    for token in tokens:
+        padded = f"  {token} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class SearchIndex:
+    """
+    In-memory inverted index over word tokens and character trigrams. Documents are ranked by the share of
+    query words they contain exactly plus the share of query trigrams they contain, so partial words and
+    small typos still match without scanning the table.
+    """
+
+    min_similarity = 0.3
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._docs = {}
+        self._postings = defaultdict(set)
+        self._backlog = None
+        self.built = False
+
+    def start_build(self):
+        """Called before reading the rows, so commits racing with the read are not lost."""
+        with self._lock:
+            if self._backlog is None:
+                self._backlog = []
+
+    def load(self, rows):
+        """Fill the index from (id, text) rows, then replay the changes committed while the rows were read."""
+        with self._lock:
+            for doc_id, text in rows:
+                self._add(doc_id, text)
+            for op, doc_id, text in self._backlog or ():
+                self._remove(doc_id)
+                if op == "add":
+                    self._add(doc_id, text)
+            self._backlog = None
+            self.built = True
+
+    def apply(self, op: str, doc_id: int, text: str = None):
+        with self._lock:
+            if not self.built:
+                # Before the first search there is nothing to maintain; the build reads current rows
+                if self._backlog is not None:
+                    self._backlog.append((op, doc_id, text))
+                return
+            self._remove(doc_id)
+            if op == "add":
+                self._add(doc_id, text)
+
+    def _add(self, doc_id, text):
+        tokens = _tokens(text)
+        keys = tokens | _trigrams(tokens)
+        self._docs[doc_id] = keys
+        for key in keys:
+            self._postings[key].add(doc_id)
+
+    def _remove(self, doc_id):
+        for key in self._docs.pop(doc_id, ()):
+            postings = self._postings[key]
+            postings.discard(doc_id)
+            if not postings:
+                del self._postings[key]
+
+    def search(self, term: str) -> list:
+        """Ids of matching documents, best match first."""
+        words = _tokens(term)
+        grams = _trigrams(words)
+        if not grams:
+            return []
+        scores = defaultdict(float)
+        with self._lock:
+            for word in words:
+                for doc_id in self._postings.get(word, ()):
+                    scores[doc_id] += 1 / len(words)
+            for gram in grams:
+                for doc_id in self._postings.get(gram, ()):
+                    scores[doc_id] += 1 / len(grams)
+        ranked = [(score, doc_id) for doc_id, score in scores.items() if score >= self.min_similarity]
+        ranked.sort(key=lambda item: (-item[0], item[1]))
+        return [doc_id for _, doc_id in ranked]
+
+
+class SearchEntity:
+    """
+    A searchable model and its index, built from the table on first use. Commits made through this worker's
+    sessions are applied to the index as they happen and logged to search_changes; every SEARCH_SYNC_SECONDS
+    the rows logged since the last read are reloaded, which picks up what the other workers committed.
+
+    Log ids are assigned at insert but become visible at commit, so reads start from the highest id seen
+    SEARCH_CHANGE_OVERLAP_SECONDS ago and skip the changes already applied since. An index that went unsynced
+    for longer than the log is kept is rebuilt, and keeps serving searches while its replacement is built.
+    """
+
+    def __init__(self, name, model, columns, response, options=()):
+        self.name = name
+        self.model = model
+        self.columns = columns
+        self.response = response
+        self.options = options
+        self.index = SearchIndex()
+        self.rebuilding = None
+        self.sync_lock = threading.Lock()
+        self.synced_at = None
+        self.floor = 0  # changes at or below it were applied, or committed before the overlap window
+        self.checkpoints = deque()  # (time, highest change id applied) at each sync
+        self.seen = set()
+
+    def text(self, obj) -> str:
+        return " ".join(str(getattr(obj, column.key) or "") for column in self.columns)
+
+    def rows_query(self):
+        return select(self.model.id, *self.columns)
+
+    def due(self) -> bool:
+        return self.synced_at is None or time.monotonic() - self.synced_at >= config.SEARCH_SYNC_SECONDS
+
+    def needs_rebuild(self) -> bool:
+        return not self.index.built or time.monotonic() - self.synced_at >= \
+            config.SEARCH_CHANGE_RETENTION_SECONDS - config.SEARCH_CHANGE_OVERLAP_SECONDS
+
+    def floor_query(self):
+        """Highest logged change no lower one can still commit after; read before the rows of a rebuild."""
+        horizon = datetime.now() - timedelta(seconds=config.SEARCH_CHANGE_OVERLAP_SECONDS)
+        return select(func.max(SearchChange.id)).where(SearchChange.entity == self.name,
+                                                       SearchChange.changed_at < horizon)
+
+    def begin_rebuild(self) -> SearchIndex:
+        """Called before reading the rows; the new index gets every change committed from now on."""
+        index = SearchIndex()
+        index.start_build()
+        self.rebuilding = index
+        return index
+
+    def finish_rebuild(self, index: SearchIndex, rows, floor: int, started: float):
+        index.load((row[0], _row_text(row)) for row in rows)
+        self.index = index
+        self.rebuilding = None
+        self.floor = floor or 0
+        self.checkpoints.clear()
+        self.seen.clear()
+        self.synced_at = started
+
+    def changes_query(self):
+        """The logged changes a sync starting now has to look at."""
+        now = time.monotonic()
+        while self.checkpoints and self.checkpoints[0][0] <= now - config.SEARCH_CHANGE_OVERLAP_SECONDS:
+            self.floor = self.checkpoints.popleft()[1]
+        self.seen = {change_id for change_id in self.seen if change_id > self.floor}
+        return select(SearchChange.id, SearchChange.doc_id).where(SearchChange.entity == self.name,
+                                                                  SearchChange.id > self.floor)
+
+    def changed_ids(self, changes) -> set:
+        return {doc_id for change_id, doc_id in changes if change_id not in self.seen}
+
+    def finish_sync(self, changes, doc_ids: set, rows, started: float):
+        """Apply the reloaded rows; the changed ids not found among them were deleted."""
+        found = {row[0]: _row_text(row) for row in rows}
+        for doc_id in doc_ids:
+            if doc_id in found:
+                self.apply("add", doc_id, found[doc_id])
+            else:
+                self.apply("remove", doc_id)
+        self.seen.update(change_id for change_id, _ in changes)
+        self.checkpoints.append((started, max(self.seen, default=self.floor)))
+        self.synced_at = started
+
+    def apply(self, op: str, doc_id: int, text: str = None):
+        # The index being built is read first: once it is None, the swap to the new index has happened
+        rebuilding = self.rebuilding
+        for index in (self.index, rebuilding):
+            if index is not None:
+                index.apply(op, doc_id, text)
+
+
+def _row_text(row) -> str:
+    return " ".join(str(value or "") for value in row[1:])
+
+
+entities = {
+    "products": SearchEntity("products", Product, (Product.name, Product.description), ProductResponse,
+                             (selectinload(Product.discount),)),
+    "categories": SearchEntity("categories", Category, (Category.name, Category.description), CategoryResponse,
+                               (selectinload(Category.discount),)),
+    "discounts": SearchEntity("discounts", Discount, (Discount.name, Discount.description), DiscountResponse),
+    "reviews": SearchEntity("reviews", Review, (Review.comment,), ReviewResponse),
+}
+entity_types = {"p": "products", "c": "categories", "d": "discounts", "r": "reviews"}
+_by_model = {entity.model: entity for entity in entities.values()}
+
+
+# Incremental maintenance: changes are collected at flush time, logged for the other workers in the
+# committing transaction and applied to this worker's indexes only once it commits, so rolled back writes
+# never show up in search results.
+
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session, flush_context):
+    pending = session.info.setdefault("search_pending", [])
+    for obj in session.new | session.dirty:
+        entity = _by_model.get(type(obj))
+        if entity is not None:
+            pending.append((entity, "add", obj.id, entity.text(obj)))
+    for obj in session.deleted:
+        entity = _by_model.get(type(obj))
+        if entity is not None:
+            pending.append((entity, "remove", obj.id, None))
+
+
+_pruned_at = None  # when this worker last deleted expired change log rows
+
+
+@event.listens_for(Session, "before_commit")
+def _log_changes(session):
+    # In the committing transaction, so the other workers never see a change without its log row
+    global _pruned_at
+    if session.in_nested_transaction():
+        return
+    session.flush()
+    changes = {(entity.name, doc_id) for entity, _, doc_id, _ in session.info.get("search_pending", ())}
+    if not changes:
+        return
+    now = datetime.now()
+    session.execute(insert(SearchChange),
+                    [{"entity": name, "doc_id": doc_id, "changed_at": now} for name, doc_id in changes])
+    # Each worker deletes the expired log rows at most once per overlap window
+    if _pruned_at is None or now - _pruned_at >= timedelta(seconds=config.SEARCH_CHANGE_OVERLAP_SECONDS):
+        _pruned_at = now
+        expired = now - timedelta(seconds=config.SEARCH_CHANGE_RETENTION_SECONDS)
+        session.execute(delete(SearchChange).where(SearchChange.changed_at < expired)
+                        .execution_options(synchronize_session=False))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_changes(session):
+    for entity, op, doc_id, text in session.info.pop("search_pending", ()):
+        entity.apply(op, doc_id, text)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_changes(session, previous_transaction):
+    # A rolled back savepoint leaves the outer transaction's changes in place
+    if not previous_transaction.nested:
+        session.info.pop("search_pending", None)
+
+
+def _sync(db: Session, entity: SearchEntity):
+    started = time.monotonic()
+    if entity.needs_rebuild():
+        floor = db.scalar(entity.floor_query())
+        index = entity.begin_rebuild()
+        entity.finish_rebuild(index, db.execute(entity.rows_query()).all(), floor, started)
+        return
+    changes = db.execute(entity.changes_query()).all()
+    doc_ids = entity.changed_ids(changes)
+    rows = db.execute(entity.rows_query().where(entity.model.id.in_(doc_ids))).all() if doc_ids else ()
+    entity.finish_sync(changes, doc_ids, rows, started)
+
+
+async def _sync_async(db: AsyncSession, entity: SearchEntity):
+    started = time.monotonic()
+    if entity.needs_rebuild():
+        floor = await db.scalar(entity.floor_query())
+        index = entity.begin_rebuild()
+        rows = (await db.execute(entity.rows_query())).all()
+        # Indexing a whole table takes a while, so it runs off the event loop
+        await asyncio.to_thread(entity.finish_rebuild, index, rows, floor, started)
+        return
+    changes = (await db.execute(entity.changes_query())).all()
+    doc_ids = entity.changed_ids(changes)
+    rows = (await db.execute(entity.rows_query().where(entity.model.id.in_(doc_ids)))).all() if doc_ids else ()
+    entity.finish_sync(changes, doc_ids, rows, started)
+
+
+def ranked_ids(db: Session, kind: str, search_term: str) -> list:
+    """Sync lookup, building the index on first use and catching up with the change log when due."""
+    entity = entities[kind]
+    # One thread syncs; the others keep searching the current index, unless there is none yet
+    if entity.due() and entity.sync_lock.acquire(blocking=not entity.index.built):
+        try:
+            if entity.due():
+                _sync(db, entity)
+        finally:
+            entity.sync_lock.release()
+    return entity.index.search(search_term)
+
+
+async def _ranked_ids_async(db: AsyncSession, kind: str, search_term: str) -> list:
+    entity = entities[kind]
+    if entity.due():
+        # The lock is shared with the sync lookups, so it is only ever tried here: waiting on it would block
+        # the event loop
+        while not entity.sync_lock.acquire(blocking=False):
+            if entity.index.built:
+                return entity.index.search(search_term)
+            await asyncio.sleep(0.05)
+        try:
+            if entity.due():
+                await _sync_async(db, entity)
+        finally:
+            entity.sync_lock.release()
+    return entity.index.search(search_term)
+
+
+async def _search(db: AsyncSession, kind: str, search_term: str, page: int, limit: int) -> list:
+    entity = entities[kind]
+    offset = (page - 1) * limit
+    ids = (await _ranked_ids_async(db, kind, search_term))[offset:offset + limit]
+    if not ids:
+        return []
+    result = await db.execute(select(entity.model).options(*entity.options).where(entity.model.id.in_(ids)))
+    found = {obj.id: obj for obj in result.scalars().all()}
+    return [entity.response.model_validate(found[doc_id]) for doc_id in ids if doc_id in found]
+
+
+async def main(search_term: str, page: int, limit: int, type: str = None):
+    """Search every entity type (or only the one selected by `type`) concurrently and merge the results."""
+    if type is not None and type not in entity_types:
+        raise e.InvalidRequestError(f"Unknown search type '{type}', use one of {', '.join(entity_types)}")
+    kinds = [entity_types[type]] if type else list(entities)
+
+    async def search_kind(kind):
+        # Each lookup gets its own session so the queries really run side by side
+        async with AsyncSessionLocal() as db:
+            return kind, await _search(db, kind, search_term, page, limit)
+
+    return dict(await asyncio.gather(*(search_kind(kind) for kind in kinds)))
+
+
+async def search_products(db: AsyncSession, search_term: str, page: int, limit: int):
+    return await _search(db, "products", search_term, page, limit)
+
+
+async def search_categories(db: AsyncSession, search_term: str, page: int, limit: int):
+    return await _search(db, "categories", search_term, page, limit)
+
+
+async def search_discounts(db: AsyncSession, search_term: str, page: int, limit: int):
+    return await _search(db, "discounts", search_term, page, limit)
+
+
+async def search_reviews(db: AsyncSession, search_term: str, page: int, limit: int):
+    return await _search(db, "reviews", search_term, page, limit)
@@ -1,6 +1,7 @@
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 import app.common.errors as e
-from app.models.support import SupportSubjectCreate, SupportSubject, SupportSubjectUpdate
+from app.models.support import SupportSubjectCreate, SupportSubject, SupportSubjectUpdate, SupportTicket
 
 
 def create_support_subject(db: Session, subject: SupportSubjectCreate):
@@ -26,7 +27,11 @@ def get_support_subject_by_id(db: Session, subject_id: int):
 def update_support_subject(db: Session, subject_id: int, subject: SupportSubjectUpdate):
     sub = get_support_subject_by_id(db, subject_id)
     sub.name = subject.name
-    sub.priority = subject.priority
+    if subject.priority is not None and subject.priority != sub.priority:
+        sub.priority = subject.priority
+        # Tickets carry a copy of the priority for the dispatch queue
+        db.execute(update(SupportTicket).where(SupportTicket.subject_id == subject_id)
+                   .values(priority=subject.priority).execution_options(synchronize_session=False))
     db.commit()
     db.refresh(sub)
     return sub
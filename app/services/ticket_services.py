@@ -1,13 +1,29 @@
+import asyncio
+from collections import deque
+
 from fastapi import HTTPException
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 import app.common.errors as e
+from app import config
+from app.infrastructure.database import AsyncSessionLocal
+from app.infrastructure.pubsub import broker, publish_on_commit, sse_event
 from app.models.support import SupportTicketCreate, SupportTicket, SupportTicketUpdate, SupportMessages, \
-    SupportMessagesCreate
+    SupportMessagesCreate, SupportSubject, SupportMessagesResponse
 from app.models.user import User
 
+OPEN = "open"
+
+# Dispatch order, matching ix_support_tickets_queue
+_queue_order = (SupportTicket.priority.desc(), SupportTicket.created_at, SupportTicket.id)
+
 
 def create_ticket(db: Session, ticket: SupportTicketCreate, user: User):
-    ticket = SupportTicket(user_id=user.id, subject_id=ticket.subject_id, message=ticket.message)
+    priority = db.scalar(select(SupportSubject.priority).where(SupportSubject.id == ticket.subject_id))
+    if priority is None:
+        raise e.no_resource
+    ticket = SupportTicket(user_id=user.id, subject_id=ticket.subject_id, message=ticket.message, priority=priority)
     db.add(ticket)
     db.commit()
     db.refresh(ticket)
@@ -15,7 +31,7 @@ def create_ticket(db: Session, ticket: SupportTicketCreate, user: User):
 
 
 def get_all_tickets(db: Session):
-    return db.query(SupportTicket).all()
+    return db.query(SupportTicket).order_by(*_queue_order).all()
 
 
 def get_ticket_by_id(db: Session, ticket_id: int):
@@ -40,36 +56,73 @@ def get_tickets_by_assignee(db: Session, assignee_id: int):
 
 
 def assign_support_ticket(db: Session, ticket_id: int, assignee_id: int):
-    """Assign a support ticket to an agent"""
-    ticket = db.query(SupportTicket).filter(SupportTicket.id == ticket_id).first()
-    if not ticket:
-        raise HTTPException(status_code=404, detail="Ticket not found")
-    assignee = db.query(User).filter(User.id == assignee_id).first()
-    if not assignee:
+    """
+    Assign an unassigned support ticket to an agent. The check and the write are one conditional UPDATE, so
+    when two agents grab the same ticket exactly one wins and the other gets 409.
+    """
+    if db.get(User, assignee_id) is None:
         raise HTTPException(status_code=404, detail="Assignee not found")
-    ticket.assignee = assignee_id
+    result = db.execute(
+        update(SupportTicket)
+        .where(SupportTicket.id == ticket_id, SupportTicket.assignee.is_(None))
+        .values(assignee=assignee_id)
+        .execution_options(synchronize_session=False)
+    )
+    if not result.rowcount:
+        db.rollback()
+        get_ticket_by_id(db, ticket_id)
+        raise HTTPException(status_code=409, detail="Ticket already assigned")
     db.commit()
-    db.refresh(ticket)
-    return ticket
+    return get_ticket_by_id(db, ticket_id)
 
 
 def assign_ticket(db, ticket_id, assignee_id):
-    ticket = db.query(SupportTicket).filter(SupportTicket.id == ticket_id).first()
-    if not ticket:
-        raise HTTPException(status_code=404, detail="Ticket not found")
-    ticket.assignee = assignee_id
+    return assign_support_ticket(db, ticket_id, assignee_id)
+
+
+def next_ticket(db: Session, assignee_id: int):
+    """
+    Assign the highest priority, oldest open unassigned ticket to the agent. Concurrent agents never wait on
+    each other: with SELECT ... FOR UPDATE SKIP LOCKED each one skips the tickets others are claiming. SQLite
+    has no row locks but serializes writers, so there the pick and the assignment are a single UPDATE.
+    """
+    queue = (select(SupportTicket.id)
+             .where(SupportTicket.status == OPEN, SupportTicket.assignee.is_(None))
+             .order_by(*_queue_order)
+             .limit(1))
+    if db.get_bind().dialect.name == "sqlite":
+        ticket_id = db.scalar(
+            update(SupportTicket)
+            .where(SupportTicket.id == queue.scalar_subquery(), SupportTicket.assignee.is_(None))
+            .values(assignee=assignee_id)
+            .returning(SupportTicket.id)
+            .execution_options(synchronize_session=False)
+        )
+    else:
+        ticket_id = db.scalar(queue.with_for_update(skip_locked=True))
+        if ticket_id is not None:
+            db.execute(update(SupportTicket).where(SupportTicket.id == ticket_id).values(assignee=assignee_id)
+                       .execution_options(synchronize_session=False))
+    if ticket_id is None:
+        db.rollback()
+        raise HTTPException(status_code=404, detail="No open tickets")
     db.commit()
-    db.refresh(ticket)
-    return ticket
+    return get_ticket_by_id(db, ticket_id)
 
 
 def get_tickets_by_status(db: Session, status: str):
-    tickets = db.query(SupportTicket).filter(SupportTicket.status == status).all()
+    tickets = db.query(SupportTicket).filter(SupportTicket.status == status).order_by(*_queue_order).all()
     return tickets
 
 
 def update_ticket(db: Session, ticket_id: int, ticket_update: SupportTicketUpdate):
     ticket = get_ticket_by_id(db, ticket_id)
+    if ticket_update.subject_id is not None and ticket_update.subject_id != ticket.subject_id:
+        subject = db.get(SupportSubject, ticket_update.subject_id)
+        if subject is None:
+            raise e.no_resource
+        ticket.subject_id = subject.id
+        ticket.priority = subject.priority
     if ticket_update.status is not None:
         ticket.status = ticket_update.status
     if ticket_update.assignee is not None:
@@ -86,19 +139,111 @@ def delete_ticket(db: Session, ticket_id: int):
     return True
 
 
+def message_topic(ticket_id: int) -> str:
+    return f"ticket:{ticket_id}:messages"
+
+
+def check_ticket_access(ticket: SupportTicket, user):
+    """Only the ticket's author and the support agents (admins) may read its messages."""
+    if ticket.user_id != user.id and not user.admin:
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+
+def _message_json(message: SupportMessages) -> str:
+    return SupportMessagesResponse.model_validate(message, from_attributes=True).model_dump_json()
+
+
 def create_support_message(db: Session, ticket_id:int, message: SupportMessagesCreate, user):
     ticket = get_ticket_by_id(db, message.ticket_id)
-    message = SupportMessages(ticket_id=ticket_id, message=message.message, user_id=user.id)
+    message = SupportMessages(ticket_id=ticket.id, message=message.message, user_id=user.id)
     if user.admin:
         message.admin_response = True
-    ticket.messages.append(message)
+    # Added directly rather than through ticket.messages, which would load the whole conversation
+    db.add(message)
+    db.flush()
+    publish_on_commit(db, message_topic(ticket.id), (message.id, _message_json(message)))
     db.commit()
-    db.refresh(ticket)
     return message
 
 
-def get_support_messages(db: Session, ticket_id: int, user: User):
+def get_support_messages(db: Session, ticket_id: int, user: User, after_id: int = 0):
+    """The ticket's messages in order, only those newer than `after_id` when given."""
     ticket = get_ticket_by_id(db, ticket_id)
-    if ticket.user_id != user.id:
-        raise HTTPException(status_code=403, detail="Not authorized")
-    return ticket.messages
\ No newline at end of file
+    check_ticket_access(ticket, user)
+    return (db.query(SupportMessages)
+            .filter(SupportMessages.ticket_id == ticket_id, SupportMessages.id > after_id)
+            .order_by(SupportMessages.id)
+            .all())
+
+
+async def check_ticket_access_async(db: AsyncSession, ticket_id: int, user):
+    ticket = await db.get(SupportTicket, ticket_id)
+    if not ticket:
+        raise HTTPException(status_code=404, detail="Ticket not found")
+    check_ticket_access(ticket, user)
+
+
+def resume_point(after_id: int, last_event_id: str = None) -> int:
+    """Where a stream starts: the Last-Event-ID a reconnecting EventSource sends wins over `after_id`."""
+    if last_event_id is None:
+        return after_id
+    try:
+        return int(last_event_id)
+    except ValueError:
+        raise e.InvalidRequestError("Invalid Last-Event-ID")
+
+
+async def _messages_after(ticket_id: int, after_id: int) -> list:
+    # A short session per read: a stream can stay open for hours and must not hold a connection
+    async with AsyncSessionLocal(info={"read_only": True}) as db:
+        result = await db.scalars(
+            select(SupportMessages)
+            .where(SupportMessages.ticket_id == ticket_id, SupportMessages.id > after_id)
+            .order_by(SupportMessages.id)
+        )
+        return [(message.id, _message_json(message)) for message in result]
+
+
+async def message_events(ticket_id: int, after_id: int = 0):
+    """
+    Server-sent events for the messages of a ticket newer than `after_id`: first the backlog from the
+    database, then every message as soon as it is committed in this worker. Every SUPPORT_STREAM_SYNC_SECONDS
+    a delta read picks up messages committed by other workers (or dropped because this client fell behind),
+    and an idle stream sends a heartbeat. Event ids are message ids, so a client resumes with Last-Event-ID.
+
+    Ids are assigned at insert but become visible at commit, so a message can show up after one with a
+    higher id. Delta reads therefore start from the highest id sent SUPPORT_STREAM_OVERLAP_SECONDS ago rather
+    than the highest id sent, and skip the ids already sent since.
+    """
+    loop = asyncio.get_running_loop()
+    floor = after_id  # ids at or below it were sent, or committed before the overlap window
+    checkpoints = deque()  # (time, highest id sent) at each delta read
+    sent = set()
+    # Subscribed before the first read, so nothing committed in between is missed
+    with broker.subscribe(message_topic(ticket_id)) as subscription:
+        yield f"retry: {int(config.SUPPORT_STREAM_SYNC_SECONDS * 1000)}\n\n"
+        while True:
+            now = loop.time()
+            while checkpoints and checkpoints[0][0] <= now - config.SUPPORT_STREAM_OVERLAP_SECONDS:
+                floor = checkpoints.popleft()[1]
+            sent = {message_id for message_id in sent if message_id > floor}
+            new_messages = False
+            # Shielded so a client disconnecting mid-read does not cancel the session's cleanup
+            for message_id, data in await asyncio.shield(_messages_after(ticket_id, floor)):
+                if message_id not in sent:
+                    sent.add(message_id)
+                    new_messages = True
+                    yield sse_event(data, message_id, "message")
+            checkpoints.append((now, max(sent, default=floor)))
+            deadline = loop.time() + config.SUPPORT_STREAM_SYNC_SECONDS
+            while (remaining := deadline - loop.time()) > 0:
+                item = await subscription.get(remaining)
+                if item is None:
+                    break
+                message_id, data = item
+                if message_id > floor and message_id not in sent:
+                    sent.add(message_id)
+                    new_messages = True
+                    yield sse_event(data, message_id, "message")
+            if not new_messages:
+                yield ": keepalive\n\n"
@@ -1,11 +1,16 @@
+from datetime import datetime
+
 from fastapi import HTTPException
+from sqlalchemy import select, exists
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from app.infrastructure.passwords import password_hasher
+from app.infrastructure.principals import invalidate_principal, revoke_tokens
+from app.models.order import Order, OrderStatus
+from app.models.sales import Sales
 from app.models.user import User, UserCreate, UserUpdate
-from passlib.context import CryptContext
-
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.services.review_services import remove_user_review_stats
 
 
 def get_all_users(db: Session):
@@ -24,7 +29,7 @@ def get_user_by_id(db: Session, user_id: int):
 
 def create_user(db: Session, user: UserCreate):
     """Create a new user with a hashed password."""
-    hashed_password = pwd_context.hash(user.password)
+    hashed_password = password_hasher.hash(user.password)
     user = User(username=user.username,
                 email=user.email,
                 hashed_password=hashed_password,
@@ -42,9 +47,47 @@ def create_user(db: Session, user: UserCreate):
 def authenticate_user(db: Session, username: str, password: str):
     """Authenticate a user by username and password."""
     user = db.query(User).filter(User.username == username).first()
-    if user and pwd_context.verify(password, user.hashed_password):
+    if not user:
+        return None
+    verified, new_hash = password_hasher.verify(password, user.hashed_password)
+    if not verified:
+        return None
+    if new_hash:
+        user.hashed_password = new_hash
+        db.commit()
+    return user
+
+
+async def create_user_async(db: AsyncSession, user: UserCreate):
+    """Async variant of create_user."""
+    hashed_password = await password_hasher.hash_async(user.password)
+    user = User(username=user.username,
+                email=user.email,
+                hashed_password=hashed_password,
+                admin=user.admin)
+    try:
+        db.add(user)
+        await db.commit()
+        await db.refresh(user)
         return user
-    return None
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Username or email already taken")
+
+
+async def authenticate_user_async(db: AsyncSession, username: str, password: str):
+    """Async variant of authenticate_user."""
+    result = await db.execute(select(User).where(User.username == username))
+    user = result.scalar_one_or_none()
+    if not user:
+        return None
+    verified, new_hash = await password_hasher.verify_async(password, user.hashed_password)
+    if not verified:
+        return None
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
+    return user
 
 
 def update_user_details(db: Session, user_id: int, user_update: UserUpdate):
@@ -60,5 +103,45 @@ def update_user_details(db: Session, user_id: int, user_update: UserUpdate):
         user.country = user_update.country
 
     db.commit()
+    invalidate_principal(user_id)
     db.refresh(user)
+    return user
+
+
+def blacklist_user(db: Session, user_id: int, blacklisted: bool = True):
+    user = get_user_by_id(db, user_id)
+    # Lifting a blacklisting revokes too, so other workers stop serving the cached blacklisted principal
+    if blacklisted or bool(user.blacklisted) != blacklisted:
+        revoke_tokens(db, user_id)
+    user.blacklisted = blacklisted
+    user.blacklisted_on = datetime.now()
+    db.commit()
+    invalidate_principal(user_id)
+    db.refresh(user)
+    return user
+
+
+def set_user_admin(db: Session, user_id: int, admin: bool):
+    """Grant or withdraw admin rights; tokens issued with the old role stop working."""
+    user = get_user_by_id(db, user_id)
+    if bool(user.admin) != admin:
+        user.admin = admin
+        revoke_tokens(db, user_id)
+        db.commit()
+        invalidate_principal(user_id)
+        db.refresh(user)
+    return user
+
+
+def delete_user(db: Session, user_id: int):
+    user = get_user_by_id(db, user_id)
+    paid = (select(Order.id)
+            .where(Order.user_id == user_id, Order.status.in_([OrderStatus.PAID.value, OrderStatus.DELIVERED.value])))
+    if db.scalar(select(exists(paid))) or db.scalar(select(exists().where(Sales.user_id == user_id))):
+        raise HTTPException(status_code=400, detail="Users with paid orders cannot be deleted, blacklist them instead")
+    remove_user_review_stats(db, user_id)
+    revoke_tokens(db, user_id)
+    db.delete(user)
+    db.commit()
+    invalidate_principal(user_id)
     return user
\ No newline at end of file
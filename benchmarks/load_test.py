@@ -0,0 +1,262 @@
+"""
+Replay a weighted traffic mix against the FastAPI app running on a local SQLite stand-in.
+
+Seeds a synthetic catalog, users, orders, reviews and support tickets, boots `main.app` in process and
+fires requests at a fixed concurrency. Reports latency percentiles, throughput and the SQL statements
+each endpoint issued (from the X-SQL-Count header).
+
+    python -m benchmarks.load_test --products 2000 --users 500 --requests 5000 --concurrency 64
+
+Each line of the traffic file is a JSON object:
+    {"name": "...", "method": "GET", "path": "/products/{product_id}", "weight": 10,
+     "auth": "user" | "admin" (optional), "json": {...} (optional), "form": {...} (optional)}
+Set AUTH_MODE=stateless to authenticate with stateless tokens instead of username-only ones.
+Placeholders {product_id}, {category_id}, {order_id}, {user_id}, {review_id}, {ticket_id} and {username}
+are filled with random seeded values, in the path and in string values of the body.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+DEFAULT_TRAFFIC = os.path.join(os.path.dirname(__file__), "traffic.jsonl")
+_placeholder = re.compile(r"\{(\w+)\}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", help="SQLite file to use (default: a fresh temporary file)")
+    parser.add_argument("--traffic", default=DEFAULT_TRAFFIC, help="JSON lines file with the traffic mix")
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--categories", type=int, default=50)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--reviews", type=int, default=3000)
+    parser.add_argument("--tickets", type=int, default=300)
+    parser.add_argument("--requests", type=int, default=2000, help="total requests to replay")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=1)
+    return parser.parse_args()
+
+
+def configure_environment(args):
+    """Must run before anything under app/ is imported: the engines read these at import time."""
+    path = args.db or os.path.join(tempfile.mkdtemp(), "load_test.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    os.environ.setdefault("BCRYPT_ROUNDS", "4")
+    os.environ.setdefault("SQL_TAG_STATEMENTS", "false")
+    return path
+
+
+def seed(args):
+    from passlib.context import CryptContext
+    from sqlalchemy import insert
+
+    from app import config
+    from app.commands.rebuild_review_stats import rebuild_review_stats
+    from app.infrastructure.database import SessionLocal
+    from app.models.category import Category
+    from app.models.discount import Discount
+    from app.models.order import Order, OrderProduct, OrderStatus
+    from app.models.product import Product, product_categories
+    from app.models.review import Review
+    from app.models.support import SupportSubject, SupportTicket
+    from app.models.user import User
+
+    rng = random.Random(args.seed)
+    hashed = CryptContext(schemes=["bcrypt"], bcrypt__rounds=config.BCRYPT_ROUNDS).hash("password")
+    now = datetime.now()
+    words = ["widget", "gadget", "kettle", "lamp", "chair", "desk", "cable", "phone", "case", "mug"]
+
+    with SessionLocal() as db:
+        db.execute(insert(User), [
+            {"username": f"user{i}", "email": f"user{i}@example.com", "hashed_password": hashed, "admin": i == 1}
+            for i in range(1, args.users + 1)])
+        db.execute(insert(Discount), [
+            {"name": f"discount {i}", "description": "", "percentage": rng.choice([5, 10, 15, 20])}
+            for i in range(1, 11)])
+        db.execute(insert(Category), [
+            {"name": f"{rng.choice(words)} category {i}", "description": "",
+             "discount_id": rng.randint(1, 10) if rng.random() < 0.2 else None}
+            for i in range(1, args.categories + 1)])
+        db.execute(insert(Product), [
+            {"name": f"{rng.choice(words)} product {i}", "description": f"a {rng.choice(words)}",
+             "price": round(rng.uniform(1, 200), 2), "stock": rng.randint(0, 5000),
+             "discount_id": rng.randint(1, 10) if rng.random() < 0.3 else None}
+            for i in range(1, args.products + 1)])
+        db.execute(insert(product_categories), [
+            {"product_id": product_id, "category_id": category_id}
+            for product_id in range(1, args.products + 1)
+            for category_id in rng.sample(range(1, args.categories + 1), k=min(2, args.categories))])
+
+        db.execute(insert(Order), [
+            {"user_id": rng.randint(1, args.users), "status": rng.choice(list(OrderStatus)).value,
+             "created_at": now - timedelta(days=rng.randint(0, 365)), "total_price": 0}
+            for _ in range(args.orders)])
+        db.execute(insert(OrderProduct), [
+            {"order_id": order_id, "product_id": rng.randint(1, args.products), "quantity": quantity,
+             "total_price": quantity * 10.0}
+            for order_id in range(1, args.orders + 1)
+            for quantity in rng.sample(range(1, 6), k=3)])
+
+        db.execute(insert(Review), [
+            {"user_id": rng.randint(1, args.users), "product_id": rng.randint(1, args.products),
+             "rating": rng.randint(1, 5), "comment": f"{rng.choice(words)} was {rng.choice(['great', 'bad', 'ok'])}",
+             "created_at": now}
+            for _ in range(args.reviews)])
+
+        db.execute(insert(SupportSubject), [{"name": f"subject {i}", "priority": i} for i in range(1, 6)])
+        subjects = [rng.randint(1, 5) for _ in range(args.tickets)]
+        db.execute(insert(SupportTicket), [
+            {"user_id": rng.randint(1, args.users), "subject_id": subject_id, "priority": subject_id,
+             "message": "help", "created_at": now - timedelta(minutes=rng.randint(0, 10000))}
+            for subject_id in subjects])
+        db.commit()
+        rebuild_review_stats(db)
+
+
+def load_traffic(path: str) -> list:
+    with open(path) as f:
+        traffic = [json.loads(line) for line in f if line.strip()]
+    if not traffic:
+        sys.exit(f"No traffic entries in {path}")
+    return traffic
+
+
+def fill(value, values: dict, rng: random.Random):
+    if isinstance(value, str):
+        full = _placeholder.fullmatch(value)
+        if full:
+            return values[full.group(1)](rng)
+        return _placeholder.sub(lambda m: str(values[m.group(1)](rng)), value)
+    if isinstance(value, dict):
+        return {key: fill(item, values, rng) for key, item in value.items()}
+    if isinstance(value, list):
+        return [fill(item, values, rng) for item in value]
+    return value
+
+
+def percentile(samples: list, pct: int) -> float:
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method="inclusive")[pct - 1]
+
+
+async def replay(args, traffic: list):
+    import httpx
+
+    from app import config
+    from app.infrastructure.auth import create_access_token, create_token_pair
+    from app.infrastructure.database import async_engine
+    from app.infrastructure.events import task_queue
+    from app.infrastructure.passwords import password_hasher
+    from main import app
+
+    rng = random.Random(args.seed)
+    values = {
+        "product_id": lambda r: r.randint(1, args.products),
+        "category_id": lambda r: r.randint(1, args.categories),
+        "order_id": lambda r: r.randint(1, args.orders),
+        "user_id": lambda r: r.randint(1, args.users),
+        "review_id": lambda r: r.randint(1, args.reviews),
+        "ticket_id": lambda r: r.randint(1, args.tickets),
+        "username": lambda r: f"user{r.randint(2, args.users)}",
+    }
+    def token(i):
+        # Users are seeded in order, so user{i} has id i
+        if config.AUTH_MODE == "stateless":
+            return create_token_pair(i, f"user{i}", i == 1, 0)["access_token"]
+        return create_access_token({"sub": f"user{i}"})
+
+    tokens = {"admin": token(1)}
+    user_tokens = [token(i) for i in range(2, min(args.users, 50) + 1)]
+
+    latencies = defaultdict(list)
+    statements = defaultdict(list)
+    errors = defaultdict(lambda: defaultdict(int))
+    plan = rng.choices(traffic, weights=[entry.get("weight", 1) for entry in traffic], k=args.requests)
+    queue = asyncio.Queue()
+    for entry in plan:
+        queue.put_nowait(entry)
+
+    async def worker(client):
+        while not queue.empty():
+            entry = queue.get_nowait()
+            headers = {}
+            if entry.get("auth") == "admin":
+                headers["Authorization"] = f"Bearer {tokens['admin']}"
+            elif entry.get("auth"):
+                headers["Authorization"] = f"Bearer {rng.choice(user_tokens)}"
+            request = {"headers": headers}
+            if "json" in entry:
+                request["json"] = fill(entry["json"], values, rng)
+            if "form" in entry:
+                request["data"] = fill(entry["form"], values, rng)
+
+            start = time.perf_counter()
+            response = await client.request(entry["method"], fill(entry["path"], values, rng), **request)
+            elapsed = time.perf_counter() - start
+
+            name = entry.get("name", entry["path"])
+            latencies[name].append(elapsed)
+            if "x-sql-count" in response.headers:
+                statements[name].append(int(response.headers["x-sql-count"]))
+            if response.status_code >= 400:
+                errors[name][response.status_code] += 1
+
+    # Start the password worker processes before the clock does
+    await asyncio.gather(*(password_hasher.hash_async("warm up") for _ in range(password_hasher.workers)))
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://load-test") as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(args.concurrency)))
+        wall = time.perf_counter() - start
+    task_queue.wait_idle(30)
+    await async_engine.dispose()
+    return latencies, statements, errors, wall
+
+
+def report(latencies, statements, errors, wall, total):
+    print(f"\n{total} requests in {wall:.2f}s -> {total / wall:.1f} req/s")
+    header = f"{'endpoint':<22} {'count':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'sql/req':>8}  errors"
+    print(header)
+    print("-" * len(header))
+    everything = []
+    for name in sorted(latencies):
+        samples = latencies[name]
+        everything.extend(samples)
+        sql = f"{statistics.mean(statements[name]):.1f}" if statements[name] else "-"
+        failed = ", ".join(f"{code}x{count}" for code, count in sorted(errors[name].items()))
+        print(f"{name:<22} {len(samples):>6} {percentile(samples, 50) * 1000:>8.1f} "
+              f"{percentile(samples, 95) * 1000:>8.1f} {percentile(samples, 99) * 1000:>8.1f} {sql:>8}  {failed}")
+    print(f"{'all':<22} {len(everything):>6} {percentile(everything, 50) * 1000:>8.1f} "
+          f"{percentile(everything, 95) * 1000:>8.1f} {percentile(everything, 99) * 1000:>8.1f}")
+
+
+def main():
+    args = parse_args()
+    path = configure_environment(args)
+    traffic = load_traffic(args.traffic)
+
+    from app.infrastructure.database import engine
+    from app.migrations import migrate
+    migrate(engine)
+    start = time.perf_counter()
+    seed(args)
+    print(f"Seeded {path} in {time.perf_counter() - start:.1f}s")
+
+    latencies, statements, errors, wall = asyncio.run(replay(args, traffic))
+    report(latencies, statements, errors, wall, args.requests)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Check that editing an order costs the same number of SQL statements whatever the size of the cart.
+
+Each run builds a cart of N lines, then applies one edit that removes a third of the lines, changes the
+quantity of another third and adds N/3 new products. Exits non-zero if the statement count varies with N:
+
+    python -m benchmarks.order_edit_statements --lines 3 30 300
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401 - registers every mapper
+from app.infrastructure.database import Base
+from app.infrastructure.principals import Principal
+from app.models.order import OrderCreate, OrderProductCreate, OrderUpdate
+from app.models.product import Product
+from app.models.user import User
+from app.services import order_services
+from benchmarks.order_round_trips import RoundTripCounter
+
+
+def run(sizes: list) -> dict:
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    counter = RoundTripCounter(engine)
+
+    products = max(sizes) * 2
+    with Session() as db:
+        user = User(username="bench", email="bench@example.com", hashed_password="x")
+        db.add(user)
+        db.add_all(Product(name=f"product {i}", description="", price=10 + i, stock=10 ** 6)
+                   for i in range(products))
+        db.commit()
+        principal = Principal(user.id, user.username, False, False)
+
+    counts = {}
+    for n in sizes:
+        with Session() as db:
+            cart = OrderCreate(order_products=[OrderProductCreate(product_id=i + 1, quantity=1) for i in range(n)])
+            order_id = order_services.create_order(db, principal.id, cart).id
+        third = max(n // 3, 1)
+        edit = OrderUpdate(
+            remove_products=list(range(1, third + 1)),
+            new_products=[OrderProductCreate(product_id=i + 1, quantity=3) for i in range(third, 2 * third)]
+                         + [OrderProductCreate(product_id=n + i + 1, quantity=2) for i in range(third)],
+        )
+        with Session() as db:
+            counter.reset()
+            order_services.update_order(db, order_id, edit, principal)
+            counts[n] = counter.statements
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, nargs="+", default=[3, 30, 300])
+    args = parser.parse_args()
+    counts = run(args.lines)
+    for n, statements in counts.items():
+        print(f"{n:>6} lines: {statements} statements")
+    if len(set(counts.values())) != 1:
+        sys.exit("statement count depends on the cart size")
@@ -0,0 +1,120 @@
+"""
+Count database round trips per checkout, before and after batched product loading.
+
+Runs against a throwaway SQLite database so it never touches the real server:
+
+    python -m benchmarks.order_round_trips --lines 3 10 50
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401 - registers every mapper
+from app.infrastructure.database import Base
+from app.models.discount import Discount
+from app.models.order import OrderCreate, OrderProductCreate, Order, OrderProduct
+from app.models.product import Product
+from app.models.user import User
+from app.services import order_services
+
+
+def legacy_create_order(db, user_id: int, order: OrderCreate):
+    """The original per-line implementation, kept here as the baseline."""
+    total_cost = 0
+    order_products = []
+
+    for op in order.order_products:
+        product = db.query(Product).filter(Product.id == op.product_id).first()
+        if not product:
+            raise HTTPException(status_code=404, detail=f"Product {op.product_id} not found")
+
+        cost = product.price * op.quantity
+        if product.discount:
+            cost -= (product.discount.percentage / 100) * cost
+
+        total_cost += cost
+        order_products.append(OrderProduct(
+            product_id=op.product_id,
+            quantity=op.quantity,
+            total_price=cost
+        ))
+
+    db_order = Order(user_id=user_id, total_price=total_cost)
+    db.add(db_order)
+    db.commit()
+    db.refresh(db_order)
+
+    for op in order_products:
+        op.order_id = db_order.id
+        db.add(op)
+    db.commit()
+    db.refresh(db_order)
+
+    return db_order
+
+
+class RoundTripCounter:
+    def __init__(self, engine):
+        self.statements = 0
+        self.commits = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+        event.listen(engine, "commit", self._on_commit)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements += 1
+
+    def _on_commit(self, conn):
+        self.commits += 1
+
+    def reset(self):
+        self.statements = 0
+        self.commits = 0
+
+
+def seed(db, products: int):
+    discount = Discount(name="bench", percentage=10)
+    db.add(discount)
+    db.add(User(username="bench", email="bench@example.com", hashed_password="x"))
+    db.flush()
+    for i in range(products):
+        db.add(Product(name=f"product {i}", description="", price=10 + i, stock=1000,
+                       discount_id=discount.id if i % 2 else None))
+    db.commit()
+
+
+def run(lines: list, repeat: int):
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    counter = RoundTripCounter(engine)
+
+    with Session() as db:
+        seed(db, max(lines))
+        user_id = db.query(User.id).scalar()
+
+    print(f"{'lines':>6} {'impl':>8} {'statements':>11} {'commits':>8} {'ms/order':>9}")
+    for n in lines:
+        payload = OrderCreate(order_products=[OrderProductCreate(product_id=i + 1, quantity=2) for i in range(n)])
+        for name, create in (("legacy", legacy_create_order), ("batched", order_services.create_order)):
+            counter.reset()
+            start = time.perf_counter()
+            for _ in range(repeat):
+                with Session() as db:
+                    create(db, user_id, payload)
+            elapsed = (time.perf_counter() - start) * 1000 / repeat
+            print(f"{n:>6} {name:>8} {counter.statements / repeat:>11.1f} "
+                  f"{counter.commits / repeat:>8.1f} {elapsed:>9.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, nargs="+", default=[3, 10, 50])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    run(args.lines, args.repeat)
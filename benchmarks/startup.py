@@ -0,0 +1,103 @@
+"""
+Measure how long a fresh worker takes to get going: importing main (and so every router, model and schema),
+then the first request, which opens the first connection and builds whatever was deferred, compared with
+the same request once warm, and the first OpenAPI document.
+
+Every run is a new interpreter on a migrated SQLite file, so reload restarts and cold starts look the same.
+
+    python -m benchmarks.startup --runs 5
+    python -m benchmarks.startup --importtime 15   # also list the slowest modules of one import
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+PHASES = ("import_main", "first_request", "warm_request", "first_openapi")
+
+CHILD = """
+import json, time
+start = time.perf_counter()
+import main
+timings = {"import_main": time.perf_counter() - start}
+
+from fastapi.testclient import TestClient
+from app.infrastructure.auth import create_access_token
+
+client = TestClient(main.app)
+headers = {"Authorization": f"Bearer {create_access_token({'sub': 'bench'})}"}
+for phase in ("first_request", "warm_request"):
+    start = time.perf_counter()
+    assert client.get("/products/1", headers=headers).status_code == 200
+    timings[phase] = time.perf_counter() - start
+start = time.perf_counter()
+assert client.get("/openapi.json").status_code == 200
+timings["first_openapi"] = time.perf_counter() - start
+print(json.dumps(timings))
+"""
+
+
+def prepare(path: str):
+    """Migrate and seed the database in this process, so the children only pay for their own start."""
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    from sqlalchemy import insert
+
+    from app.infrastructure.database import SessionLocal, engine
+    from app.migrations import migrate
+    from app.models.product import Product
+    from app.models.user import User
+
+    migrate(engine)
+    with SessionLocal() as db:
+        db.execute(insert(User).values(username="bench", email="bench@example.com", hashed_password="x"))
+        db.execute(insert(Product).values(name="bench product", description="", price=10, stock=10))
+        db.commit()
+    engine.dispose()
+
+
+def run_child(env: dict) -> dict:
+    result = subprocess.run([sys.executable, "-c", CHILD], env=env, capture_output=True, text=True)
+    if result.returncode:
+        sys.exit(result.stderr)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def import_profile(env: dict, top: int):
+    """Slowest modules by self time, from python -X importtime."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                            env=env, capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line and "self" not in line:
+            own, cumulative, name = line[len("import time:"):].split("|")
+            rows.append((int(own), int(cumulative), name.strip()))
+    print(f"\n{'module':<50} {'self ms':>8} {'cumul ms':>9}")
+    for own, cumulative, name in sorted(rows, reverse=True)[:top]:
+        print(f"{name:<50} {own / 1000:>8.1f} {cumulative / 1000:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--importtime", type=int, default=0, metavar="N", help="list the N slowest modules")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "startup.db")
+    prepare(path)
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{path}",
+           "PYTHONPATH": os.pathsep.join(filter(None, [os.getcwd(), os.environ.get("PYTHONPATH")]))}
+
+    samples = [run_child(env) for _ in range(args.runs)]
+    print(f"{'phase':<16} {'median ms':>10} {'min ms':>8} {'max ms':>8}")
+    for phase in PHASES:
+        values = [sample[phase] * 1000 for sample in samples]
+        print(f"{phase:<16} {statistics.median(values):>10.1f} {min(values):>8.1f} {max(values):>8.1f}")
+    if args.importtime:
+        import_profile(env, args.importtime)
+
+
+if __name__ == "__main__":
+    main()
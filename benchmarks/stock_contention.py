@@ -0,0 +1,103 @@
+"""
+Hammer one hot product with concurrent checkouts and check that stock is never oversold.
+
+Every worker thread places single-line orders for the same product until the stock runs out. The
+reservation path (order_services.create_order) is compared with the old read-check-write pattern, which
+loses updates under concurrency. Defaults to a throwaway SQLite file; pass --url to run it against MySQL,
+where the conditional UPDATE only holds the row lock for the commit:
+
+    python -m benchmarks.stock_contention --threads 64 --stock 500
+    python -m benchmarks.stock_contention --url mysql+mysqldb://user:pw@localhost/bench
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401 - registers every mapper
+from app.infrastructure.database import Base
+from app.models.order import OrderCreate, OrderProductCreate
+from app.models.product import Product
+from app.models.user import User
+from app.services import order_services
+
+
+def legacy_checkout(db, user_id: int, order: OrderCreate):
+    """Read the stock, check it in Python, write it back: the pattern the reservation replaced."""
+    for line in order.order_products:
+        product = db.get(Product, line.product_id)
+        if product.stock < line.quantity:
+            raise HTTPException(status_code=409, detail="Insufficient stock")
+        product.stock -= line.quantity
+    db.commit()
+
+
+def run(url: str, implementation, threads: int, stock: int, quantity: int):
+    engine = create_engine(url, **({"connect_args": {"timeout": 60}} if url.startswith("sqlite") else
+                                   {"pool_size": threads, "max_overflow": 0}))
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    with Session() as db:
+        user = User(username="bench", email="bench@example.com", hashed_password="x")
+        product = Product(name="hot sku", description="", price=10, stock=stock)
+        db.add_all([user, product])
+        db.commit()
+        user_id, product_id = user.id, product.id
+
+    payload = OrderCreate(order_products=[OrderProductCreate(product_id=product_id, quantity=quantity)])
+    sold = []
+    rejected = []
+    errors = []
+    sold_out = threading.Event()
+
+    def worker():
+        while not sold_out.is_set():
+            with Session() as db:
+                try:
+                    implementation(db, user_id, payload)
+                    sold.append(quantity)
+                except HTTPException:
+                    rejected.append(1)
+                    sold_out.set()
+                except OperationalError as error:
+                    errors.append(error)
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    with Session() as db:
+        remaining = db.get(Product, product_id).stock
+        db.execute(update(Product).where(Product.id == product_id).values(stock=0))
+        db.commit()
+    engine.dispose()
+    oversold = sum(sold) + remaining - stock
+    return len(sold), len(rejected), len(errors), remaining, oversold, elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="database to use (default: a fresh SQLite file)")
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--stock", type=int, default=300)
+    parser.add_argument("--quantity", type=int, default=1)
+    args = parser.parse_args()
+    url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'contention.db')}"
+
+    print(f"{'impl':>8} {'orders':>7} {'rejected':>9} {'db errors':>10} {'left':>5} {'oversold':>9} {'orders/s':>9}")
+    for name, implementation in (("legacy", legacy_checkout), ("reserve", order_services.create_order)):
+        orders, rejected, errors, remaining, oversold, elapsed = run(
+            url, implementation, args.threads, args.stock, args.quantity)
+        print(f"{name:>8} {orders:>7} {rejected:>9} {errors:>10} {remaining:>5} {oversold:>9} "
+              f"{orders / elapsed:>9.1f}")
@@ -0,0 +1,101 @@
+"""
+Let concurrent agents drain a support ticket backlog and check that no ticket is handed out twice.
+
+Every worker thread is an agent asking for its next ticket until the queue is empty. The dispatch queue
+(ticket_services.next_ticket) is compared with reading the first unassigned ticket and then assigning it,
+which gives the same ticket to several agents under concurrency. Defaults to a throwaway SQLite file; pass
+--url to run it against MySQL, where agents skip each other's locked rows instead of waiting:
+
+    python -m benchmarks.ticket_dispatch --agents 16 --tickets 2000
+    python -m benchmarks.ticket_dispatch --url mysql+mysqldb://user:pw@localhost/bench
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401 - registers every mapper
+from app.infrastructure.database import Base
+from app.models.support import SupportSubject, SupportTicket
+from app.models.user import User
+from app.services import ticket_services
+
+
+def legacy_next_ticket(db, assignee_id: int):
+    """Read the head of the queue, then assign it: the pattern the dispatch queue replaced."""
+    ticket = db.scalars(select(SupportTicket)
+                        .where(SupportTicket.status == "open", SupportTicket.assignee.is_(None))
+                        .order_by(SupportTicket.priority.desc(), SupportTicket.created_at).limit(1)).first()
+    if ticket is None:
+        raise HTTPException(status_code=404, detail="No open tickets")
+    ticket.assignee = assignee_id
+    db.commit()
+    return ticket
+
+
+def run(url: str, implementation, agents: int, tickets: int):
+    engine = create_engine(url, **({"connect_args": {"timeout": 60}} if url.startswith("sqlite") else
+                                   {"pool_size": agents, "max_overflow": 0}))
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    rng = random.Random(1)
+    now = datetime.now()
+    with Session() as db:
+        db.execute(insert(User), [{"username": f"agent{i}", "email": f"agent{i}@example.com", "hashed_password": "x"}
+                                  for i in range(agents)])
+        db.execute(insert(SupportSubject), [{"name": f"subject {i}", "priority": i} for i in range(1, 6)])
+        db.execute(insert(SupportTicket), [
+            {"user_id": 1, "subject_id": subject_id, "priority": subject_id, "message": "help",
+             "created_at": now - timedelta(seconds=rng.randint(0, 100000))}
+            for subject_id in (rng.randint(1, 5) for _ in range(tickets))])
+        db.commit()
+        agent_ids = db.scalars(select(User.id)).all()
+
+    handed_out = Counter()
+    errors = []
+    empty = threading.Event()
+
+    def agent(agent_id):
+        while not empty.is_set():
+            with Session() as db:
+                try:
+                    handed_out[implementation(db, agent_id).id] += 1
+                except HTTPException:
+                    empty.set()
+                except OperationalError as error:
+                    errors.append(error)
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=agent, args=(agent_id,)) for agent_id in agent_ids]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    engine.dispose()
+    duplicates = sum(count - 1 for count in handed_out.values())
+    return sum(handed_out.values()), len(handed_out), duplicates, len(errors), elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="database to use (default: a fresh SQLite file)")
+    parser.add_argument("--agents", type=int, default=16)
+    parser.add_argument("--tickets", type=int, default=1000)
+    args = parser.parse_args()
+    url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'dispatch.db')}"
+
+    print(f"{'impl':>8} {'handouts':>9} {'tickets':>8} {'twice':>6} {'db errors':>10} {'tickets/s':>10}")
+    for name, implementation in (("legacy", legacy_next_ticket), ("queue", ticket_services.next_ticket)):
+        handouts, distinct, duplicates, errors, elapsed = run(url, implementation, args.agents, args.tickets)
+        print(f"{name:>8} {handouts:>9} {distinct:>8} {duplicates:>6} {errors:>10} {handouts / elapsed:>10.1f}")
@@ -0,0 +1,34 @@
+"""
+Production server: gunicorn managing uvicorn workers, all settings from app.config.
+
+    gunicorn -c gunicorn.conf.py main:app
+
+The app is imported once in the master (preload_app) and forked into the workers, so they start instantly
+and share the imported code's memory. Signals to the master:
+    HUP    replace every worker gracefully, new code is NOT loaded since it was preloaded
+    USR2   start a new master with the new code next to the old one (see update_and_run.sh); then TERM the
+           old master, whose workers finish their in-flight requests before exiting
+    TTIN / TTOU   add / remove a worker
+"""
+from app import config as app_config  # "config" is itself a gunicorn setting
+
+wsgi_app = "main:app"
+worker_class = "uvicorn.workers.UvicornWorker"
+bind = app_config.WEB_BIND
+workers = app_config.WEB_WORKERS
+backlog = app_config.WEB_BACKLOG
+keepalive = app_config.WEB_KEEPALIVE_SECONDS
+timeout = app_config.WEB_TIMEOUT_SECONDS
+graceful_timeout = app_config.WEB_GRACEFUL_TIMEOUT_SECONDS
+max_requests = app_config.WEB_MAX_REQUESTS
+max_requests_jitter = app_config.WEB_MAX_REQUESTS // 10
+preload_app = True
+pidfile = app_config.WEB_PIDFILE
+
+
+def post_fork(server, worker):
+    # Connections must never be shared across processes: drop whatever the master may have opened while
+    # importing the app, without closing them under the other processes' feet
+    from app.infrastructure.database import async_engine, engine
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
@@ -1,18 +1,17 @@
 import uvicorn
-import app.models.__init__ as ini
 from fastapi import FastAPI
-from app.routers import auth, categories, reviews, discounts, orders
+
+import app.models  # noqa: F401 - registers every mapper
+from app.routers import auth, categories, reviews, discounts, orders, admin, search, analytics
 from app.routers import users
 from app.routers import products
 from app.routers.support import support
-from app.infrastructure.database import Base, engine
-
-
-print("=============== create_all() ===============")
-Base.metadata.create_all(bind=engine)
+from app.infrastructure.instrumentation import SQLInstrumentationMiddleware
 
+# The schema is managed by app/migrations (python -m app.commands.migrate), never at import time
 
 app = FastAPI(prefix="/api")
+app.add_middleware(SQLInstrumentationMiddleware)
 
 app.include_router(auth.router, tags=["Auth"], prefix="/auth")
 app.include_router(users.router, tags=["Users"], prefix="/users")
@@ -22,6 +21,10 @@ app.include_router(reviews.router, tags=["Reviews"], prefix="/reviews")
 app.include_router(discounts.router, tags=["Discounts"], prefix="/discounts")
 app.include_router(orders.router, tags=["Orders"], prefix="/orders")
 app.include_router(support.router, tags=["Support"], prefix="/support")
+app.include_router(search.router, tags=["Search"], prefix="/search")
+app.include_router(admin.router, tags=["Admin"], prefix="/admin")
+app.include_router(analytics.router, tags=["Analytics"], prefix="/analytics")
 
 if __name__ == "__main__":
+    # Development server with auto-reload; production runs under gunicorn (see gunicorn.conf.py)
     uvicorn.run("main:app", host="0.0.0.0", port=8100, reload=True)
@@ -0,0 +1,61 @@
+"""Editing an order must cost the same number of SQL statements whatever the size of the edit."""
+import os
+import tempfile
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/test.db")
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401 - registers every mapper
+from app.infrastructure.principals import Principal
+from app.migrations import migrate
+from app.models.order import OrderCreate, OrderProductCreate, OrderUpdate
+from app.models.product import Product
+from app.models.user import User
+from app.services import order_services
+
+SIZES = (1, 10, 100)
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'orders.db'}")
+    migrate(engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+
+def test_update_order_statement_count_does_not_depend_on_lines(session_factory):
+    with session_factory() as db:
+        user = User(username="orders", email="orders@example.com", hashed_password="x")
+        db.add(user)
+        db.add_all(Product(name=f"product {i}", description="", price=10 + i, stock=10 ** 6)
+                   for i in range(sum(SIZES) * 3))
+        db.commit()
+        principal = Principal(user.id, user.username, False, False)
+
+    statements = []
+    event.listen(session_factory.kw["bind"], "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    counts = {}
+    first_product = 1
+    for n in SIZES:
+        # A cart of 2n lines; the edit removes n of them, changes the quantity of the other n and adds n more
+        cart = list(range(first_product, first_product + 2 * n))
+        added = list(range(first_product + 2 * n, first_product + 3 * n))
+        first_product += 3 * n
+        with session_factory() as db:
+            order = OrderCreate(order_products=[OrderProductCreate(product_id=i, quantity=1) for i in cart])
+            order_id = order_services.create_order(db, principal.id, order).id
+        edit = OrderUpdate(remove_products=cart[:n],
+                           new_products=[OrderProductCreate(product_id=i, quantity=3) for i in cart[n:]]
+                                        + [OrderProductCreate(product_id=i, quantity=2) for i in added])
+        with session_factory() as db:
+            statements.clear()
+            updated = order_services.update_order(db, order_id, edit, principal)
+            counts[n] = len(statements)
+            assert len(updated.order_products) == 2 * n
+
+    assert len(set(counts.values())) == 1, counts
@@ -1,21 +1,95 @@
 #!/bin/bash
 
-# Start main.py in the background once
-echo "[$(date)] Starting main.py"
-python main.py &
+# Serve the app with gunicorn (see gunicorn.conf.py) and deploy every new commit of origin/main with a
+# rolling upgrade: a new master loads the new code next to the old one, then the old workers finish their
+# in-flight requests and exit. No request is dropped and no restart waits on a file watcher.
+PIDFILE=$(python -c "from app import config; print(config.WEB_PIDFILE)")
+WORKERS=$(python -c "from app import config; print(config.WEB_WORKERS)")
 
-# Periodically pull updates
+# Succeeds once master $1 has all its workers up, and they are still the same processes 5 seconds later
+# (a worker that crashes on boot is replaced, and a master whose workers cannot boot exits). Both masters
+# listen on the same socket, so an HTTP health check could be answered by the old version instead.
+workers_healthy() {
+    local master=$1 workers=""
+    for _ in $(seq 30); do
+        sleep 1
+        kill -0 "$master" 2>/dev/null || return 1
+        workers=$(pgrep -P "$master" | sort)
+        [ "$(echo "$workers" | grep -c .)" -ge "$WORKERS" ] && break
+    done
+    [ "$(echo "$workers" | grep -c .)" -ge "$WORKERS" ] || return 1
+    sleep 5
+    kill -0 "$master" 2>/dev/null && [ "$(pgrep -P "$master" | sort)" = "$workers" ]
+}
+
+# Put the checkout back on the commit that is being served, so a failed deploy is retried on the next pass
+# and the running version never finds other code on disk (a respawned or re-exec'd master reads it)
+restore_deployed() {
+    git reset -q --hard "$DEPLOYED"
+    git clean -fdq
+}
+
+# Bring the schema up to date, then start the server in the background once
+echo "[$(date)] Running migrations"
+python -m app.commands.migrate
+echo "[$(date)] Starting gunicorn"
+gunicorn -c gunicorn.conf.py &
+DEPLOYED=$(git rev-parse HEAD)
+
+# Periodically cancel the orders whose reservation expired, and pull updates
 while true; do
-    echo "[$(date)] Running git pull"
-    # Reset any local changes and pull
-    git reset --hard
-    git clean -fd
-    git pull origin main
-    if [ $? -eq 0 ]; then
-        echo "[$(date)] Git pull successful"
-    else
-        echo "[$(date)] Git pull failed"
-    fi
-    echo "[$(date)] Sleeping for 300 seconds"
     sleep 60
-done
\ No newline at end of file
+    # Run from here rather than from the app, so it happens once per minute whatever the number of workers
+    if ! released=$(python -m app.commands.release_expired_reservations); then
+        echo "[$(date)] Releasing expired reservations failed"
+    elif [ "$released" != "released 0 orders" ]; then
+        echo "[$(date)] ${released^}"
+    fi
+
+    if ! git fetch -q origin main; then
+        echo "[$(date)] Git fetch failed"
+        continue
+    fi
+    TARGET=$(git rev-parse FETCH_HEAD)
+    if [ "$DEPLOYED" = "$TARGET" ]; then
+        continue
+    fi
+    echo "[$(date)] Deploying $(git rev-parse --short "$TARGET")"
+    # Reset any local changes and move to the new commit
+    git reset -q --hard "$TARGET"
+    git clean -fdq
+
+    # The old version keeps serving while the migrations run, so they must stay backward compatible
+    if ! python -m app.commands.migrate; then
+        echo "[$(date)] Migrations failed, the running version keeps serving"
+        restore_deployed
+        continue
+    fi
+
+    OLD_PID=$(cat "$PIDFILE")
+    rm -f "$PIDFILE.2"
+    kill -USR2 "$OLD_PID"
+    # The new master writes $PIDFILE.2 once it has loaded the new code, and takes over $PIDFILE when the
+    # old master is gone
+    for _ in $(seq 60); do
+        sleep 1
+        [ -s "$PIDFILE.2" ] && break
+    done
+    if [ ! -s "$PIDFILE.2" ]; then
+        echo "[$(date)] New version failed to start, the running version keeps serving"
+        restore_deployed
+        continue
+    fi
+    NEW_PID=$(cat "$PIDFILE.2")
+    if ! workers_healthy "$NEW_PID"; then
+        # The old master stays in charge once its new one is gone
+        echo "[$(date)] Workers of master $NEW_PID did not come up, stopping it, the running version keeps serving"
+        kill -TERM "$NEW_PID" 2>/dev/null
+        restore_deployed
+        continue
+    fi
+    # The new workers are serving, let the old ones drain and exit
+    kill -TERM "$OLD_PID"
+    DEPLOYED=$TARGET
+    echo "[$(date)] Deployed, master $NEW_PID replaced $OLD_PID"
+done